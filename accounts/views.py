@@ -5,6 +5,7 @@ from django.contrib import messages
 from django.contrib.auth.models import User
 from .forms import UserRegistrationForm, UserProfileForm, UserUpdateForm
 from .models import UserProfile, FavoriteUniversity
+from universities.recommendations import recommend_for_user
 
 
 def register_view(request):
@@ -88,7 +89,11 @@ def edit_profile_view(request):
 def favorites_view(request):
     """Избранные университеты пользователя"""
     favorites = FavoriteUniversity.objects.filter(user=request.user).select_related('university')
-    return render(request, 'accounts/favorites.html', {'favorites': favorites})
+    return render(request, 'accounts/favorites.html', {
+        'favorites': favorites,
+        # Персональные рекомендации по предрассчитанной таблице (команда build_recommendations)
+        'recommendations': recommend_for_user(request.user),
+    })
 
 
 @login_required
@@ -1,29 +1,140 @@
 """
 Конфигурация Gunicorn для production сервера
+
+Профиль воркеров задается переменными окружения:
+    GUNICORN_WORKER_CLASS   sync (по умолчанию), gthread или uvicorn (ASGI)
+    GUNICORN_WORKERS        количество воркеров (по умолчанию - по CPU и памяти)
+    GUNICORN_THREADS        потоков на воркер для gthread (по умолчанию 4)
+    GUNICORN_PRELOAD        загружать приложение до fork (по умолчанию True)
+    GUNICORN_WARM_CACHE     прогревать кэш каталога при старте воркера (по умолчанию True)
+    GUNICORN_MEMORY_LIMIT_MB    лимит памяти (по умолчанию - лимит cgroup или объем RAM)
+    GUNICORN_WORKER_MEMORY_MB   оценка памяти одного воркера (по умолчанию 150)
+
+Запуск: gunicorn --config gunicorn_config.py
+(приложение WSGI или ASGI выбирается по GUNICORN_WORKER_CLASS)
 """
 import multiprocessing
+import os
+import sys
+import time
+
+# Имя config зарезервировано gunicorn (путь к файлу конфигурации)
+from decouple import config as decouple_config
+
+
+def _env(name, default):
+    """Переменная окружения или значение из .env"""
+    return decouple_config(name, default=default)
+
+
+def cpu_count():
+    """Количество доступных процессу CPU (с учетом affinity контейнера)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+def memory_limit_mb():
+    """Лимит памяти: GUNICORN_MEMORY_LIMIT_MB, лимит cgroup (v2/v1) или объем RAM"""
+    if _env('GUNICORN_MEMORY_LIMIT_MB', ''):
+        return int(_env('GUNICORN_MEMORY_LIMIT_MB', '0'))
+
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            # "max" или огромное число - лимит не установлен
+            if value.isdigit() and int(value) < 1 << 60:
+                return int(value) // (1024 * 1024)
+        except OSError:
+            continue
+
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+
+def default_workers(worker_class):
+    """
+    Количество воркеров: по CPU (sync - 2*CPU+1, gthread и uvicorn - CPU+1,
+    параллельность дают потоки и event loop), но не больше, чем помещается в
+    память (с запасом 25% на мастер-процесс, кэш и фоновые задачи)
+    """
+    cpus = cpu_count()
+    by_cpu = cpus * 2 + 1 if worker_class == 'sync' else cpus + 1
+
+    limit = memory_limit_mb()
+    per_worker = int(_env('GUNICORN_WORKER_MEMORY_MB', '150'))
+    if not limit or per_worker <= 0:
+        return by_cpu
+    by_memory = int(limit * 0.75) // per_worker
+    return max(1, min(by_cpu, by_memory))
+
+
+# Профиль воркеров
+WORKER_CLASSES = {
+    'sync': ('sync', 'university_aggregator.wsgi:application'),
+    'gthread': ('gthread', 'university_aggregator.wsgi:application'),
+    'uvicorn': ('uvicorn_worker.UvicornWorker', 'university_aggregator.asgi:application'),
+}
+
+worker_profile = _env('GUNICORN_WORKER_CLASS', 'sync')
+if worker_profile not in WORKER_CLASSES:
+    raise ValueError(f'GUNICORN_WORKER_CLASS: ожидается одно из {", ".join(WORKER_CLASSES)}')
+
+worker_class, wsgi_app = WORKER_CLASSES[worker_profile]
+
+# Для uvicorn включаем асинхронные представления каталога
+if worker_profile == 'uvicorn':
+    os.environ.setdefault('ASYNC_CATALOG_VIEWS', 'True')
+    # Под ASGI постоянные соединения (CONN_MAX_AGE) не переиспользуются между
+    # запросами: свое соединение держит каждый поток sync_to_async и каждый
+    # асинхронный контекст, и число соединений PostgreSQL растет без предела.
+    # Соединение открывается на запрос, пул соединений - PgBouncer (DB_POOLER)
+    conn_max_age = str(_env('DB_CONN_MAX_AGE', '0')).strip()
+    if conn_max_age not in ('', '0'):
+        sys.stderr.write(
+            f'WARNING: GUNICORN_WORKER_CLASS=uvicorn - DB_CONN_MAX_AGE={conn_max_age} заменен на 0 '
+            f'(постоянные соединения под ASGI не поддерживаются, используйте PgBouncer)\n'
+        )
+    os.environ['DB_CONN_MAX_AGE'] = '0'
 
 # Биндинг
-bind = "0.0.0.0:8000"
+bind = _env('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Количество воркеров
+workers = int(_env('GUNICORN_WORKERS', '0')) or default_workers(worker_profile)
 
-# Количество воркеров (рекомендуется: количество CPU * 2 + 1)
-workers = multiprocessing.cpu_count() * 2 + 1
+# Количество потоков на воркер (используются только gthread)
+threads = int(_env('GUNICORN_THREADS', '4')) if worker_profile == 'gthread' else 1
 
-# Количество потоков на воркер
-threads = 2
+# Загрузка приложения в мастер-процессе до fork: код Django и справочные данные
+# разделяются воркерами (copy-on-write), воркеры стартуют быстрее.
+# Перезагрузка кода возможна только полным рестартом (не HUP).
+preload_app = _env('GUNICORN_PRELOAD', 'True').lower() in ('1', 'true', 'yes', 'on')
+
+# Прогрев кэша справочных данных, шаблонов и URL при старте воркера
+# (universities/catalog_cache.py), в том числе после перезапуска по max_requests
+warm_cache = _env('GUNICORN_WARM_CACHE', 'True').lower() in ('1', 'true', 'yes', 'on')
 
 # Таймауты
 timeout = 120
 keepalive = 5
 
-# Логирование
-accesslog = "logs/gunicorn_access.log"
-errorlog = "logs/gunicorn_error.log"
+# Логирование (пустое значение GUNICORN_ACCESS_LOG отключает access log)
+accesslog = _env('GUNICORN_ACCESS_LOG', 'logs/gunicorn_access.log') or None
+errorlog = _env('GUNICORN_ERROR_LOG', 'logs/gunicorn_error.log')
 loglevel = "info"
 
+for log_path in (accesslog, errorlog):
+    if log_path and log_path != '-':
+        os.makedirs(os.path.dirname(log_path) or '.', exist_ok=True)
+
 # Процесс
 daemon = False
-pidfile = "gunicorn.pid"
+pidfile = _env('GUNICORN_PIDFILE', 'gunicorn.pid') or None
 
 # Перезапуск при изменении кода (только для разработки)
 reload = False
@@ -39,3 +150,49 @@ proc_name = "uniguide"
 max_requests = 1000
 max_requests_jitter = 50
 
+
+def pre_fork(server, worker):
+    """Соединения с БД, открытые мастером при preload, не должны наследоваться воркерами"""
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
+
+
+def post_fork(server, worker):
+    worker.boot_started = time.perf_counter()
+
+
+def post_worker_init(worker):
+    """
+    Прогрев воркера до первого запроса: справочные данные каталога, шаблоны, URL.
+    Выполняется и при перезапуске воркера по max_requests
+    """
+    if warm_cache:
+        from universities.catalog_cache import warm_catalog_cache
+        timings = warm_catalog_cache()
+        worker.log.info(
+            'Прогрев кэша: %.0f мс (%s)',
+            sum(timings.values()), ', '.join(f'{name} {ms:.0f} мс' for name, ms in timings.items())
+        )
+    boot_started = getattr(worker, 'boot_started', None)
+    if boot_started is not None:
+        worker.log.info('Воркер %s готов за %.0f мс', worker.pid, (time.perf_counter() - boot_started) * 1000)
+
+
+def worker_exit(server, worker):
+    """Просмотры страниц, накопленные воркером, сохраняются до его остановки (в том числе по max_requests)"""
+    from universities.view_counters import flush_view_counters
+    flush_view_counters()
+
+
+def when_ready(server):
+    if preload_app and warm_cache:
+        # Шаблоны и URLconf, загруженные мастером, наследуются воркерами при fork
+        from universities.catalog_cache import warm_catalog_cache
+        start = time.perf_counter()
+        warm_catalog_cache()
+        server.log.info('Прогрев мастер-процесса: %.0f мс', (time.perf_counter() - start) * 1000)
+    server.log.info(
+        'Профиль воркеров: %s, воркеров: %s, потоков: %s, preload: %s (CPU: %s, память: %s МБ)',
+        worker_profile, workers, threads, preload_app, cpu_count(), memory_limit_mb()
+    )
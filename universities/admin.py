@@ -1,8 +1,10 @@
 from django.contrib import admin
 from .models import (
-    Region, UniversityType, University, Faculty, Program, 
-    UniversityRating, UniversityComparison, News, UniversityRepresentative
+    Region, UniversityType, University, Faculty, Program, Specialty,
+    UniversityRating, UniversityComparison, News, UniversityRepresentative,
+    BackgroundJob, save_without_counters
 )
+from .jobs import enqueue_job
 
 
 @admin.register(Region)
@@ -20,18 +22,18 @@ class UniversityTypeAdmin(admin.ModelAdmin):
 
 @admin.register(University)
 class UniversityAdmin(admin.ModelAdmin):
-    list_display = ['name', 'short_name', 'city', 'region', 'university_type', 'is_public', 'yandex_rating', 'google_rating']
+    list_display = ['name', 'short_name', 'city', 'region', 'university_type', 'is_public', 'yandex_rating', 'google_rating', 'views_count']
     list_filter = ['region', 'university_type', 'is_public', 'founded_year']
     search_fields = ['name', 'short_name', 'city']
     list_editable = ['is_public']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['users_rating', 'users_ratings_count', 'views_count', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Основная информация', {
             'fields': ('name', 'short_name', 'description', 'founded_year')
         }),
         ('Местоположение', {
-            'fields': ('region', 'city', 'address')
+            'fields': ('region', 'city', 'address', 'latitude', 'longitude')
         }),
         ('Контактная информация', {
             'fields': ('website', 'email', 'phone')
@@ -48,11 +50,61 @@ class UniversityAdmin(admin.ModelAdmin):
         ('Медиа', {
             'fields': ('logo',)
         }),
+        ('Статистика', {
+            'fields': ('users_rating', 'users_ratings_count', 'views_count')
+        }),
         ('Системная информация', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+    
+    def save_model(self, request, obj, form, change):
+        # Без счетчиков: форма загружена до последних оценок и просмотров
+        if change:
+            save_without_counters(obj)
+        else:
+            super().save_model(request, obj, form, change)
+    
+    actions = ['refresh_ratings', 'refresh_google_ratings', 'refresh_yandex_ratings', 'refresh_tabiturient_ratings']
+    
+    def _enqueue_rating_jobs(self, request, queryset, kinds):
+        """Ставит в очередь задачи обновления рейтингов для выбранных университетов"""
+        university_ids = list(queryset.values_list('id', flat=True))
+        params = {
+            'update_google_ratings': {'university_ids': university_ids, 'fast_refresh': True, 'delay': 0.2},
+            'update_yandex_ratings': {'university_ids': university_ids, 'fast_refresh': True, 'delay': 0.2},
+            'update_tabiturient_ratings': {'university_ids': university_ids, 'batch': True},
+        }
+        jobs = [enqueue_job(kind, params[kind], user=request.user) for kind in kinds]
+        self.message_user(
+            request,
+            f'Поставлено в очередь задач: {len(jobs)} для {len(university_ids)} университетов. '
+            'Статус выполнения - в разделе «Фоновые задачи».'
+        )
+    
+    def refresh_ratings(self, request, queryset):
+        """Обновить все рейтинги выбранных университетов в фоне"""
+        self._enqueue_rating_jobs(
+            request, queryset,
+            ['update_google_ratings', 'update_yandex_ratings', 'update_tabiturient_ratings']
+        )
+    refresh_ratings.short_description = 'Обновить все рейтинги выбранных (в фоне)'
+    
+    def refresh_google_ratings(self, request, queryset):
+        """Обновить рейтинги Google выбранных университетов в фоне"""
+        self._enqueue_rating_jobs(request, queryset, ['update_google_ratings'])
+    refresh_google_ratings.short_description = 'Обновить рейтинги Google выбранных (в фоне)'
+    
+    def refresh_yandex_ratings(self, request, queryset):
+        """Обновить рейтинги Яндекс Карт выбранных университетов в фоне"""
+        self._enqueue_rating_jobs(request, queryset, ['update_yandex_ratings'])
+    refresh_yandex_ratings.short_description = 'Обновить рейтинги Яндекс Карт выбранных (в фоне)'
+    
+    def refresh_tabiturient_ratings(self, request, queryset):
+        """Обновить рейтинги Табитуриент.ру выбранных университетов в фоне"""
+        self._enqueue_rating_jobs(request, queryset, ['update_tabiturient_ratings'])
+    refresh_tabiturient_ratings.short_description = 'Обновить рейтинги Табитуриент.ру выбранных (в фоне)'
 
 
 @admin.register(Faculty)
@@ -63,12 +115,20 @@ class FacultyAdmin(admin.ModelAdmin):
     ordering = ['university', 'name']
 
 
+@admin.register(Specialty)
+class SpecialtyAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name', 'key']
+    search_fields = ['code', 'name', 'key']
+    ordering = ['code', 'name']
+
+
 @admin.register(Program)
 class ProgramAdmin(admin.ModelAdmin):
-    list_display = ['name', 'faculty', 'degree_level', 'duration_years', 'tuition_fee']
+    list_display = ['name', 'faculty', 'specialty', 'degree_level', 'duration_years', 'tuition_fee']
     list_filter = ['degree_level', 'duration_years', 'faculty__university']
-    search_fields = ['name']
+    search_fields = ['name', 'specialty__code']
     ordering = ['faculty__university', 'name']
+    raw_id_fields = ['specialty']
 
 
 @admin.register(UniversityRating)
@@ -95,11 +155,11 @@ class UniversityComparisonAdmin(admin.ModelAdmin):
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
-    list_display = ['title', 'university', 'author', 'is_published', 'created_at']
+    list_display = ['title', 'university', 'author', 'is_published', 'views_count', 'created_at']
     list_filter = ['is_published', 'created_at', 'university']
     search_fields = ['title', 'content', 'university__name']
     list_editable = ['is_published']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['views_count', 'created_at', 'updated_at']
     ordering = ['-created_at']
     
     fieldsets = (
@@ -110,13 +170,20 @@ class NewsAdmin(admin.ModelAdmin):
             'fields': ('image',)
         }),
         ('Публикация', {
-            'fields': ('is_published',)
+            'fields': ('is_published', 'views_count')
         }),
         ('Системная информация', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+    
+    def save_model(self, request, obj, form, change):
+        # Без счетчика просмотров: он сохраняется пакетно, в обход формы
+        if change:
+            save_without_counters(obj)
+        else:
+            super().save_model(request, obj, form, change)
 
 
 @admin.register(UniversityRepresentative)
@@ -154,3 +221,64 @@ class UniversityRepresentativeAdmin(admin.ModelAdmin):
         updated = queryset.update(is_approved=False)
         self.message_user(request, f'Отклонено {updated} представителей.')
     disapprove_representatives.short_description = 'Отклонить выбранных представителей'
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress_display', 'worker', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind', 'created_at']
+    search_fields = ['output', 'error', 'worker']
+    readonly_fields = [
+        'status', 'progress', 'total', 'output', 'error', 'worker',
+        'created_by', 'created_at', 'started_at', 'finished_at'
+    ]
+    ordering = ['-created_at']
+    
+    fieldsets = (
+        ('Задача', {
+            'fields': ('kind', 'params')
+        }),
+        ('Выполнение', {
+            'fields': ('status', 'progress', 'total', 'worker', 'started_at', 'finished_at')
+        }),
+        ('Результат', {
+            'fields': ('output', 'error')
+        }),
+        ('Системная информация', {
+            'fields': ('created_by', 'created_at'),
+            'classes': ('collapse',)
+        }),
+    )
+    
+    actions = ['requeue_jobs']
+    
+    def get_readonly_fields(self, request, obj=None):
+        # Параметры можно задать только при создании задачи
+        if obj is not None:
+            return self.readonly_fields + ['kind', 'params']
+        return self.readonly_fields
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+    
+    def progress_display(self, obj):
+        if obj.total:
+            return f'{obj.progress}/{obj.total} ({obj.progress_percent}%)'
+        return f'{obj.progress_percent}%'
+    progress_display.short_description = 'Прогресс'
+    
+    def requeue_jobs(self, request, queryset):
+        """Повторно поставить выбранные задачи в очередь"""
+        updated = queryset.exclude(status=BackgroundJob.STATUS_RUNNING).update(
+            status=BackgroundJob.STATUS_PENDING,
+            progress=0,
+            output='',
+            error='',
+            worker='',
+            started_at=None,
+            finished_at=None
+        )
+        self.message_user(request, f'Повторно поставлено в очередь {updated} задач.')
+    requeue_jobs.short_description = 'Повторно поставить в очередь'
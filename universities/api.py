@@ -0,0 +1,544 @@
+"""
+JSON API каталога только для чтения (/api/v1/)
+
+Ресурсы: вузы, образовательные программы, отзывы и новости. Параметр fields
+выбирает поля ответа (fields=id,name,city), строки загружаются через
+values_list без создания объектов моделей, JOIN выполняется только для
+запрошенных связанных полей.
+
+ETag вычисляется из версий данных (DataVersion, см. universities/signals.py) и
+параметров запроса до загрузки данных: повторный запрос с If-None-Match при
+неизменных данных получает 304 Not Modified за один запрос к БД.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Avg, Count
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.views.decorators.http import require_safe
+
+from .catalog_cache import get_data_versions
+from .catalog_snapshot import get_snapshot
+from .forms import MapClustersForm, NearbySearchForm, ProgramSearchForm, UniversitySearchForm
+from .geo import DEFAULT_NEAREST_COUNT, get_geo_index
+from .map_clusters import get_map_clusters
+from .models import University, Program, UniversityRating, News
+from .program_search import RESULT_FIELDS as PROGRAM_SEARCH_FIELDS, ProgramSearchResults, search_programs
+from .specialties import universities_with_specialty
+from .views import apply_university_filters, search_universities
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class ApiError(Exception):
+    """Ошибка запроса к API (возвращается клиенту в JSON)"""
+    
+    def __init__(self, message, status=400, details=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.details = details
+
+
+# Параметры json.dumps всех ответов API: кириллица без \u-экранирования,
+# компактные разделители (без пробелов после "," и ":")
+JSON_DUMPS_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def api_response(data, status=200):
+    """JSON-ответ API"""
+    return JsonResponse(data, status=status, json_dumps_params=JSON_DUMPS_PARAMS)
+
+
+def file_url(value):
+    return default_storage.url(value) if value else None
+
+
+def parse_int(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f'Параметр {name}: ожидается целое число')
+
+
+class Resource:
+    """
+    Описание ресурса API
+    
+    fields: имя поля в ответе -> путь для values_list (поле модели, связанное
+    поле через __ или имя аннотации из annotations)
+    filters: параметр запроса -> lookup (значение - целое число)
+    versions: наборы данных DataVersion, от которых зависит ответ
+    """
+    
+    def __init__(self, name, queryset, fields, default_fields, ordering, versions,
+                 filters=None, annotations=None, converters=None):
+        self.name = name
+        self.queryset = queryset
+        self.fields = fields
+        self.default_fields = default_fields
+        self.ordering = ordering
+        self.versions = versions
+        self.filters = filters or {}
+        self.annotations = annotations or {}
+        self.converters = converters or {}
+    
+    def select_fields(self, params):
+        """Поля ответа из параметра fields (по умолчанию default_fields)"""
+        value = params.get('fields', '').strip()
+        if not value:
+            return list(self.default_fields)
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(
+                f'Неизвестные поля: {", ".join(unknown)}. Доступные поля: {", ".join(self.fields)}'
+            )
+        return list(dict.fromkeys(names))
+    
+    def filter(self, queryset, params):
+        for param, lookup in self.filters.items():
+            value = parse_int(params, param)
+            if value is not None:
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+    
+    def get_queryset(self, params, names):
+        queryset = self.filter(self.queryset.all(), params)
+        annotations = {name: self.annotations[name] for name in names if name in self.annotations}
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset.order_by(*self.ordering)
+    
+    def serialize(self, rows, names):
+        """Строки values_list -> словари с полями ответа"""
+        converters = [(name, self.converters[name]) for name in names if name in self.converters]
+        results = [dict(zip(names, row)) for row in rows]
+        for item in results:
+            for name, converter in converters:
+                item[name] = converter(item[name])
+        return results
+    
+    def values(self, queryset, names):
+        return queryset.values_list(*(self.fields[name] for name in names))
+
+
+class OrderedIdResults:
+    """
+    Объекты queryset в порядке списка id (порядок из снимка каталога):
+    count() и срезы values_list для api_list_view - запрос только по id
+    вузов страницы
+    """
+    
+    def __init__(self, queryset, ids, fields=()):
+        self.queryset = queryset
+        self.ids = ids
+        self.fields = fields
+    
+    def values_list(self, *fields):
+        return OrderedIdResults(self.queryset, self.ids, fields)
+    
+    def count(self) -> int:
+        return len(self.ids)
+    
+    def __getitem__(self, item):
+        ids = self.ids[item]
+        rows = {
+            row[0]: row[1:]
+            for row in self.queryset.filter(pk__in=ids).order_by().values_list('pk', *self.fields)
+        }
+        return [rows[pk] for pk in ids if pk in rows]
+
+
+class UniversityResource(Resource):
+    """
+    Вузы: фильтры и сортировка формы поиска каталога (name, region, city,
+    university_type, is_public, min_rating, min_programs, max_tuition,
+    sort=rating|name; без sort - по названию)
+    """
+    
+    # Параметры, которые требуют оценок и программ вуза: выполняются, как в
+    # списке вузов, по снимку каталога (без NumPy - запросом search_universities)
+    LIST_PARAMS = ('min_rating', 'min_programs', 'max_tuition', 'sort')
+    
+    def search_form(self, params):
+        form = UniversitySearchForm(params)
+        if not form.is_valid():
+            raise ApiError('Некорректные параметры фильтрации', details=form.errors.get_json_data())
+        if form.cleaned_data.get('sort') == 'popular':
+            # Просмотры меняются без версии данных - ETag ответа не менялся бы
+            raise ApiError('Параметр sort: сортировка popular в API не поддерживается')
+        return form.cleaned_data
+    
+    def filter(self, queryset, params):
+        return apply_university_filters(queryset, self.search_form(params))
+    
+    def get_queryset(self, params, names):
+        queryset = super().get_queryset(params, names)
+        cleaned_data = self.search_form(params)
+        if not any(cleaned_data.get(name) for name in self.LIST_PARAMS):
+            return queryset
+        
+        order = cleaned_data.get('sort') or 'name'
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            ids = snapshot.search(cleaned_data, order).tolist()
+        else:
+            universities = search_universities(cleaned_data)
+            if order == 'name':
+                universities = universities.order_by(*self.ordering)
+            ids = list(universities.values_list('id', flat=True))
+        return OrderedIdResults(queryset, ids)
+
+
+class NearbyResource(Resource):
+    """
+    Ближайшие к точке вузы (параметры формы NearbySearchForm: lat, lng, k,
+    max_distance): поля вузов и расстояние distance_km
+    """
+    
+    def nearest(self, params):
+        """Список (id вуза, расстояние в км) от ближнего к дальнему"""
+        form = NearbySearchForm(params)
+        if not form.is_valid():
+            raise ApiError('Некорректные параметры поиска', details=form.errors.get_json_data())
+        return get_geo_index().nearest(
+            form.cleaned_data['lat'],
+            form.cleaned_data['lng'],
+            form.cleaned_data['k'] or DEFAULT_NEAREST_COUNT,
+            form.cleaned_data['max_distance'],
+        )
+
+
+class MapResource(Resource):
+    """Маркеры карты вузов (параметры формы MapClustersForm: zoom, bbox)"""
+    
+    def markers(self, params):
+        form = MapClustersForm(params)
+        if not form.is_valid():
+            raise ApiError('Некорректные параметры карты', details=form.errors.get_json_data())
+        zoom = form.cleaned_data['zoom']
+        return zoom, get_map_clusters().query(zoom, *form.cleaned_data['bbox'])
+
+
+class ProgramSearchResource(Resource):
+    """
+    Поиск программ по всем вузам: фильтры и сортировка формы ProgramSearchForm
+    (q, degree_level, education_form, city, region, max_tuition, sort)
+    """
+    
+    def get_queryset(self, params, names):
+        form = ProgramSearchForm(params)
+        if not form.is_valid():
+            raise ApiError('Некорректные параметры поиска', details=form.errors.get_json_data())
+        return ProgramSearchResults(search_programs(form.cleaned_data), form.cleaned_data.get('sort'))
+
+
+class SpecialtyUniversitiesResource(Resource):
+    """
+    Вузы, где есть программы специальности (specialty - id из справочника,
+    обязательный; max_tuition), с минимальной стоимостью min_fee, от дешевых
+    к дорогим
+    """
+    
+    def get_queryset(self, params, names):
+        specialty = parse_int(params, 'specialty')
+        if specialty is None:
+            raise ApiError('Параметр specialty обязателен')
+        return universities_with_specialty(specialty, parse_int(params, 'max_tuition'))
+
+
+UNIVERSITY_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'short_name': 'short_name',
+    'description': 'description',
+    'founded_year': 'founded_year',
+    'region_id': 'region_id',
+    'region': 'region__name',
+    'city': 'city',
+    'address': 'address',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'website': 'website',
+    'email': 'email',
+    'phone': 'phone',
+    'logo': 'logo',
+    'university_type_id': 'university_type_id',
+    'university_type': 'university_type__name',
+    'is_public': 'is_public',
+    'accreditation': 'accreditation',
+    'license': 'license',
+    'yandex_rating': 'yandex_rating',
+    'yandex_reviews_count': 'yandex_reviews_count',
+    'google_rating': 'google_rating',
+    'google_reviews_count': 'google_reviews_count',
+    'tabiturient_rating': 'tabiturient_rating',
+    'tabiturient_rank': 'tabiturient_rank',
+    'tabiturient_category': 'tabiturient_category',
+    'avg_rating': 'avg_rating',
+    'ratings_count': 'ratings_count',
+    'programs_count': 'programs_count',
+    'updated_at': 'updated_at',
+}
+
+UNIVERSITY_DEFAULT_FIELDS = [
+    'id', 'name', 'short_name', 'city', 'region', 'university_type', 'is_public',
+    'avg_rating', 'ratings_count',
+]
+
+UNIVERSITY_ANNOTATIONS = {
+    'avg_rating': Avg('ratings__rating'),
+    'ratings_count': Count('ratings', distinct=True),
+    'programs_count': Count('faculties__programs', distinct=True),
+}
+
+
+RESOURCES = {
+    'universities': UniversityResource(
+        'universities',
+        University.objects.all(),
+        fields=UNIVERSITY_FIELDS,
+        default_fields=UNIVERSITY_DEFAULT_FIELDS,
+        ordering=['name', 'id'],
+        versions=['universities', 'ratings', 'programs'],
+        annotations=UNIVERSITY_ANNOTATIONS,
+        converters={'logo': file_url},
+    ),
+    'nearby': NearbyResource(
+        'nearby',
+        University.objects.all(),
+        fields={**UNIVERSITY_FIELDS, 'distance_km': None},
+        default_fields=[*UNIVERSITY_DEFAULT_FIELDS, 'distance_km'],
+        ordering=[],
+        versions=['universities', 'ratings', 'programs'],
+        annotations=UNIVERSITY_ANNOTATIONS,
+        converters={'logo': file_url},
+    ),
+    # Без аннотаций UNIVERSITY_ANNOTATIONS: их JOIN с программами совпал бы с
+    # отфильтрованным по специальности и исказил количества
+    'specialty_universities': SpecialtyUniversitiesResource(
+        'specialty_universities',
+        University.objects.all(),
+        fields={
+            **{name: path for name, path in UNIVERSITY_FIELDS.items() if name not in UNIVERSITY_ANNOTATIONS},
+            'min_fee': 'min_fee',
+        },
+        default_fields=['id', 'name', 'short_name', 'city', 'region', 'min_fee'],
+        ordering=[],
+        versions=['universities', 'programs'],
+        converters={'logo': file_url},
+    ),
+    'map': MapResource(
+        'map',
+        University.objects.all(),
+        fields={},
+        default_fields=[],
+        ordering=[],
+        versions=['universities'],
+    ),
+    'programs': Resource(
+        'programs',
+        Program.objects.all(),
+        fields={
+            'id': 'id',
+            'name': 'name',
+            'degree_level': 'degree_level',
+            'duration_years': 'duration_years',
+            'description': 'description',
+            'tuition_fee': 'tuition_fee',
+            'faculty_id': 'faculty_id',
+            'faculty': 'faculty__name',
+            'university_id': 'faculty__university_id',
+            'university': 'faculty__university__name',
+            'specialty_id': 'specialty_id',
+            'specialty_code': 'specialty__code',
+            'specialty': 'specialty__name',
+        },
+        default_fields=[
+            'id', 'name', 'degree_level', 'duration_years', 'tuition_fee', 'faculty',
+            'university_id', 'university',
+        ],
+        ordering=['faculty__university_id', 'name', 'id'],
+        versions=['programs', 'universities'],
+        filters={
+            'university': 'faculty__university_id',
+            'faculty': 'faculty_id',
+            'specialty': 'specialty_id',
+            'max_tuition': 'tuition_fee__lte',
+        },
+    ),
+    'program_search': ProgramSearchResource(
+        'program_search',
+        Program.objects.all(),
+        fields=PROGRAM_SEARCH_FIELDS,
+        default_fields=list(PROGRAM_SEARCH_FIELDS),
+        ordering=[],
+        versions=['programs', 'universities', 'ratings'],
+    ),
+    'ratings': Resource(
+        'ratings',
+        UniversityRating.objects.all(),
+        fields={
+            'id': 'id',
+            'university_id': 'university_id',
+            'university': 'university__name',
+            'user': 'user__username',
+            'rating': 'rating',
+            'comment': 'comment',
+            'created_at': 'created_at',
+            'updated_at': 'updated_at',
+        },
+        default_fields=['id', 'university_id', 'user', 'rating', 'comment', 'created_at'],
+        ordering=['-created_at', '-id'],
+        versions=['ratings', 'universities'],
+        filters={
+            'university': 'university_id',
+            'min_rating': 'rating__gte',
+        },
+    ),
+    'news': Resource(
+        'news',
+        News.objects.filter(is_published=True),
+        fields={
+            'id': 'id',
+            'title': 'title',
+            'content': 'content',
+            'university_id': 'university_id',
+            'university': 'university__name',
+            'author': 'author__username',
+            'image': 'image',
+            'created_at': 'created_at',
+            'updated_at': 'updated_at',
+        },
+        default_fields=['id', 'title', 'university_id', 'university', 'image', 'created_at'],
+        ordering=['-created_at', '-id'],
+        versions=['news', 'universities'],
+        filters={'university': 'university_id'},
+        converters={'image': file_url},
+    ),
+}
+
+
+def api_etag(request, resource, pk=None):
+    """Строгий ETag: версии данных ресурса + параметры запроса"""
+    versions = get_data_versions(*resource.versions)
+    key = '|'.join([
+        resource.name,
+        str(pk),
+        ','.join(f'{name}:{versions[name][0]}' for name in resource.versions),
+        '&'.join(f'{name}={value}' for name, values in sorted(request.GET.lists()) for value in values),
+    ])
+    return quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+
+def api_view(view):
+    """
+    Общая обработка запросов API: ETag и 304 Not Modified до загрузки данных,
+    Cache-Control, ошибки в JSON
+    """
+    @require_safe
+    @wraps(view)
+    def wrapper(request, resource, **kwargs):
+        resource = RESOURCES[resource]
+        etag = api_etag(request, resource, kwargs.get('pk'))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            try:
+                response = view(request, resource, **kwargs)
+            except ApiError as e:
+                data = {'error': e.message}
+                if e.details:
+                    data['details'] = e.details
+                response = api_response(data, status=e.status)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            patch_cache_control(response, public=True, max_age=settings.API_CACHE_MAX_AGE)
+        return response
+    return wrapper
+
+
+@api_view
+def api_list_view(request, resource):
+    """
+    Список объектов ресурса
+    
+    GET параметры: fields, page, page_size (до 100) и фильтры ресурса
+    """
+    names = resource.select_fields(request.GET)
+    page = parse_int(request.GET, 'page') or 1
+    page_size = min(max(parse_int(request.GET, 'page_size') or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+    if page < 1:
+        raise ApiError('Параметр page: ожидается число от 1')
+    
+    queryset = resource.get_queryset(request.GET, names)
+    count = queryset.count()
+    offset = (page - 1) * page_size
+    rows = resource.values(queryset, names)[offset:offset + page_size] if offset < count else []
+    
+    return api_response({
+        'count': count,
+        'page': page,
+        'page_size': page_size,
+        'num_pages': (count + page_size - 1) // page_size,
+        'results': resource.serialize(rows, names),
+    })
+
+
+@api_view
+def api_detail_view(request, resource, pk):
+    """Объект ресурса по id (GET параметр fields)"""
+    names = resource.select_fields(request.GET)
+    rows = list(resource.values(resource.get_queryset({}, names).filter(pk=pk), names)[:1])
+    if not rows:
+        raise ApiError('Объект не найден', status=404)
+    return api_response(resource.serialize(rows, names)[0])
+
+
+@api_view
+def api_nearby_view(request, resource):
+    """
+    Ближайшие к точке вузы от ближнего к дальнему
+    
+    GET параметры: lat, lng, k (до 50, по умолчанию 10), max_distance (км), fields
+    """
+    names = resource.select_fields(request.GET)
+    nearest = resource.nearest(request.GET)
+    
+    # Поля вузов - одним запросом по id, расстояние - из индекса
+    distances = dict(nearest)
+    columns = ['id', *(name for name in names if name not in ('id', 'distance_km'))]
+    queryset = resource.get_queryset({}, columns).filter(pk__in=list(distances))
+    rows = {row[0]: row for row in resource.values(queryset, columns)}
+    results = resource.serialize([rows[university_id] for university_id, _ in nearest if university_id in rows], columns)
+    for item in results:
+        item['distance_km'] = round(distances[item['id']], 2)
+    results = [{name: item[name] for name in names} for item in results]
+    
+    return api_response({
+        'count': len(results),
+        'results': results,
+    })
+
+
+@api_view
+def api_map_view(request, resource):
+    """
+    Маркеры карты вузов для видимой области: кластеры и одиночные вузы
+    
+    GET параметры: zoom (0-22), bbox=west,south,east,north (по умолчанию весь мир)
+    """
+    zoom, markers = resource.markers(request.GET)
+    return api_response({
+        'zoom': zoom,
+        'count': len(markers),
+        'markers': markers,
+    })
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class UniversitiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'universities'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from university_aggregator.db_tuning import apply_sqlite_pragmas
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='apply_sqlite_pragmas')
+        
+        from . import signals  # noqa: F401
@@ -0,0 +1,227 @@
+"""
+Асинхронные версии представлений каталога (только чтение)
+
+Данные загружаются через асинхронный ORM, поэтому под ASGI (uvicorn) воркер
+не блокируется на запросах к БД и обслуживает другие запросы. Шаблоны
+рендерятся в потоке (sync_to_async): формы поиска и base.html обращаются
+к БД при рендеринге.
+
+Подключаются вместо синхронных представлений настройкой ASYNC_CATALOG_VIEWS
+(см. universities/urls.py). Автодополнение доступно всегда.
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import Paginator
+from django.db.models import Q, Avg, Count
+from django.http import Http404
+from django.shortcuts import render
+
+from .api import api_response
+from .catalog_cache import get_cities
+from .catalog_snapshot import get_snapshot, paginate_universities
+from .facets import get_facet_counts
+from .forms import UniversitySearchForm
+from .http_cache import conditional_page, university_page_validators, news_page_validators
+from .models import University, UniversityRating, News, Faculty, Program, UniversityRepresentative
+from .recommendations import get_coliked_universities
+from .similarity import get_similar_universities
+from .view_counters import arecord_view
+from .views import leaderboard_universities, search_universities
+from accounts.models import FavoriteUniversity
+
+
+async def apaginate(queryset, per_page, page_number):
+    """
+    Асинхронный аналог Paginator.get_page: количество и объекты страницы
+    загружаются асинхронными запросами
+    """
+    paginator = Paginator(queryset, per_page)
+    # count - cached_property, подставляем значение, чтобы Paginator не выполнял запрос
+    paginator.count = await queryset.acount()
+    page = paginator.get_page(page_number)
+    page.object_list = [obj async for obj in page.object_list]
+    return page
+
+
+async def arender(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def get_university_or_404(university_id):
+    try:
+        return await University.objects.select_related('region', 'university_type').aget(id=university_id)
+    except University.DoesNotExist:
+        raise Http404('Университет не найден')
+
+
+async def is_university_representative(user, university):
+    """Асинхронная версия views.is_university_representative"""
+    if not user.is_authenticated:
+        return False
+    if user.is_superuser or user.is_staff:
+        return True
+    return await UniversityRepresentative.objects.filter(
+        user=user,
+        university=university,
+        is_approved=True
+    ).aexists()
+
+
+async def _university_list_page(form, is_valid, page_number):
+    """Страница списка вузов запросами асинхронного ORM (без снимка каталога)"""
+    universities = search_universities(form.cleaned_data if is_valid else {})
+    return await apaginate(universities.select_related('region', 'university_type'), 12, page_number)
+
+
+async def university_list_view(request):
+    """Список университетов с поиском и фильтрацией"""
+    form = UniversitySearchForm(request.GET)
+    
+    # Валидация ModelChoiceField выполняет запросы к БД
+    is_valid = await sync_to_async(form.is_valid)()
+    
+    # Снимок каталога в памяти: фильтрация без запросов, из БД - только вузы страницы
+    snapshot = await sync_to_async(get_snapshot)()
+    if snapshot is not None:
+        cleaned_data = form.cleaned_data if is_valid else {}
+        page_obj = await sync_to_async(paginate_universities)(
+            snapshot, cleaned_data, 12, request.GET.get('page'), order=cleaned_data.get('sort') or 'rating'
+        )
+    else:
+        page_obj = await _university_list_page(form, is_valid, request.GET.get('page'))
+    
+    cities = await sync_to_async(get_cities)()
+    facets = await sync_to_async(get_facet_counts)(form.cleaned_data if is_valid else {})
+    
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'universities': page_obj,
+        'cities': cities,
+        'facets': facets,
+    }
+    return await arender(request, 'universities/university_list.html', context)
+
+
+@conditional_page(university_page_validators)
+async def university_detail_view(request, university_id):
+    """Детальная страница университета"""
+    university = await get_university_or_404(university_id)
+    await arecord_view('university', university.pk)
+    user = await request.auser()
+    
+    is_favorite = False
+    if user.is_authenticated:
+        is_favorite = await FavoriteUniversity.objects.filter(
+            user=user,
+            university=university
+        ).aexists()
+    
+    ratings = [
+        rating async for rating in UniversityRating.objects.filter(
+            university=university
+        ).select_related('user').order_by('-created_at')
+    ]
+    
+    rating_stats = await UniversityRating.objects.filter(university=university).aaggregate(
+        avg_rating=Avg('rating'),
+        ratings_count=Count('rating')
+    )
+    
+    faculties = [faculty async for faculty in Faculty.objects.filter(university=university)]
+    programs = [
+        program async for program in Program.objects.filter(
+            faculty__university=university
+        ).select_related('faculty')
+    ]
+    
+    news = [
+        item async for item in News.objects.filter(
+            university=university, is_published=True
+        ).order_by('-created_at')[:5]
+    ]
+    
+    context = {
+        'university': university,
+        'is_favorite': is_favorite,
+        'ratings': ratings,
+        'rating_stats': rating_stats,
+        'faculties': faculties,
+        'programs': programs,
+        'news': news,
+        'is_representative': await is_university_representative(user, university),
+        'similar_universities': await sync_to_async(get_similar_universities)(university.pk),
+        'coliked_universities': await sync_to_async(get_coliked_universities)(university.pk),
+    }
+    return await arender(request, 'universities/university_detail.html', context)
+
+
+async def rating_leaderboard_view(request):
+    """Рейтинг университетов"""
+    universities = leaderboard_universities().select_related('region', 'university_type')
+    
+    page_obj = await apaginate(universities, 20, request.GET.get('page'))
+    
+    context = {
+        'page_obj': page_obj,
+        'universities': page_obj,
+    }
+    return await arender(request, 'universities/rating_leaderboard.html', context)
+
+
+async def news_list_view(request):
+    """Список всех новостей"""
+    news = News.objects.filter(is_published=True).select_related('university', 'author').order_by('-created_at')
+    
+    page_obj = await apaginate(news, 10, request.GET.get('page'))
+    
+    context = {
+        'page_obj': page_obj,
+        'news': page_obj,
+    }
+    return await arender(request, 'universities/news_list.html', context)
+
+
+@conditional_page(news_page_validators)
+async def news_detail_view(request, news_id):
+    """Детальная страница новости"""
+    try:
+        news = await News.objects.select_related(
+            'university', 'university__region', 'author'
+        ).aget(id=news_id, is_published=True)
+    except News.DoesNotExist:
+        raise Http404('Новость не найдена')
+    await arecord_view('news', news.pk)
+    
+    context = {
+        'news': news,
+    }
+    return await arender(request, 'universities/news_detail.html', context)
+
+
+async def university_autocomplete_view(request):
+    """
+    Автодополнение для поиска: университеты (по названию и сокращению) и города
+    
+    GET параметры: q - строка поиска (от 2 символов), limit - количество (до 20)
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 20)
+    except ValueError:
+        limit = 10
+    
+    if len(query) < 2:
+        return api_response({'universities': [], 'cities': []})
+    
+    universities = [
+        university async for university in University.objects.filter(
+            Q(name__icontains=query) | Q(short_name__icontains=query)
+        ).values('id', 'name', 'short_name', 'city').order_by('name')[:limit]
+    ]
+    cities = [
+        city async for city in University.objects.filter(
+            city__icontains=query
+        ).values_list('city', flat=True).distinct().order_by('city')[:limit]
+    ]
+    
+    return api_response({'universities': universities, 'cities': cities})
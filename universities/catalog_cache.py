@@ -0,0 +1,316 @@
+"""
+Кэш справочных данных каталога
+
+Регионы, типы вузов, список городов, топ вузов и статистика главной страницы
+читаются почти в каждом запросе и меняются редко. Они хранятся в кэше Django
+(по умолчанию LocMemCache - память процесса) на CATALOG_CACHE_TIMEOUT секунд
+и сбрасываются сигналами при изменении данных (universities/signals.py).
+
+Небольшие справочные таблицы (REFERENCE_TABLES: регионы, типы вузов, названия
+вузов) хранятся объектами моделей в памяти процесса и используются для выбора
+в формах и подстановки связанных объектов без запросов к БД. Каждая таблица
+имеет версию в кэше Django: сигнал увеличивает версию, и процесс перечитывает
+таблицу при следующем обращении. С общим кэшем (REDIS_URL) изменение видят все
+воркеры сразу, с LocMemCache - остальные воркеры через CATALOG_CACHE_TIMEOUT.
+
+warm_catalog_cache() заполняет кэш и загружает шаблоны и URL при старте
+воркера (см. post_worker_init в gunicorn_config.py), чтобы первый запрос после
+перезапуска воркера (max_requests) не платил за холодный кэш.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Region, UniversityType, University, Faculty, Program, UniversityRating, DataVersion
+
+
+CACHE_PREFIX = 'catalog:'
+VERSION_PREFIX = CACHE_PREFIX + 'version:'
+
+# Шаблоны страниц каталога, компилируемые при прогреве
+WARM_TEMPLATES = [
+    'base.html',
+    'universities/home.html',
+    'universities/university_list.html',
+    'universities/university_detail.html',
+    'universities/comparison.html',
+    'universities/rating_leaderboard.html',
+    'universities/news_list.html',
+]
+
+
+def _timeout() -> int:
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+
+def _cached(name, loader):
+    return cache.get_or_set(CACHE_PREFIX + name, loader, _timeout())
+
+
+# Справочные таблицы в памяти процесса: имя -> запрос
+REFERENCE_TABLES = {
+    'regions': lambda: Region.objects.order_by('name'),
+    'university_types': lambda: UniversityType.objects.order_by('name'),
+    # Только название: выбор вуза в формах
+    'universities': lambda: University.objects.only('id', 'name').order_by('name'),
+}
+
+# Загруженные таблицы: имя -> (версия, момент устаревания, объекты, объекты по pk)
+_reference_data = {}
+
+# Отложенные сбросы кэша и версии данных (deferred_data_versions), None - применяются сразу
+_deferred = contextvars.ContextVar('catalog_deferred', default=None)
+
+
+def _reference_version(name):
+    # Начальная версия - текущее время, чтобы версия, вытесненная из кэша,
+    # не совпала с прежней
+    return cache.get_or_set(VERSION_PREFIX + name, time.time_ns, None)
+
+
+def _reference_versions(*names):
+    """Версии нескольких таблиц одним обращением к кэшу (get_many)"""
+    found = cache.get_many([VERSION_PREFIX + name for name in names])
+    return {
+        name: found[VERSION_PREFIX + name] if VERSION_PREFIX + name in found else _reference_version(name)
+        for name in names
+    }
+
+
+def _reference(name, version=None):
+    # version - уже прочитанная версия таблицы (attach_reference_objects
+    # читает версии один раз на список, а не на каждый объект)
+    if version is None:
+        version = _reference_version(name)
+    entry = _reference_data.get(name)
+    if entry is None or entry[0] != version or entry[1] < time.monotonic():
+        objects = list(REFERENCE_TABLES[name]())
+        entry = (version, time.monotonic() + _timeout(), objects, {obj.pk: obj for obj in objects})
+        _reference_data[name] = entry
+    return entry
+
+
+def get_reference_objects(name) -> List:
+    """Все объекты справочной таблицы в порядке сортировки"""
+    return _reference(name)[2]
+
+
+def get_reference_object(name, pk) -> Optional[object]:
+    """Объект справочной таблицы по первичному ключу (None, если нет)"""
+    return _reference(name)[3].get(pk)
+
+
+def bump_reference_version(name):
+    """Увеличивает версию таблицы: процессы перечитают ее при следующем обращении"""
+    try:
+        cache.incr(VERSION_PREFIX + name)
+    except ValueError:
+        cache.set(VERSION_PREFIX + name, time.time_ns(), None)
+    _reference_data.pop(name, None)
+
+
+def attach_reference_objects(universities):
+    """
+    Подставляет регион и тип вуза из справочных таблиц вместо отдельного
+    запроса на каждый вуз при обращении к university.region / university_type
+
+    Версии таблиц читаются из кэша один раз на вызов (с Redis - одно обращение
+    вместо двух на каждый вуз)
+    """
+    versions = _reference_versions('regions', 'university_types')
+    regions = _reference('regions', versions['regions'])[3]
+    university_types = _reference('university_types', versions['university_types'])[3]
+    for university in universities:
+        region = regions.get(university.region_id)
+        if region is not None:
+            university.region = region
+        university_type = university_types.get(university.university_type_id)
+        if university_type is not None:
+            university.university_type = university_type
+    return universities
+
+
+def get_regions():
+    """Регионы, отсортированные по названию"""
+    return get_reference_objects('regions')
+
+
+def get_university_types():
+    """Типы вузов, отсортированные по названию"""
+    return get_reference_objects('university_types')
+
+
+def get_cities():
+    """Уникальные города вузов (автодополнение в форме поиска)"""
+    return _cached('cities', lambda: list(
+        University.objects.values_list('city', flat=True).distinct().order_by('city')
+    ))
+
+
+def get_degree_levels():
+    """Уровни образования программ (фильтр поиска программ)"""
+    return _cached('degree_levels', lambda: list(
+        Program.objects.order_by('degree_level').values_list('degree_level', flat=True).distinct()
+    ))
+
+
+def get_education_forms(limit: int = 50):
+    """
+    Формы обучения - названия факультетов, к которым относится больше всего
+    программ (при импорте из Excel факультет = форма обучения)
+    """
+    return _cached(f'education_forms:{limit}', lambda: list(
+        Faculty.objects.order_by().values('name').annotate(
+            programs_count=Count('programs')
+        ).filter(programs_count__gt=0).order_by('-programs_count', 'name').values_list('name', flat=True)[:limit]
+    ))
+
+
+def get_top_universities(limit: int = 6):
+    """Топ вузов по отзывам пользователей (главная страница)"""
+    return _cached(f'top_universities:{limit}', lambda: list(
+        University.objects.select_related('region', 'university_type').annotate(
+            avg_rating=Avg('ratings__rating'),
+            ratings_count=Count('ratings')
+        ).filter(ratings_count__gte=1).order_by('-avg_rating')[:limit]
+    ))
+
+
+def get_catalog_stats() -> Dict[str, int]:
+    """Статистика главной страницы"""
+    return _cached('stats', lambda: {
+        'total_universities': University.objects.count(),
+        'total_regions': Region.objects.count(),
+        'total_ratings': UniversityRating.objects.count(),
+    })
+
+
+# Наборы данных в кэше Django, загружаемые при прогреве
+HOT_DATASETS = {
+    'cities': get_cities,
+    'degree_levels': get_degree_levels,
+    'education_forms:50': get_education_forms,
+    'top_universities:6': get_top_universities,
+    'stats': get_catalog_stats,
+}
+
+
+def invalidate_catalog_cache(*names):
+    """Сбрасывает указанные наборы данных и справочные таблицы (по умолчанию все)"""
+    names = names or [*REFERENCE_TABLES, *HOT_DATASETS]
+    deferred = _deferred.get()
+    if deferred is not None:
+        deferred['cache'].update(names)
+        return
+    for name in names:
+        if name in REFERENCE_TABLES:
+            bump_reference_version(name)
+    cache.delete_many([CACHE_PREFIX + name for name in names if name not in REFERENCE_TABLES])
+
+
+def warm_catalog_cache() -> Dict[str, float]:
+    """
+    Загружает справочные таблицы и данные в кэш, компилирует шаблоны и URL
+
+    Returns:
+        Время загрузки каждого набора данных в миллисекундах
+    """
+    timings = {}
+
+    for name in REFERENCE_TABLES:
+        start = time.perf_counter()
+        _reference_data.pop(name, None)
+        get_reference_objects(name)
+        timings[name] = (time.perf_counter() - start) * 1000
+
+    for name, loader in HOT_DATASETS.items():
+        start = time.perf_counter()
+        cache.delete(CACHE_PREFIX + name)
+        loader()
+        timings[name] = (time.perf_counter() - start) * 1000
+
+    # Снимок каталога для фильтрации списка вузов (импорт здесь - модуль снимка использует этот модуль)
+    from .catalog_snapshot import get_snapshot
+    start = time.perf_counter()
+    get_snapshot()
+    timings['snapshot'] = (time.perf_counter() - start) * 1000
+
+    # Индекс координат для поиска ближайших вузов и кластеры карты
+    from .geo import get_geo_index
+    from .map_clusters import get_map_clusters
+    start = time.perf_counter()
+    get_geo_index()
+    get_map_clusters()
+    timings['geo'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for template_name in WARM_TEMPLATES:
+        get_template(template_name)
+    timings['templates'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    # Импорт URLconf и построение словарей reverse()
+    reverse('universities:home')
+    timings['urls'] = (time.perf_counter() - start) * 1000
+
+    return timings
+
+
+def bump_data_version(name):
+    """Увеличивает версию набора данных в БД"""
+    deferred = _deferred.get()
+    if deferred is not None:
+        deferred['versions'].add(name)
+        return
+    versions = DataVersion.objects.filter(name=name)
+    if not versions.update(version=F('version') + 1, updated_at=timezone.now()):
+        _, created = DataVersion.objects.get_or_create(name=name, defaults={'version': 1})
+        if not created:
+            versions.update(version=F('version') + 1, updated_at=timezone.now())
+
+
+@contextmanager
+def deferred_data_versions():
+    """
+    Откладывает bump_data_version и invalidate_catalog_cache до выхода из блока
+
+    Массовые команды (импорт, геокодирование, обновление рейтингов, пересчеты)
+    сохраняют строки по одной, и сигнал каждой строки увеличивал бы версию
+    (UPDATE) и делал устаревшими снимок каталога, гео-индекс и кластеры карты
+    во всех воркерах. Внутри блока изменения только запоминаются, на выходе
+    (в том числе при ошибке - часть данных уже сохранена) каждый кэш
+    сбрасывается и каждая версия увеличивается один раз. Вложенные блоки
+    применяются внешним. Используется и как декоратор handle() команд.
+    """
+    if _deferred.get() is not None:
+        yield
+        return
+    deferred = {'cache': set(), 'versions': set()}
+    token = _deferred.set(deferred)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+        if deferred['cache']:
+            invalidate_catalog_cache(*sorted(deferred['cache']))
+        for name in sorted(deferred['versions']):
+            bump_data_version(name)
+
+
+def get_data_versions(*names) -> Dict[str, Tuple[int, Optional[object]]]:
+    """Версии и время изменения наборов данных одним запросом: имя -> (версия, updated_at)"""
+    rows = {
+        name: (version, updated_at)
+        for name, version, updated_at in DataVersion.objects.filter(
+            name__in=names
+        ).values_list('name', 'version', 'updated_at')
+    }
+    return {name: rows.get(name, (0, None)) for name in names}
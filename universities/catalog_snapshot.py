@@ -0,0 +1,220 @@
+"""
+Снимок каталога вузов в памяти процесса (массивы NumPy)
+
+Для каждого вуза хранятся регион, тип, статус, средняя оценка, количество
+отзывов и программ, минимальная стоимость обучения, название и город. Фильтры
+формы поиска (UniversitySearchForm) и сортировка списка выполняются операциями
+над массивами, из БД загружаются только вузы видимой страницы (12-24 строки)
+вместо агрегирующего запроса с JOIN отзывов, факультетов и программ по всему
+каталогу.
+
+Снимок строится тремя запросами и перестраивается, когда меняется версия
+данных вузов, отзывов или программ (DataVersion, universities/signals.py);
+проверка версии - один запрос на обращение.
+
+NumPy - необязательная зависимость (устанавливается вместе с pandas). Без него
+или при CATALOG_SNAPSHOT=False get_snapshot() возвращает None, и представления
+используют запросы ORM.
+"""
+import time
+from typing import List, Optional
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Avg, Count, F, Min
+
+from .catalog_cache import attach_reference_objects, get_data_versions
+from .models import University, UniversityRating, Program
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Наборы данных DataVersion, от которых зависит снимок
+VERSIONS = ('universities', 'ratings', 'programs')
+
+# Сортировка списка вузов (UniversitySearchForm.sort)
+SORT_CHOICES = [
+    ('rating', 'По рейтингу'),
+    ('popular', 'Сначала популярные'),
+]
+
+# Текущий снимок процесса: 'current' -> CatalogSnapshot
+_snapshot = {}
+
+
+def _fold(value):
+    """Строка для поиска без учета регистра (в том числе кириллицы)"""
+    return value.casefold()
+
+
+class CatalogSnapshot:
+    """
+    Столбцы каталога: элемент i каждого массива относится к вузу ids[i]
+    
+    rating_order и name_order - номера строк в порядке сортировки списка
+    (по оценке, числу программ, названию) и страницы сравнения (по названию)
+    """
+    
+    def __init__(self, version, rows, ratings, programs):
+        self.version = version
+        count = len(rows)
+        self.ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+        self.row = {university_id: position for position, university_id in enumerate(self.ids.tolist())}
+        self.region = np.fromiter((row[1] for row in rows), dtype=np.int64, count=count)
+        self.university_type = np.fromiter((row[2] for row in rows), dtype=np.int64, count=count)
+        self.is_public = np.fromiter((row[3] for row in rows), dtype=bool, count=count)
+        self.names = np.array([_fold(row[4]) for row in rows], dtype=str)
+        self.cities = np.array([_fold(row[5]) for row in rows], dtype=str)
+        
+        # Вузы без отзывов и программ - NaN (как NULL в аннотациях ORM)
+        self.avg_rating = np.full(count, np.nan)
+        self.ratings_count = np.zeros(count, dtype=np.int64)
+        for university_id, avg, ratings_count in ratings:
+            position = self.row.get(university_id)
+            if position is not None:
+                self.avg_rating[position] = avg
+                self.ratings_count[position] = ratings_count
+        self.programs_count = np.zeros(count, dtype=np.int64)
+        self.min_fee = np.full(count, np.nan)
+        for university_id, programs_count, min_fee in programs:
+            position = self.row.get(university_id)
+            if position is not None:
+                self.programs_count[position] = programs_count
+                if min_fee is not None:
+                    self.min_fee[position] = min_fee
+        
+        # Ранг названия: строки rows уже упорядочены по названию и id
+        name_rank = np.arange(count)
+        self.name_order = name_rank
+        # np.lexsort: последний ключ - основной. Вузы без оценки - в конце
+        rating_key = np.where(np.isnan(self.avg_rating), np.inf, -self.avg_rating)
+        self.rating_order = np.lexsort((name_rank, -self.programs_count, rating_key))
+        # Порядок по просмотрам: (момент устаревания, номера строк), см. popular_order()
+        self._popular = None
+    
+    @staticmethod
+    def source_queries():
+        """Запросы данных снимка: вузы по названию, оценки и программы по вузам"""
+        rows = University.objects.order_by('name', 'id').values_list(
+            'id', 'region_id', 'university_type_id', 'is_public', 'name', 'city'
+        )
+        ratings = UniversityRating.objects.order_by().values('university_id').annotate(
+            avg=Avg('rating'), count=Count('id')
+        ).values_list('university_id', 'avg', 'count')
+        programs = Program.objects.order_by().values(
+            university_id=F('faculty__university_id')
+        ).annotate(count=Count('id'), min_fee=Min('tuition_fee')).values_list('university_id', 'count', 'min_fee')
+        return rows, ratings, programs
+    
+    @staticmethod
+    def popular_ids():
+        """id вузов по убыванию просмотров (индекс univ_views_count_idx, без сортировки в запросе)"""
+        return University.objects.order_by('-views_count', 'name', 'id').values_list('id', flat=True)
+    
+    @classmethod
+    def build(cls, version):
+        """Снимок по данным БД (3 запроса)"""
+        rows, ratings, programs = cls.source_queries()
+        return cls(version, list(rows), list(ratings), list(programs))
+    
+    def mask(self, cleaned_data, annotated_filters=True):
+        """
+        Строки, удовлетворяющие фильтрам формы UniversitySearchForm.
+        annotated_filters=False - только базовые фильтры (apply_university_filters)
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+        if cleaned_data.get('name'):
+            mask &= np.char.find(self.names, _fold(cleaned_data['name'])) >= 0
+        if cleaned_data.get('region'):
+            mask &= self.region == cleaned_data['region'].pk
+        if cleaned_data.get('city'):
+            mask &= np.char.find(self.cities, _fold(cleaned_data['city'])) >= 0
+        if cleaned_data.get('university_type'):
+            mask &= self.university_type == cleaned_data['university_type'].pk
+        if cleaned_data.get('is_public'):
+            mask &= self.is_public
+        if not annotated_filters:
+            return mask
+        
+        # Сравнение с NaN дает False: вузы без отзывов не проходят фильтр оценки
+        if cleaned_data.get('min_rating'):
+            mask &= self.avg_rating >= cleaned_data['min_rating']
+        if cleaned_data.get('min_programs'):
+            mask &= self.programs_count >= cleaned_data['min_programs']
+        if cleaned_data.get('max_tuition'):
+            # Как в ORM: минимальная стоимость не выше порога или неизвестна
+            mask &= np.isnan(self.min_fee) | (self.min_fee <= cleaned_data['max_tuition'])
+        return mask
+    
+    def popular_order(self):
+        """
+        Номера строк по убыванию просмотров страницы, затем по названию
+        
+        Просмотры меняются без версии данных (view_counters.py), поэтому
+        порядок перечитывается (1 запрос) не чаще, чем они сохраняются в БД
+        """
+        popular = self._popular
+        if popular is None or popular[0] < time.monotonic():
+            rows = [self.row[university_id] for university_id in self.popular_ids() if university_id in self.row]
+            interval = getattr(settings, 'VIEW_COUNTERS_FLUSH_INTERVAL', 30)
+            popular = (time.monotonic() + interval, np.array(rows, dtype=np.int64))
+            self._popular = popular
+        return popular[1]
+    
+    def search(self, cleaned_data, order='rating', annotated_filters=True):
+        """id вузов, удовлетворяющих фильтрам, в порядке order ('rating', 'popular' или 'name')"""
+        if order == 'popular':
+            rows = self.popular_order()
+        else:
+            rows = self.rating_order if order == 'rating' else self.name_order
+        mask = self.mask(cleaned_data, annotated_filters)
+        return self.ids[rows[mask[rows]]]
+    
+    def hydrate(self, ids) -> List[University]:
+        """
+        Вузы по списку id в том же порядке (1 запрос) с атрибутами аннотаций
+        списка: avg_rating, ratings_count, programs_count, min_tuition_fee
+        """
+        ids = [int(university_id) for university_id in ids]
+        universities = University.objects.in_bulk(ids)
+        result = []
+        for university_id in ids:
+            university = universities.get(university_id)
+            if university is None:
+                continue
+            position = self.row[university_id]
+            avg_rating = self.avg_rating[position]
+            min_fee = self.min_fee[position]
+            university.avg_rating = None if np.isnan(avg_rating) else float(avg_rating)
+            university.ratings_count = int(self.ratings_count[position])
+            university.programs_count = int(self.programs_count[position])
+            university.min_tuition_fee = None if np.isnan(min_fee) else int(min_fee)
+            result.append(university)
+        return attach_reference_objects(result)
+
+
+def get_snapshot() -> Optional[CatalogSnapshot]:
+    """Актуальный снимок каталога (None, если NumPy не установлен или снимок отключен)"""
+    if np is None or not getattr(settings, 'CATALOG_SNAPSHOT', True):
+        return None
+    versions = get_data_versions(*VERSIONS)
+    version = tuple(versions[name][0] for name in VERSIONS)
+    snapshot = _snapshot.get('current')
+    if snapshot is None or snapshot.version != version:
+        snapshot = CatalogSnapshot.build(version)
+        _snapshot['current'] = snapshot
+    return snapshot
+
+
+def paginate_universities(snapshot, cleaned_data, per_page, page_number, order='rating', annotated_filters=True):
+    """
+    Страница списка вузов по снимку: Paginator по массиву id, объекты
+    загружаются только для вузов страницы
+    """
+    paginator = Paginator(snapshot.search(cleaned_data, order, annotated_filters), per_page)
+    page_obj = paginator.get_page(page_number)
+    page_obj.object_list = snapshot.hydrate(page_obj.object_list)
+    return page_obj
@@ -0,0 +1,191 @@
+"""
+Сравнение университетов
+
+build_comparison() загружает выбранные вузы, факультеты и программы
+фиксированным числом запросов (независимо от количества вузов) и строит
+матрицу сравнения в памяти: статистика программ, рейтинги с отклонением от
+лучшего значения, общие и уникальные программы (по нормализованному названию)
+с разницей стоимости обучения.
+
+Результат кэшируется по отсортированному списку id и версиям данных
+(DataVersion), поэтому /compare/3,1,2/ и /compare/1,2,3/ используют одну запись,
+а изменение вузов, отзывов или программ сбрасывает ее.
+"""
+import re
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, F
+
+from .catalog_cache import CACHE_PREFIX, get_data_versions
+from .models import University, Faculty, Program
+
+
+MIN_UNIVERSITIES = 2
+MAX_UNIVERSITIES = 5
+
+# Время жизни записи в кэше; актуальность обеспечивают версии данных в ключе
+COMPARISON_CACHE_TIMEOUT = 60 * 60
+
+# Рейтинги для сравнения: атрибут вуза -> подпись
+RATING_METRICS = [
+    ('avg_rating', 'Отзывы пользователей'),
+    ('yandex_rating', 'Яндекс Карты'),
+    ('google_rating', 'Google'),
+    ('tabiturient_rating', 'Табитуриент.ру'),
+]
+
+
+def normalize_program_name(name: str) -> str:
+    """Название программы для сопоставления: регистр, ё, кавычки, пробелы"""
+    name = name.lower().replace('ё', 'е')
+    name = re.sub(r'["«»\'“”.,;:()]+', ' ', name)
+    return ' '.join(name.split())
+
+
+def parse_university_ids(value: str) -> List[int]:
+    """
+    Список id из URL (через запятую) без повторов, в порядке возрастания
+    
+    Raises:
+        ValueError: если id не число или количество вне допустимого диапазона
+    """
+    ids = sorted({int(item) for item in value.split(',') if item.strip()})
+    if not MIN_UNIVERSITIES <= len(ids) <= MAX_UNIVERSITIES:
+        raise ValueError(f'Выберите от {MIN_UNIVERSITIES} до {MAX_UNIVERSITIES} университетов')
+    return ids
+
+
+def _delta_cells(values, best):
+    """Ячейки строки: значение, отклонение от лучшего, признак лучшего"""
+    present = [value for value in values if value is not None]
+    target = best(present) if present else None
+    return [
+        {
+            'value': value,
+            'delta': value - target if value is not None else None,
+            'is_best': value is not None and value == target and len(present) > 1,
+        }
+        for value in values
+    ]
+
+
+def _program_stats(universities, programs, faculty_counts):
+    stats = []
+    for university in universities:
+        fees = [p['tuition_fee'] for p in programs if p['university_id'] == university.id and p['tuition_fee']]
+        count = sum(1 for p in programs if p['university_id'] == university.id)
+        stats.append({
+            'faculties_count': faculty_counts.get(university.id, 0),
+            'programs_count': count,
+            'min_fee': min(fees) if fees else None,
+            'avg_fee': round(sum(fees) / len(fees)) if fees else None,
+            'max_fee': max(fees) if fees else None,
+        })
+    return stats
+
+
+def _program_matrix(universities, programs):
+    """
+    Строки матрицы программ: одна строка на нормализованное название,
+    ячейки - по вузам (минимальная стоимость, уровни, срок) или None
+    """
+    index = {university.id: position for position, university in enumerate(universities)}
+    rows = {}
+    for program in programs:
+        key = normalize_program_name(program['name'])
+        row = rows.setdefault(key, {'name': program['name'], 'cells': [None] * len(universities)})
+        position = index[program['university_id']]
+        cell = row['cells'][position]
+        if cell is None:
+            cell = row['cells'][position] = {'fee': None, 'degree_levels': set(), 'duration_years': set(), 'count': 0}
+        cell['count'] += 1
+        cell['degree_levels'].add(program['degree_level'])
+        cell['duration_years'].add(program['duration_years'])
+        if program['tuition_fee'] and (cell['fee'] is None or program['tuition_fee'] < cell['fee']):
+            cell['fee'] = program['tuition_fee']
+    
+    result = []
+    for row in rows.values():
+        present = [cell for cell in row['cells'] if cell is not None]
+        fees = [cell['fee'] for cell in present if cell['fee'] is not None]
+        min_fee = min(fees) if fees else None
+        for cell in present:
+            cell['degree_levels'] = ', '.join(sorted(cell['degree_levels']))
+            cell['duration_years'] = ', '.join(str(years) for years in sorted(cell['duration_years']))
+            cell['fee_delta'] = cell['fee'] - min_fee if cell['fee'] is not None and min_fee is not None else None
+            cell['is_cheapest'] = cell['fee'] is not None and cell['fee'] == min_fee and len(fees) > 1
+        row['universities_count'] = len(present)
+        row['is_common'] = len(present) == len(universities)
+        row['is_unique'] = len(present) == 1
+        result.append(row)
+    
+    # Сначала общие для большего числа вузов, затем по названию
+    result.sort(key=lambda row: (-row['universities_count'], row['name'].lower()))
+    return result
+
+
+def _build(ids):
+    universities = list(
+        University.objects.filter(id__in=ids).select_related('region', 'university_type').annotate(
+            avg_rating=Avg('ratings__rating'),
+            ratings_count=Count('ratings'),
+        ).order_by('id')
+    )
+    if len(universities) < MIN_UNIVERSITIES:
+        return None
+    
+    faculty_counts = dict(
+        Faculty.objects.filter(university_id__in=ids).order_by().values('university_id').annotate(
+            count=Count('id')
+        ).values_list('university_id', 'count')
+    )
+    programs = list(
+        Program.objects.filter(faculty__university_id__in=ids).values(
+            'name', 'degree_level', 'duration_years', 'tuition_fee', university_id=F('faculty__university_id')
+        )
+    )
+    
+    matrix = _program_matrix(universities, programs)
+    stats = _program_stats(universities, programs, faculty_counts)
+    fee_cells = _delta_cells([item['min_fee'] for item in stats], min)
+    columns = [
+        {
+            'university': university,
+            'stats': stats[position],
+            'min_fee': fee_cells[position],
+            'unique_programs': sum(
+                1 for row in matrix if row['is_unique'] and row['cells'][position] is not None
+            ),
+        }
+        for position, university in enumerate(universities)
+    ]
+    ratings = [
+        {'label': label, 'cells': _delta_cells([getattr(u, attribute) for u in universities], max)}
+        for attribute, label in RATING_METRICS
+    ]
+    return {
+        'universities': universities,
+        'columns': columns,
+        'ratings': ratings,
+        'programs': matrix,
+        'common_count': sum(1 for row in matrix if row['is_common']),
+    }
+
+
+def build_comparison(ids: List[int]) -> Optional[Dict]:
+    """
+    Матрица сравнения вузов (ids - результат parse_university_ids) из кэша
+    или из БД: 1 запрос при попадании в кэш, 4 - при промахе.
+    None, если найдено меньше двух вузов
+    """
+    versions = get_data_versions('universities', 'ratings', 'programs')
+    key = CACHE_PREFIX + 'compare:' + ','.join(map(str, ids)) + ':' + ':'.join(
+        str(version) for version, _ in versions.values()
+    )
+    comparison = cache.get(key)
+    if comparison is None:
+        comparison = _build(ids)
+        if comparison is not None:
+            cache.set(key, comparison, COMPARISON_CACHE_TIMEOUT)
+    return comparison
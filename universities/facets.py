@@ -0,0 +1,176 @@
+"""
+Счетчики фильтров каталога (фасеты)
+
+Для текущего состояния формы UniversitySearchForm считается, сколько вузов
+будет найдено при выборе каждого региона, типа вуза, статуса
+(государственный/негосударственный) и порога стоимости обучения.
+
+Все счетчики строятся из одного запроса с GROUP BY (регион, тип, статус,
+диапазон стоимости): вузы отфильтрованы только нефасетными полями формы
+(название, город, рейтинг, количество программ), фасетные фильтры применяются
+к сгруппированным строкам в памяти. Счетчик каждого фасета учитывает все
+фильтры, кроме собственного, - так число рядом с вариантом совпадает с
+количеством результатов после его выбора.
+
+Результат запроса кэшируется по нормализованным нефасетным фильтрам и версиям
+данных (DataVersion): переключение региона или типа не выполняет запрос заново.
+"""
+import hashlib
+from typing import Dict
+
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Min, OuterRef, Subquery, Value, When
+
+from .catalog_cache import CACHE_PREFIX, get_data_versions, get_reference_objects
+from .models import University, Program
+
+
+# Пороги фильтра max_tuition, для которых показываются счетчики
+TUITION_THRESHOLDS = [100000, 200000, 300000, 500000]
+
+ABOVE_THRESHOLDS = 2 ** 31 - 1
+
+FACETS_CACHE_TIMEOUT = 60 * 60
+
+# Поля формы, которые фильтруют вузы в SQL (остальные - фасеты)
+QUERY_FIELDS = ['name', 'city', 'min_rating', 'min_programs']
+
+
+def _program_subquery(aggregate):
+    return Subquery(
+        Program.objects.filter(faculty__university=OuterRef('pk')).order_by().values(
+            'faculty__university'
+        ).annotate(value=aggregate).values('value')[:1]
+    )
+
+
+def _tuition_bucket(field, thresholds):
+    """
+    Верхняя граница диапазона минимальной стоимости: первый порог не меньше
+    стоимости, ABOVE_THRESHOLDS - выше всех порогов, None - стоимость неизвестна
+    """
+    return Case(
+        *(When(**{f'{field}__lte': threshold}, then=Value(threshold)) for threshold in thresholds),
+        When(**{f'{field}__isnull': False}, then=Value(ABOVE_THRESHOLDS)),
+        default=None,
+        output_field=IntegerField(),
+    )
+
+
+def _query_filters(cleaned_data):
+    """
+    Нефасетные фильтры без пустых значений и пороги стоимости (ключ кэша).
+    Нестандартное значение max_tuition добавляется к порогам, чтобы
+    фильтр по нему применялся к сгруппированным строкам точно
+    """
+    filters = {name: cleaned_data[name] for name in QUERY_FIELDS if cleaned_data.get(name)}
+    thresholds = set(TUITION_THRESHOLDS)
+    if cleaned_data.get('max_tuition'):
+        thresholds.add(cleaned_data['max_tuition'])
+    filters['thresholds'] = sorted(thresholds)
+    return filters
+
+
+def _grouped_counts(filters):
+    """
+    Строки (region_id, university_type_id, is_public, граница диапазона стоимости,
+    количество) для вузов, удовлетворяющих нефасетным фильтрам
+    """
+    universities = University.objects.annotate(min_fee=_program_subquery(Min('tuition_fee')))
+    if filters.get('name'):
+        universities = universities.filter(name__icontains=filters['name'])
+    if filters.get('city'):
+        universities = universities.filter(city__icontains=filters['city'])
+    if filters.get('min_rating'):
+        # users_rating - средняя оценка, хранимая в вузе (University.update_users_rating)
+        universities = universities.filter(users_rating__gte=filters['min_rating'])
+    if filters.get('min_programs'):
+        universities = universities.annotate(
+            programs_count=_program_subquery(Count('id'))
+        ).filter(programs_count__gte=filters['min_programs'])
+    
+    return list(
+        universities.annotate(bucket=_tuition_bucket('min_fee', filters['thresholds'])).order_by().values_list(
+            'region_id', 'university_type_id', 'is_public', 'bucket'
+        ).annotate(count=Count('id'))
+    )
+
+
+def get_grouped_counts(cleaned_data):
+    """Сгруппированные счетчики из кэша или из БД (1 запрос версий + 1 запрос при промахе)"""
+    filters = _query_filters(cleaned_data)
+    versions = get_data_versions('universities', 'ratings', 'programs')
+    key = '|'.join([
+        repr(sorted(filters.items())),
+        ':'.join(str(version) for version, _ in versions.values()),
+    ])
+    key = CACHE_PREFIX + 'facets:' + hashlib.sha1(key.encode()).hexdigest()
+    rows = cache.get(key)
+    if rows is None:
+        rows = _grouped_counts(filters)
+        cache.set(key, rows, FACETS_CACHE_TIMEOUT)
+    return rows
+
+
+def _matches_tuition(bucket, max_tuition):
+    # Как в university_list_view: минимальная стоимость не выше порога или неизвестна
+    return bucket is None or bucket <= max_tuition
+
+
+def get_facet_counts(cleaned_data) -> Dict:
+    """
+    Счетчики фасетов для списка вузов
+    
+    cleaned_data - данные валидной формы UniversitySearchForm (или {})
+    """
+    region = cleaned_data.get('region')
+    university_type = cleaned_data.get('university_type')
+    is_public = bool(cleaned_data.get('is_public'))
+    max_tuition = cleaned_data.get('max_tuition') or None
+    
+    rows = get_grouped_counts(cleaned_data)
+    
+    def total(skip):
+        counts = {}
+        for region_id, type_id, public, bucket, count in rows:
+            if skip != 'region' and region and region_id != region.pk:
+                continue
+            if skip != 'university_type' and university_type and type_id != university_type.pk:
+                continue
+            if skip != 'is_public' and is_public and not public:
+                continue
+            if skip != 'max_tuition' and max_tuition is not None and not _matches_tuition(bucket, max_tuition):
+                continue
+            value = {'region': region_id, 'university_type': type_id, 'is_public': public, 'max_tuition': bucket}[skip]
+            counts[value] = counts.get(value, 0) + count
+        return counts
+    
+    region_counts = total('region')
+    type_counts = total('university_type')
+    public_counts = total('is_public')
+    bucket_counts = total('max_tuition')
+    
+    tuition = [
+        {
+            'value': threshold,
+            'count': sum(count for bucket, count in bucket_counts.items() if _matches_tuition(bucket, threshold)),
+            'selected': max_tuition == threshold,
+        }
+        for threshold in TUITION_THRESHOLDS
+    ]
+    
+    return {
+        'regions': [
+            {'id': item.pk, 'name': item.name, 'count': region_counts.get(item.pk, 0),
+             'selected': region is not None and region.pk == item.pk}
+            for item in get_reference_objects('regions')
+        ],
+        'university_types': [
+            {'id': item.pk, 'name': item.name, 'count': type_counts.get(item.pk, 0),
+             'selected': university_type is not None and university_type.pk == item.pk}
+            for item in get_reference_objects('university_types')
+        ],
+        'public': public_counts.get(True, 0),
+        'private': public_counts.get(False, 0),
+        'tuition': tuition,
+    }
@@ -1,7 +1,61 @@
+import copy
+
 from django import forms
+from django.forms.models import ModelChoiceIterator
+from .catalog_cache import get_reference_objects, get_reference_object, get_degree_levels, get_education_forms
+from .geo import DEFAULT_NEAREST_COUNT, MAX_NEAREST_COUNT
+from .map_clusters import MAX_ZOOM
+from .program_search import SORT_CHOICES as PROGRAM_SORT_CHOICES
+from .catalog_snapshot import SORT_CHOICES as UNIVERSITY_SORT_CHOICES
 from .models import University, UniversityRating, UniversityComparison, Region, UniversityType, UniversityRepresentative
 
 
+class CachedModelChoiceIterator(ModelChoiceIterator):
+    """Варианты выбора из справочной таблицы в памяти процесса"""
+    
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in get_reference_objects(self.field.table):
+            yield self.choice(obj)
+    
+    def __len__(self):
+        return len(get_reference_objects(self.field.table)) + (1 if self.field.empty_label is not None else 0)
+    
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(get_reference_objects(self.field.table))
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField, варианты и проверка значения которого берутся из справочной
+    таблицы (universities/catalog_cache.py) без запросов к БД
+    """
+    iterator = CachedModelChoiceIterator
+    
+    def __init__(self, table, **kwargs):
+        self.table = table
+        super().__init__(**kwargs)
+    
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        try:
+            obj = get_reference_object(self.table, int(value))
+        except (TypeError, ValueError):
+            obj = None
+        if obj is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        # Копия, чтобы изменения в запросе не попали в общий кэш
+        return copy.copy(obj)
+
+
 class UniversitySearchForm(forms.Form):
     """Форма поиска университетов"""
     name = forms.CharField(
@@ -10,7 +64,8 @@ class UniversitySearchForm(forms.Form):
         label="Название университета",
         widget=forms.TextInput(attrs={'placeholder': 'Введите название университета', 'class': 'form-control'})
     )
-    region = forms.ModelChoiceField(
+    region = CachedModelChoiceField(
+        'regions',
         queryset=Region.objects.all().order_by('name'),
         required=False,
         empty_label="Все регионы",
@@ -23,7 +78,8 @@ class UniversitySearchForm(forms.Form):
         label="Город",
         widget=forms.TextInput(attrs={'placeholder': 'Введите город', 'class': 'form-control', 'list': 'cities-list'})
     )
-    university_type = forms.ModelChoiceField(
+    university_type = CachedModelChoiceField(
+        'university_types',
         queryset=UniversityType.objects.all().order_by('name'),
         required=False,
         empty_label="Все типы",
@@ -48,12 +104,117 @@ class UniversitySearchForm(forms.Form):
         label="Минимум программ",
         widget=forms.NumberInput(attrs={'min': 0, 'class': 'form-control', 'placeholder': '0'})
     )
+    max_tuition = forms.IntegerField(
+        required=False,
+        min_value=0,
+        label="Максимальная стоимость (руб/год)",
+        widget=forms.NumberInput(attrs={'min': 0, 'class': 'form-control', 'placeholder': 'Любая', 'list': 'tuition-list'})
+    )
+    sort = forms.ChoiceField(
+        choices=UNIVERSITY_SORT_CHOICES,
+        required=False,
+        label="Сортировка",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+
+class ProgramSearchForm(forms.Form):
+    """Форма поиска образовательных программ по всем вузам"""
+    q = forms.CharField(
+        max_length=200,
+        required=False,
+        label="Программа или специальность",
+        widget=forms.TextInput(attrs={'placeholder': 'Например: прикладная математика', 'class': 'form-control'})
+    )
+    degree_level = forms.ChoiceField(
+        choices=lambda: [('', 'Любой')] + [(level, level) for level in get_degree_levels()],
+        required=False,
+        label="Уровень образования",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    education_form = forms.ChoiceField(
+        choices=lambda: [('', 'Любая')] + [(name, name) for name in get_education_forms()],
+        required=False,
+        label="Форма обучения",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    city = forms.CharField(
+        max_length=100,
+        required=False,
+        label="Город",
+        widget=forms.TextInput(attrs={'placeholder': 'Введите город', 'class': 'form-control', 'list': 'cities-list'})
+    )
+    region = CachedModelChoiceField(
+        'regions',
+        queryset=Region.objects.all().order_by('name'),
+        required=False,
+        empty_label="Все регионы",
+        label="Регион",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
     max_tuition = forms.IntegerField(
         required=False,
         min_value=0,
         label="Максимальная стоимость (руб/год)",
         widget=forms.NumberInput(attrs={'min': 0, 'class': 'form-control', 'placeholder': 'Любая'})
     )
+    # Специальность из справочника (ссылка с кода специальности в результатах)
+    specialty = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput)
+    sort = forms.ChoiceField(
+        choices=PROGRAM_SORT_CHOICES,
+        required=False,
+        label="Сортировка",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+
+class NearbySearchForm(forms.Form):
+    """Форма поиска ближайших вузов по координатам точки"""
+    lat = forms.FloatField(
+        min_value=-90,
+        max_value=90,
+        label="Широта",
+        widget=forms.NumberInput(attrs={'step': 'any', 'class': 'form-control', 'placeholder': '55.7558'})
+    )
+    lng = forms.FloatField(
+        min_value=-180,
+        max_value=180,
+        label="Долгота",
+        widget=forms.NumberInput(attrs={'step': 'any', 'class': 'form-control', 'placeholder': '37.6173'})
+    )
+    k = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=MAX_NEAREST_COUNT,
+        label="Количество вузов",
+        widget=forms.NumberInput(attrs={'min': 1, 'max': MAX_NEAREST_COUNT, 'class': 'form-control',
+                                        'placeholder': DEFAULT_NEAREST_COUNT})
+    )
+    max_distance = forms.FloatField(
+        required=False,
+        min_value=0,
+        label="Не дальше (км)",
+        widget=forms.NumberInput(attrs={'min': 0, 'step': 'any', 'class': 'form-control', 'placeholder': 'Любое расстояние'})
+    )
+
+
+class MapClustersForm(forms.Form):
+    """Параметры запроса маркеров карты: масштаб и видимая область"""
+    zoom = forms.IntegerField(min_value=0, max_value=MAX_ZOOM)
+    # west,south,east,north в градусах (west > east - область через 180-й меридиан)
+    bbox = forms.CharField(required=False)
+    
+    def clean_bbox(self):
+        value = self.cleaned_data.get('bbox', '').strip()
+        if not value:
+            return (-180.0, -90.0, 180.0, 90.0)
+        try:
+            west, south, east, north = (float(item) for item in value.split(','))
+        except ValueError:
+            raise forms.ValidationError('Ожидается west,south,east,north')
+        if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+            raise forms.ValidationError('Координаты вне допустимого диапазона')
+        return (west, south, east, north)
 
 
 class UniversityRatingForm(forms.ModelForm):
@@ -150,21 +311,21 @@ class UniversityEditForm(forms.ModelForm):
 
 class BecomeRepresentativeForm(forms.ModelForm):
     """Форма для запроса на получение статуса представителя"""
+    university = CachedModelChoiceField(
+        'universities',
+        queryset=University.objects.all().order_by('name'),
+        label='Университет',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
     
     class Meta:
         model = UniversityRepresentative
         fields = ['university', 'position', 'phone']
         widgets = {
-            'university': forms.Select(attrs={'class': 'form-select'}),
             'position': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Например: Директор по маркетингу'}),
             'phone': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '+7 (XXX) XXX-XX-XX'}),
         }
         labels = {
-            'university': 'Университет',
             'position': 'Должность',
             'phone': 'Контактный телефон',
         }
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields['university'].queryset = University.objects.all().order_by('name')
@@ -0,0 +1,135 @@
+"""
+Поиск ближайших вузов по координатам
+
+Координаты вузов (University.latitude/longitude) сохраняются при обновлении
+рейтингов Яндекс/Google и командой geocode_universities. PostGIS/SpatiaLite
+в проекте не используются, поэтому поиск выполняется по пространственному
+индексу в памяти процесса (GeoIndex): вузы разложены по ячейкам сетки
+CELL_SIZE x CELL_SIZE градусов, для каждой ячейки известны центр и радиус
+(наибольшее расстояние от центра до вуза ячейки).
+
+Запрос просматривает ячейки в порядке нижней оценки расстояния
+(расстояние до центра минус радиус) и останавливается, когда оценка
+следующей ячейки больше расстояния до K-го найденного вуза, - результат
+точный, как при переборе всего каталога, но расстояния считаются только
+для вузов ближайших ячеек.
+
+Индекс строится одним запросом и перестраивается, когда меняется версия
+данных вузов (DataVersion 'universities').
+"""
+import heapq
+import math
+from typing import List, Tuple
+
+from .catalog_cache import attach_reference_objects, get_data_versions
+from .models import University
+
+
+EARTH_RADIUS_KM = 6371.0
+
+# Размер ячейки сетки в градусах (около 111 км по широте): вузы сосредоточены
+# в городах, и ячейки такого размера почти всегда содержат один город
+CELL_SIZE = 1.0
+
+DEFAULT_NEAREST_COUNT = 10
+MAX_NEAREST_COUNT = 50
+
+# Текущий индекс процесса: 'current' -> GeoIndex
+_index = {}
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    """Расстояние по дуге большого круга между двумя точками в километрах"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """
+    Сетка вузов с координатами
+    
+    cells: список (широта центра, долгота центра, радиус в км, точки ячейки),
+    точка - (id вуза, широта, долгота)
+    """
+    
+    def __init__(self, version, points, cell_size=CELL_SIZE):
+        self.version = version
+        self.size = len(points)
+        grid = {}
+        for point in points:
+            _, lat, lon = point
+            grid.setdefault((math.floor(lat / cell_size), math.floor(lon / cell_size)), []).append(point)
+        
+        self.cells = []
+        for cell_points in grid.values():
+            center_lat = sum(lat for _, lat, _ in cell_points) / len(cell_points)
+            center_lon = sum(lon for _, _, lon in cell_points) / len(cell_points)
+            radius = max(haversine_km(center_lat, center_lon, lat, lon) for _, lat, lon in cell_points)
+            self.cells.append((center_lat, center_lon, radius, cell_points))
+    
+    @classmethod
+    def build(cls, version):
+        """Индекс по данным БД (1 запрос)"""
+        points = University.objects.filter(
+            latitude__isnull=False, longitude__isnull=False
+        ).order_by('id').values_list('id', 'latitude', 'longitude')
+        return cls(version, list(points))
+    
+    def nearest(self, lat, lon, count=DEFAULT_NEAREST_COUNT, max_distance=None) -> List[Tuple[int, float]]:
+        """
+        count ближайших к точке вузов (не дальше max_distance км):
+        список (id вуза, расстояние в км) от ближнего к дальнему
+        """
+        bounds = []
+        for center_lat, center_lon, radius, cell_points in self.cells:
+            bound = max(0.0, haversine_km(lat, lon, center_lat, center_lon) - radius)
+            if max_distance is None or bound <= max_distance:
+                bounds.append((bound, cell_points))
+        bounds.sort(key=lambda item: item[0])
+        
+        # Куча из count ближайших найденных вузов: (-расстояние, -id)
+        found = []
+        for bound, cell_points in bounds:
+            if len(found) == count and bound > -found[0][0]:
+                break
+            for university_id, point_lat, point_lon in cell_points:
+                distance = haversine_km(lat, lon, point_lat, point_lon)
+                if max_distance is not None and distance > max_distance:
+                    continue
+                item = (-distance, -university_id)
+                if len(found) < count:
+                    heapq.heappush(found, item)
+                elif item > found[0]:
+                    heapq.heapreplace(found, item)
+        nearest = sorted((-distance, -university_id) for distance, university_id in found)
+        return [(university_id, distance) for distance, university_id in nearest]
+
+
+def get_geo_index() -> GeoIndex:
+    """Актуальный индекс координат вузов (1 запрос версии, перестройка при изменении вузов)"""
+    version = get_data_versions('universities')['universities'][0]
+    index = _index.get('current')
+    if index is None or index.version != version:
+        index = GeoIndex.build(version)
+        _index['current'] = index
+    return index
+
+
+def nearest_universities(lat, lon, count=DEFAULT_NEAREST_COUNT, max_distance=None) -> List[University]:
+    """
+    Ближайшие вузы (от ближнего к дальнему) с атрибутом distance_km
+    и регионом/типом из кэша справочников
+    """
+    nearest = get_geo_index().nearest(lat, lon, count, max_distance)
+    universities = University.objects.in_bulk([university_id for university_id, _ in nearest])
+    result = []
+    for university_id, distance in nearest:
+        university = universities.get(university_id)
+        if university is not None:
+            university.distance_km = round(distance, 2)
+            result.append(university)
+    return attach_reference_objects(result)
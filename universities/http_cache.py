@@ -0,0 +1,154 @@
+"""
+HTTP кэширование публичных страниц (conditional GET)
+
+ETag и Last-Modified страниц вуза и новости вычисляются небольшими запросами
+(время изменения вуза, последнего отзыва и новости, статистика программ,
+версии данных DataVersion). Если клиент или прокси прислал совпадающий
+If-None-Match / If-Modified-Since, ответ 304 возвращается до загрузки данных
+страницы и рендеринга шаблона.
+
+Для анонимных пользователей ответ публичный (Cache-Control: public, s-maxage),
+его может хранить CDN или обратный прокси; для авторизованных - private, а ETag
+включает пользователя и его отношение к вузу (избранное, представитель).
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+from .catalog_cache import get_data_versions
+from .models import University, UniversityRating, News, Program, UniversityRepresentative
+from accounts.models import FavoriteUniversity
+
+
+def _subquery(queryset, group_by, aggregate):
+    """Агрегат по связанным строкам вуза (queryset отфильтрован по OuterRef('pk'))"""
+    return Subquery(queryset.order_by().values(group_by).annotate(value=aggregate).values('value')[:1])
+
+
+def _validators(parts, timestamps):
+    """(ETag, Last-Modified) по списку значений состояния и меткам времени"""
+    key = '|'.join(str(part) for part in parts)
+    etag = quote_etag(hashlib.sha1(key.encode()).hexdigest())
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    return etag, max(timestamps) if timestamps else None
+
+
+def _user_parts(request):
+    user = request.user
+    if not user.is_authenticated:
+        return ['anonymous']
+    return [user.pk, user.get_full_name() or user.username]
+
+
+def university_page_validators(request, university_id):
+    """
+    Валидаторы страницы вуза: вуз, отзывы, новости, программы, версии данных
+    (названия регионов и типов, факультеты, похожие вузы) и состояние пользователя
+    """
+    ratings = UniversityRating.objects.filter(university=OuterRef('pk'))
+    news = News.objects.filter(university=OuterRef('pk'), is_published=True)
+    programs = Program.objects.filter(faculty__university=OuterRef('pk'))
+    state = University.objects.filter(pk=university_id).annotate(
+        ratings_updated=_subquery(ratings, 'university', Max('updated_at')),
+        ratings_count=_subquery(ratings, 'university', Count('id')),
+        news_updated=_subquery(news, 'university', Max('updated_at')),
+        news_count=_subquery(news, 'university', Count('id')),
+        programs_count=_subquery(programs, 'faculty__university', Count('id')),
+        programs_fee=_subquery(programs, 'faculty__university', Sum('tuition_fee')),
+    ).values_list(
+        'updated_at', 'ratings_updated', 'ratings_count', 'news_updated', 'news_count',
+        'programs_count', 'programs_fee',
+    ).first()
+    if state is None:
+        return None
+    
+    versions = get_data_versions('universities', 'programs', 'similar', 'recommendations')
+    parts = ['university', university_id, *state, *versions.values(), *_user_parts(request)]
+    if request.user.is_authenticated:
+        parts += [
+            FavoriteUniversity.objects.filter(user=request.user, university_id=university_id).exists(),
+            request.user.is_staff or request.user.is_superuser or UniversityRepresentative.objects.filter(
+                user=request.user, university_id=university_id, is_approved=True
+            ).exists(),
+        ]
+    timestamps = [state[0], state[1], state[3], *(updated_at for _, updated_at in versions.values())]
+    return _validators(parts, timestamps)
+
+
+def news_page_validators(request, news_id):
+    """Валидаторы страницы новости: новость, вуз, версия данных вузов"""
+    state = News.objects.filter(pk=news_id, is_published=True).values_list(
+        'updated_at', 'university__updated_at'
+    ).first()
+    if state is None:
+        return None
+    
+    version, version_updated = get_data_versions('universities')['universities']
+    parts = ['news', news_id, *state, version, *_user_parts(request)]
+    return _validators(parts, [*state, version_updated])
+
+
+def _check(validators_func, request, args, kwargs):
+    # Непоказанные сообщения (messages) выводятся в base.html - такой ответ нельзя заменить на 304
+    if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+        return None, None
+    validators = validators_func(request, *args, **kwargs)
+    if validators is None:
+        return None, None
+    etag, last_modified = validators
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    return validators, response
+
+
+def _patch(request, response, validators):
+    if validators is None or response.status_code not in (200, 304):
+        return response
+    etag, last_modified = validators
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    if request.user.is_authenticated or response.cookies:
+        # Ответ с Set-Cookie (сессия, закрепление за основной БД) не должен
+        # храниться в общем кэше и отдаваться другим клиентам
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        # Браузер проверяет актуальность при каждом запросе (дешевый 304),
+        # CDN и обратный прокси хранят ответ PAGE_CACHE_MAX_AGE секунд
+        patch_cache_control(response, public=True, max_age=0, s_maxage=settings.PAGE_CACHE_MAX_AGE)
+    return response
+
+
+def conditional_page(validators_func):
+    """
+    Декоратор представления страницы: 304 Not Modified до выполнения
+    представления, ETag, Last-Modified и Cache-Control в ответе.
+    Поддерживает синхронные и асинхронные представления.
+    
+    validators_func(request, *args, **kwargs) возвращает (etag, last_modified)
+    или None, если объект не найден (представление вернет 404)
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            async def wrapper(request, *args, **kwargs):
+                validators, response = await sync_to_async(_check)(validators_func, request, args, kwargs)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _patch(request, response, validators)
+        else:
+            def wrapper(request, *args, **kwargs):
+                validators, response = _check(validators_func, request, args, kwargs)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return _patch(request, response, validators)
+        return wraps(view)(wrapper)
+    return decorator
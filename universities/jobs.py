@@ -0,0 +1,158 @@
+"""
+Очередь фоновых задач на основе таблицы BackgroundJob
+
+Задачи ставятся в очередь из админки (или кода) функцией enqueue_job и
+выполняются воркерами (python manage.py run_job_worker), которые вызывают
+соответствующую management команду и записывают ее вывод и прогресс в БД.
+"""
+import os
+import re
+import socket
+import time
+import traceback
+from datetime import timedelta
+from typing import Optional
+
+from django.core.management import call_command
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import BackgroundJob
+
+
+# Команды печатают прогресс в виде "[12/340] Обработка: ..."
+PROGRESS_RE = re.compile(r'\[(\d+)/(\d+)\]')
+
+# Сколько последних символов вывода команды хранить в задаче
+OUTPUT_LIMIT = 20000
+
+
+def enqueue_job(kind: str, params: Optional[dict] = None, user=None) -> BackgroundJob:
+    """
+    Ставит задачу в очередь
+
+    Args:
+        kind: Имя management команды (см. BackgroundJob.KIND_CHOICES)
+        params: Параметры команды, как для call_command (например, {'limit': 10})
+        user: Пользователь, поставивший задачу
+    """
+    return BackgroundJob.objects.create(kind=kind, params=params or {}, created_by=user)
+
+
+def worker_name() -> str:
+    """Имя текущего воркера: хост и PID процесса"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_next_job(worker: str) -> Optional[BackgroundJob]:
+    """
+    Забирает самую старую задачу из очереди
+
+    Захват выполняется условным UPDATE по статусу, поэтому несколько
+    воркеров (в том числе на SQLite без SELECT ... FOR UPDATE) не
+    получат одну и ту же задачу.
+    """
+    pending = BackgroundJob.objects.filter(status=BackgroundJob.STATUS_PENDING).order_by('created_at')
+    for job_id in pending.values_list('id', flat=True)[:10]:
+        claimed = BackgroundJob.objects.filter(
+            id=job_id,
+            status=BackgroundJob.STATUS_PENDING
+        ).update(
+            status=BackgroundJob.STATUS_RUNNING,
+            worker=worker,
+            started_at=timezone.now()
+        )
+        if claimed:
+            return BackgroundJob.objects.get(id=job_id)
+    return None
+
+
+class JobOutput:
+    """
+    Поток вывода команды, сохраняющий вывод и прогресс в задачу
+
+    Запись в БД выполняется не чаще одного раза в save_interval секунд.
+    """
+
+    def __init__(self, job: BackgroundJob, save_interval: float = 2.0):
+        self.job = job
+        self.save_interval = save_interval
+        self.chunks = []
+        self.last_save = 0.0
+
+    def write(self, text):
+        self.chunks.append(text)
+        match = None
+        for match in PROGRESS_RE.finditer(text):
+            pass
+        if match:
+            self.job.progress = int(match.group(1))
+            self.job.total = int(match.group(2))
+        if time.monotonic() - self.last_save >= self.save_interval:
+            self.save()
+
+    def flush(self):
+        pass
+
+    def getvalue(self) -> str:
+        return ''.join(self.chunks)[-OUTPUT_LIMIT:]
+
+    def save(self):
+        self.job.output = self.getvalue()
+        self.job.save(update_fields=['output', 'progress', 'total'])
+        self.last_save = time.monotonic()
+
+
+def run_job(job: BackgroundJob):
+    """Выполняет задачу и записывает результат"""
+    output = JobOutput(job)
+    try:
+        call_command(job.kind, stdout=output, stderr=output, **job.params)
+        job.status = BackgroundJob.STATUS_DONE
+        if job.total:
+            job.progress = job.total
+    except Exception as e:
+        job.status = BackgroundJob.STATUS_FAILED
+        job.error = f'{e}\n\n{traceback.format_exc()}'
+
+    job.output = output.getvalue()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'total', 'output', 'error', 'finished_at'])
+
+
+def requeue_stale_jobs(older_than_minutes: int) -> int:
+    """
+    Возвращает в очередь задачи, оставшиеся в статусе 'running'
+    (например, после аварийного завершения воркера)
+    """
+    threshold = timezone.now() - timedelta(minutes=older_than_minutes)
+    return BackgroundJob.objects.filter(
+        status=BackgroundJob.STATUS_RUNNING,
+        started_at__lt=threshold
+    ).update(status=BackgroundJob.STATUS_PENDING, worker='', started_at=None)
+
+
+def work(poll_interval: float = 2.0, once: bool = False, stdout=None):
+    """
+    Основной цикл воркера: забирает задачи из очереди и выполняет их
+
+    Args:
+        poll_interval: Пауза между проверками пустой очереди в секундах
+        once: Выполнить задачи, стоящие в очереди, и завершиться
+        stdout: Поток для вывода сообщений о задачах
+    """
+    name = worker_name()
+    while True:
+        close_old_connections()
+        job = claim_next_job(name)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+
+        if stdout:
+            stdout.write(f'[{name}] Задача #{job.id}: {job.kind} {job.params}')
+        run_job(job)
+        if stdout:
+            stdout.write(f'[{name}] Задача #{job.id}: {job.get_status_display()}')
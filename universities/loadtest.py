@@ -0,0 +1,179 @@
+"""
+Инструменты нагрузочного тестирования страниц каталога
+
+Используются командами loadtest_catalog, benchmark_sqlite и benchmark_servers:
+запуск gunicorn с заданной конфигурацией и генерация HTTP нагрузки потоками.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import requests
+from django.conf import settings
+
+
+# Страницы каталога, используемые по умолчанию
+DEFAULT_PATHS = [
+    '/',
+    '/universities/',
+    '/universities/?is_public=on',
+    '/comparison/',
+    '/rating/',
+    '/news/',
+]
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Перцентиль по отсортированному списку (ближайший ранг)"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(percent / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+def run_load(base_url: str, paths: List[str], concurrency: int, duration: float,
+             timeout: float = 30) -> Dict:
+    """
+    Запрашивает страницы в concurrency потоков в течение duration секунд
+
+    Каждый клиент использует свою сессию (keep-alive) и обходит страницы по кругу.
+
+    Returns:
+        Словарь: timings (время ответа по страницам, в секундах), errors (Counter),
+        elapsed, total, rps, mean/p50/p95/p99 (мс)
+    """
+    lock = threading.Lock()
+    timings = {path: [] for path in paths}
+    errors = Counter()
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        session = requests.Session()
+        position = index
+        while time.monotonic() < deadline:
+            path = paths[position % len(paths)]
+            position += 1
+            start = time.perf_counter()
+            try:
+                response = session.get(base_url + path, timeout=timeout)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if response.status_code == 200:
+                        timings[path].append(elapsed)
+                    else:
+                        errors[f'HTTP {response.status_code}'] += 1
+            except requests.RequestException as e:
+                with lock:
+                    errors[type(e).__name__] += 1
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    all_timings = sorted(t for values in timings.values() for t in values)
+    return {
+        'timings': timings,
+        'errors': errors,
+        'elapsed': elapsed,
+        'total': len(all_timings),
+        'rps': len(all_timings) / elapsed if elapsed else 0.0,
+        'mean': statistics.mean(all_timings) * 1000 if all_timings else 0.0,
+        'p50': percentile(all_timings, 50) * 1000,
+        'p95': percentile(all_timings, 95) * 1000,
+        'p99': percentile(all_timings, 99) * 1000,
+    }
+
+
+def wait_for_server(url: str, timeout: float = 30) -> bool:
+    """Ждет, пока сервер не ответит 200 на url"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=5).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def start_gunicorn(port: int, app: Optional[str] = 'university_aggregator.wsgi:application',
+                   args: Optional[List[str]] = None, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """
+    Запускает gunicorn с текущим DJANGO_SETTINGS_MODULE
+
+    Args:
+        port: Порт на 127.0.0.1
+        app: WSGI/ASGI приложение (None - приложение из конфигурации, см. gunicorn_config.py)
+        args: Дополнительные аргументы gunicorn (--workers, --worker-class, --config, ...)
+        env: Дополнительные переменные окружения
+    """
+    process_env = os.environ.copy()
+    process_env['DJANGO_SETTINGS_MODULE'] = settings.SETTINGS_MODULE
+    process_env.update(env or {})
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        *(args or []),
+        '--bind', f'127.0.0.1:{port}',
+        '--log-level', 'warning',
+    ]
+    if app:
+        command.append(app)
+    return subprocess.Popen(
+        command,
+        env=process_env,
+        cwd=str(settings.BASE_DIR),
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def process_memory(pid: int) -> Dict[str, int]:
+    """
+    Память процесса в КиБ из /proc (только Linux): rss и pss
+
+    PSS учитывает разделяемые страницы пропорционально, поэтому показывает
+    экономию памяти от preload_app (copy-on-write), в отличие от RSS.
+    """
+    memory = {'rss': 0, 'pss': 0}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    memory['rss'] = int(line.split()[1])
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    memory['pss'] = int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return memory
+
+
+def child_pids(pid: int) -> List[int]:
+    """Дочерние процессы (воркеры gunicorn) из /proc (только Linux)"""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(child) for child in f.read().split()]
+    except (OSError, ValueError):
+        return []
+
+
+def stop_process(process: subprocess.Popen, timeout: float = 30):
+    """Останавливает процесс (SIGTERM, затем SIGKILL)"""
+    if process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
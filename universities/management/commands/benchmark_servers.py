@@ -0,0 +1,184 @@
+"""
+Команда для сравнения конфигураций сервера приложений на страницах каталога
+"""
+import importlib.util
+import itertools
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from universities.loadtest import (
+    child_pids, process_memory, run_load, start_gunicorn, stop_process, wait_for_server
+)
+from universities.models import University, News
+
+
+# Профили воркеров gunicorn_config.py (GUNICORN_WORKER_CLASS)
+WORKER_PROFILES = {
+    # Синхронные воркеры, синхронные представления (WSGI)
+    'sync': {'GUNICORN_WORKER_CLASS': 'sync'},
+    # Потоки в воркере (GUNICORN_THREADS), синхронные представления (WSGI)
+    'gthread': {'GUNICORN_WORKER_CLASS': 'gthread'},
+    # Воркеры uvicorn, асинхронные представления каталога (ASGI)
+    'asgi': {'GUNICORN_WORKER_CLASS': 'uvicorn', 'ASYNC_CATALOG_VIEWS': 'True'},
+}
+
+REQUIRED_MODULES = {
+    'asgi': 'uvicorn_worker',
+}
+
+
+def parse_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает конфигурации gunicorn (sync / gthread / uvicorn, количество воркеров, '
+        'preload_app) на страницах каталога: для каждой комбинации запускает gunicorn с '
+        'gunicorn_config.py, выполняет нагрузочный тест и выводит RPS, перцентили времени '
+        'ответа и память воркеров (RSS и PSS)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--configs',
+            type=str,
+            default='sync,gthread,asgi',
+            help=f'Профили воркеров через запятую: {", ".join(WORKER_PROFILES)} (по умолчанию все)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=str,
+            default='2',
+            help='Количество воркеров, через запятую для перебора, например 2,4 (по умолчанию 2)',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Потоков на воркер для gthread (по умолчанию 4)',
+        )
+        parser.add_argument(
+            '--preload',
+            choices=['on', 'off', 'both'],
+            default='both',
+            help='preload_app: on, off или both для сравнения (по умолчанию both)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Количество одновременных клиентов (по умолчанию 16)',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Длительность теста каждой конфигурации в секундах (по умолчанию 10)',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8030,
+            help='Порт gunicorn (по умолчанию 8030)',
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            default=None,
+            help='Путь страницы (можно указать несколько раз). По умолчанию - страницы каталога',
+        )
+
+    def default_paths(self):
+        paths = ['/', '/universities/', '/rating/', '/news/', '/universities/autocomplete/?q=ун']
+        university_id = University.objects.values_list('id', flat=True).first()
+        if university_id:
+            paths.append(f'/university/{university_id}/')
+        news_id = News.objects.filter(is_published=True).values_list('id', flat=True).first()
+        if news_id:
+            paths.append(f'/news/{news_id}/')
+        return paths
+
+    def handle(self, *args, **options):
+        profiles = parse_list(options['configs'])
+        unknown = [name for name in profiles if name not in WORKER_PROFILES]
+        if unknown:
+            raise CommandError(f'Неизвестные конфигурации: {", ".join(unknown)}')
+
+        try:
+            worker_counts = [int(value) for value in parse_list(options['workers'])]
+        except ValueError:
+            raise CommandError('--workers: ожидаются числа через запятую')
+
+        preload_values = {'on': [True], 'off': [False], 'both': [False, True]}[options['preload']]
+        paths = options['paths'] or self.default_paths()
+        config_path = str(settings.BASE_DIR / 'gunicorn_config.py')
+        results = []
+
+        for profile, workers, preload in itertools.product(profiles, worker_counts, preload_values):
+            name = f'{profile} x{workers}' + (' preload' if preload else '')
+            module = REQUIRED_MODULES.get(profile)
+            if module and importlib.util.find_spec(module) is None:
+                self.stdout.write(self.style.WARNING(
+                    f'[{name}] пропущено: не установлен {module} (pip install uvicorn uvicorn-worker)'
+                ))
+                continue
+
+            env = dict(
+                WORKER_PROFILES[profile],
+                GUNICORN_WORKERS=str(workers),
+                GUNICORN_THREADS=str(options['threads']),
+                GUNICORN_PRELOAD=str(preload),
+                GUNICORN_ACCESS_LOG='',
+                GUNICORN_ERROR_LOG='-',
+                GUNICORN_PIDFILE='',
+            )
+            self.stdout.write(f'\n[{name}] {options["concurrency"]} клиентов, {options["duration"]:.0f} с')
+            results.append((name, self.run_config(name, config_path, env, paths, options)))
+
+        if not results:
+            raise CommandError('Ни одна конфигурация не была запущена')
+
+        self.stdout.write('\n' + '=' * 100)
+        self.stdout.write(
+            f'{"Конфигурация":<22} {"RPS":>8} {"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9} {"Ошибки":>7} '
+            f'{"RSS/воркер":>11} {"PSS/воркер":>11} {"PSS всего":>10}'
+        )
+        self.stdout.write('-' * 100)
+        for name, result in results:
+            self.stdout.write(
+                f'{name:<22} {result["rps"]:>8.1f} {result["p50"]:>9.1f} {result["p95"]:>9.1f} '
+                f'{result["p99"]:>9.1f} {sum(result["errors"].values()):>7} '
+                f'{result["worker_rss"]:>8.1f} МБ {result["worker_pss"]:>8.1f} МБ {result["total_pss"]:>7.1f} МБ'
+            )
+        self.stdout.write('=' * 100)
+        self.stdout.write('RSS/PSS измеряются после нагрузки; PSS учитывает память, разделяемую после preload_app')
+
+    def run_config(self, name, config_path, env, paths, options):
+        base_url = f'http://127.0.0.1:{options["port"]}'
+        server = start_gunicorn(options['port'], app=None, args=['--config', config_path], env=env)
+        try:
+            if not wait_for_server(base_url + paths[0]):
+                raise CommandError(f'[{name}] сервер не ответил на {base_url}{paths[0]}')
+            # Прогрев: первые запросы каждого воркера загружают шаблоны и соединения
+            run_load(base_url, paths, options['concurrency'], 1)
+            result = run_load(base_url, paths, options['concurrency'], options['duration'])
+
+            workers = [process_memory(pid) for pid in child_pids(server.pid)]
+            master = process_memory(server.pid)
+        finally:
+            stop_process(server)
+
+        count = len(workers) or 1
+        result.update({
+            'worker_rss': sum(memory['rss'] for memory in workers) / count / 1024,
+            'worker_pss': sum(memory['pss'] for memory in workers) / count / 1024,
+            'total_pss': (master['pss'] + sum(memory['pss'] for memory in workers)) / 1024,
+        })
+        self.stdout.write(
+            f'[{name}] RPS: {result["rps"]:.1f}, p95: {result["p95"]:.1f} мс, '
+            f'воркеров: {len(workers)}, RSS/воркер: {result["worker_rss"]:.1f} МБ'
+        )
+        return result
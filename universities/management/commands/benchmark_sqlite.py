@@ -0,0 +1,223 @@
+"""
+Команда для сравнения настроек SQLite под конкурентной нагрузкой
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, transaction
+
+from universities.loadtest import run_load, start_gunicorn, stop_process, wait_for_server
+from universities.models import University, UniversityRating
+
+
+BENCHMARK_USERNAME = 'sqlite_benchmark'
+
+PROFILES = {
+    # Настройки SQLite по умолчанию (rollback journal, synchronous=FULL, таймаут 5 с)
+    'baseline': {'SQLITE_TUNING': 'False', 'SQLITE_IMMEDIATE_TRANSACTIONS': 'False'},
+    # Профиль SQLITE_TUNING из settings.py (с BEGIN IMMEDIATE)
+    'tuned': {'SQLITE_TUNING': 'True', 'SQLITE_IMMEDIATE_TRANSACTIONS': 'True'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает настройки SQLite (baseline и tuned) под конкурентной нагрузкой: '
+        'gunicorn с несколькими воркерами обслуживает список университетов, '
+        'параллельно процессы-писатели обновляют рейтинги. Выводит RPS и перцентили '
+        'чтения, а также число ошибок "database is locked". Работает на копии базы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile',
+            choices=['baseline', 'tuned', 'both'],
+            default='both',
+            help='Какой профиль запускать (по умолчанию оба)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Количество воркеров gunicorn (по умолчанию 4)',
+        )
+        parser.add_argument(
+            '--readers',
+            type=int,
+            default=8,
+            help='Количество одновременных HTTP клиентов (по умолчанию 8)',
+        )
+        parser.add_argument(
+            '--writers',
+            type=int,
+            default=4,
+            help='Количество процессов, записывающих рейтинги (по умолчанию 4)',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=15,
+            help='Длительность каждого прогона в секундах (по умолчанию 15)',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8020,
+            help='Порт gunicorn (по умолчанию 8020)',
+        )
+        parser.add_argument(
+            '--path',
+            type=str,
+            default='/universities/',
+            help='Страница для чтения (по умолчанию /universities/)',
+        )
+        # Внутренний режим: процесс-писатель, запускаемый основной командой
+        parser.add_argument('--writer-process', action='store_true', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['writer_process']:
+            return self.run_writer(options['duration'])
+
+        if settings.DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Команда работает только с SQLite')
+        if shutil.which('gunicorn') is None:
+            raise CommandError('gunicorn не установлен (pip install gunicorn)')
+        if not University.objects.exists():
+            raise CommandError('В базе нет университетов. Выполните python manage.py populate_data')
+
+        profiles = ['baseline', 'tuned'] if options['profile'] == 'both' else [options['profile']]
+        results = []
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for profile in profiles:
+                db_path = os.path.join(tmpdir, f'{profile}.sqlite3')
+                self.copy_database(db_path)
+                self.stdout.write(f'\n[{profile}] Копия базы: {db_path}')
+                results.append((profile, self.run_profile(profile, db_path, options)))
+
+        self.stdout.write('\n' + '=' * 92)
+        self.stdout.write(
+            f'{"Профиль":<10} {"RPS":>8} {"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9} '
+            f'{"HTTP ошибки":>12} {"Записей":>9} {"locked":>8} {"Записей/с":>10}'
+        )
+        self.stdout.write('-' * 92)
+        for profile, result in results:
+            self.stdout.write(
+                f'{profile:<10} {result["rps"]:>8.1f} {result["p50"]:>9.1f} {result["p95"]:>9.1f} '
+                f'{result["p99"]:>9.1f} {result["http_errors"]:>12} {result["writes"]:>9} '
+                f'{result["locked"]:>8} {result["writes_per_second"]:>10.1f}'
+            )
+        self.stdout.write('=' * 92)
+
+    def copy_database(self, db_path):
+        """Копирует текущую базу и переводит копию в журнал по умолчанию (DELETE)"""
+        source = sqlite3.connect(str(settings.DATABASES['default']['NAME']))
+        target = sqlite3.connect(db_path)
+        try:
+            source.backup(target)
+            # journal_mode=WAL сохраняется в файле базы, baseline должен начинать без него
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+            source.close()
+
+        connection = sqlite3.connect(db_path)
+        try:
+            # Пользователь для записей рейтингов
+            connection.execute(
+                "INSERT OR IGNORE INTO auth_user (password, is_superuser, username, first_name, last_name, "
+                "email, is_staff, is_active, date_joined) VALUES ('!', 0, ?, '', '', '', 0, 1, datetime('now'))",
+                [BENCHMARK_USERNAME]
+            )
+            connection.commit()
+        finally:
+            connection.close()
+
+    def run_profile(self, profile, db_path, options):
+        env = dict(PROFILES[profile], SQLITE_PATH=db_path)
+        base_url = f'http://127.0.0.1:{options["port"]}'
+
+        server = start_gunicorn(options['port'], args=['--workers', str(options['workers'])], env=env)
+        writers = []
+        try:
+            if not wait_for_server(base_url + options['path']):
+                raise CommandError(f'gunicorn не ответил на {base_url}{options["path"]}')
+
+            duration = options['duration']
+            writers = [
+                subprocess.Popen(
+                    [sys.executable, 'manage.py', 'benchmark_sqlite', '--writer-process', '--skip-checks',
+                     '--duration', str(duration)],
+                    env={**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE, **env},
+                    cwd=str(settings.BASE_DIR),
+                    stdout=subprocess.PIPE,
+                    text=True,
+                )
+                for _ in range(options['writers'])
+            ]
+            read_result = run_load(base_url, [options['path']], options['readers'], duration, timeout=60)
+            read_result['http_errors'] = sum(read_result['errors'].values())
+
+            writes = locked = 0
+            for writer in writers:
+                output, _ = writer.communicate(timeout=duration + 60)
+                stats = json.loads(output.strip().splitlines()[-1])
+                writes += stats['writes']
+                locked += stats['locked']
+        finally:
+            for writer in writers:
+                if writer.poll() is None:
+                    writer.kill()
+            stop_process(server)
+
+        read_result.update({
+            'writes': writes,
+            'locked': locked,
+            'writes_per_second': writes / duration,
+        })
+        self.stdout.write(
+            f'[{profile}] Чтение: {read_result["rps"]:.1f} RPS, p95 {read_result["p95"]:.1f} мс; '
+            f'записей: {writes}, ошибок блокировки: {locked}'
+        )
+        return read_result
+
+    def run_writer(self, duration):
+        """
+        Процесс-писатель: в транзакции читает университет и обновляет его рейтинг
+        (как update_*_ratings) и отзыв пользователя (как rate_university_view)
+        """
+        user = User.objects.get(username=BENCHMARK_USERNAME)
+        university_ids = list(University.objects.values_list('id', flat=True))
+        writes = locked = 0
+        deadline = time.monotonic() + duration
+
+        while time.monotonic() < deadline:
+            try:
+                with transaction.atomic():
+                    university = University.objects.get(id=random.choice(university_ids))
+                    university.yandex_rating = round(random.uniform(3, 5), 1)
+                    university.save(update_fields=['yandex_rating', 'updated_at'])
+                    UniversityRating.objects.update_or_create(
+                        university=university,
+                        user=user,
+                        defaults={'rating': random.randint(1, 5), 'comment': 'benchmark'}
+                    )
+                writes += 1
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                locked += 1
+
+        self.stdout.write(json.dumps({'writes': writes, 'locked': locked}))
+
@@ -0,0 +1,91 @@
+"""
+Команда для замера времени разбора страницы рейтинга tabiturient.ru
+"""
+from django.core.management.base import BaseCommand, CommandError
+from universities.mock_providers import build_tabiturient_html
+from universities.utils import (
+    _parse_tabiturient_ratings_bs4, _parse_tabiturient_ratings_lxml, lxml_etree,
+)
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время разбора страницы рейтинга tabiturient.ru: '
+        'BeautifulSoup (html.parser), BeautifulSoup + SoupStrainer и lxml (XPath)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            type=str,
+            default=None,
+            help='HTML файл страницы рейтинга (например, сохраненная https://tabiturient.ru/globalrating/)',
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1500,
+            help='Количество вузов на сгенерированной странице, если --file не указан (по умолчанию 1500)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=10,
+            help='Количество повторов разбора для каждого парсера (по умолчанию 10)',
+        )
+        parser.add_argument(
+            '--save',
+            type=str,
+            default=None,
+            help='Сохранить сгенерированную страницу в файл для повторных прогонов',
+        )
+
+    def handle(self, *args, **options):
+        if lxml_etree is None:
+            raise CommandError('lxml не установлен: pip install lxml')
+        
+        if options['file']:
+            with open(options['file'], 'rb') as f:
+                content = f.read()
+            source = options['file']
+        else:
+            names = [f'Университет №{i} имени тестового основателя' for i in range(1, options['rows'] + 1)]
+            content = build_tabiturient_html(names).encode('utf-8')
+            source = f'сгенерированная страница, {options["rows"]} вузов'
+            if options['save']:
+                with open(options['save'], 'wb') as f:
+                    f.write(content)
+        
+        self.stdout.write(f'Страница: {source} ({len(content) / 1024:.0f} КБ)')
+        
+        parsers = [
+            ('BeautifulSoup, html.parser (до)', lambda: _parse_tabiturient_ratings_bs4(content, parse_only=False)),
+            ('BeautifulSoup + SoupStrainer', lambda: _parse_tabiturient_ratings_bs4(content)),
+            ('lxml + XPath (после)', lambda: _parse_tabiturient_ratings_lxml(content)),
+        ]
+        
+        results = []
+        for label, parse in parsers:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                ratings = parse()
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            results.append((label, ratings, timings[len(timings) // 2], timings[0]))
+        
+        baseline = results[0][2]
+        self.stdout.write('')
+        for label, ratings, median, best in results:
+            self.stdout.write(
+                f'  {label:<34} медиана {median * 1000:8.1f} мс, '
+                f'лучшее {best * 1000:8.1f} мс, x{baseline / median:5.1f}, записей: {len(ratings)}'
+            )
+        
+        reference = results[0][1]
+        mismatched = [label for label, ratings, _, _ in results[1:] if ratings != reference]
+        if mismatched:
+            self.stdout.write(self.style.ERROR(f'\nРезультаты разбора отличаются: {", ".join(mismatched)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nРезультаты всех парсеров совпадают'))
@@ -0,0 +1,59 @@
+"""
+Команда для пересчета рекомендаций по предпочтениям пользователей (избранное и оценки)
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from universities.catalog_cache import deferred_data_versions
+from universities import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «пользователи, отметившие этот вуз, также выбирают» по избранному '
+        'и оценкам пользователей. По умолчанию пересчитываются только вузы, затронутые изменениями '
+        'с прошлого запуска; рекомендуется запускать каждые 10-15 минут'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать рекомендации для всех вузов',
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=recommendations.DEFAULT_TOP_K,
+            help=f'Количество сохраняемых похожих вузов для каждого вуза (по умолчанию {recommendations.DEFAULT_TOP_K})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество пользователей в одном блоке умножения матриц (по умолчанию 1000)'
+        )
+    
+    @deferred_data_versions()
+    def handle(self, *args, **options):
+        if recommendations.np is None:
+            raise CommandError('Для расчета рекомендаций требуется NumPy (pip install numpy)')
+        if options['top_k'] < 1:
+            raise CommandError('--top-k должен быть не меньше 1')
+        
+        started = time.monotonic()
+        stats = recommendations.rebuild_recommendations(
+            full=options['full'],
+            k=options['top_k'],
+            batch_size=max(1, options['batch_size'])
+        )
+        if stats is None:
+            self.stdout.write('Предпочтения пользователей не изменились, пересчет не требуется')
+            return
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Полный" if stats["full"] else "Инкрементальный"} пересчет: вузов {stats["universities"]}, '
+            f'сохранено пар {stats["links"]}, пользователей с предпочтениями {stats["users"]} '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,46 @@
+"""
+Команда для пересчета похожих университетов (блок на странице вуза)
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from universities.catalog_cache import deferred_data_versions
+from universities import similarity
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие университеты: признаки вузов (регион, тип, специальности, '
+        'стоимость, рейтинг) и ближайшие по косинусному сходству. Рекомендуется запускать ежесуточно'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=similarity.DEFAULT_TOP_K,
+            help=f'Количество похожих вузов для каждого вуза (по умолчанию {similarity.DEFAULT_TOP_K})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=512,
+            help='Количество вузов в одном блоке умножения матриц (по умолчанию 512)'
+        )
+    
+    @deferred_data_versions()
+    def handle(self, *args, **options):
+        if similarity.np is None:
+            raise CommandError('Для расчета похожих университетов требуется NumPy (pip install numpy)')
+        if options['top_k'] < 1:
+            raise CommandError('--top-k должен быть не меньше 1')
+        
+        started = time.monotonic()
+        saved = similarity.rebuild_similar_universities(
+            k=options['top_k'],
+            batch_size=max(1, options['batch_size'])
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Сохранено пар похожих университетов: {saved} за {time.monotonic() - started:.1f} с'
+        ))
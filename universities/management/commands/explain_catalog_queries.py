@@ -0,0 +1,130 @@
+"""
+Команда для вывода планов выполнения (EXPLAIN) запросов страниц каталога
+
+Запросы строятся теми же функциями, что и в представлениях: запросы снимка
+каталога (CatalogSnapshot), запрос ORM списка без снимка (search_universities),
+сравнение (comparison_universities), рейтинг (leaderboard_universities) и поиск
+программ (search_programs, ProgramSearchResults).
+"""
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection
+from universities.catalog_snapshot import CatalogSnapshot
+from universities.models import Region, UniversityType, University, UniversityRating, News, Faculty, Program
+from universities.program_search import ProgramSearchResults, result_values, search_programs
+from universities.views import comparison_universities, leaderboard_universities, search_universities
+from accounts.models import FavoriteUniversity
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит EXPLAIN для запросов страниц каталога (снимок каталога, список, сравнение, '
+        'детальная страница, новости, рейтинг, поиск программ, избранное), чтобы проверить '
+        'использование индексов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query',
+            action='append',
+            default=None,
+            help='Вывести план только для указанного запроса (можно указать несколько раз)',
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='EXPLAIN ANALYZE (только PostgreSQL: запрос выполняется)',
+        )
+
+    def get_queries(self):
+        """Запросы в том виде, в котором их строят представления"""
+        # Значения фильтров берем из БД, чтобы планировщик видел реальную селективность
+        region = Region.objects.first()
+        university_type = UniversityType.objects.first()
+        university_id = University.objects.values_list('id', flat=True).first() or 1
+        user_id = User.objects.values_list('id', flat=True).first() or 1
+
+        snapshot_rows, snapshot_ratings, snapshot_programs = CatalogSnapshot.source_queries()
+        # Страница по снимку загружается in_bulk по id вузов страницы
+        page_ids = list(snapshot_rows.values_list('id', flat=True)[:12])
+
+        programs = ProgramSearchResults(search_programs({'sort': 'rating'}), 'rating')
+        rating_page_ids = list(programs.university_order_query()[:5])
+
+        return [
+            ('snapshot_universities', 'CatalogSnapshot.build: вузы',
+             snapshot_rows),
+            ('snapshot_ratings', 'CatalogSnapshot.build: оценки по вузам',
+             snapshot_ratings),
+            ('snapshot_programs', 'CatalogSnapshot.build: программы по вузам',
+             snapshot_programs),
+            ('snapshot_popular', 'university_list_view: сортировка по популярности',
+             CatalogSnapshot.popular_ids()),
+            ('list_page', 'university_list_view: вузы страницы (снимок)',
+             University.objects.filter(pk__in=page_ids)),
+            ('list', 'university_list_view без снимка: без фильтров',
+             search_universities({})[:12]),
+            ('list_region', 'university_list_view без снимка: регион',
+             search_universities({'region': region})[:12]),
+            ('list_type_public', 'university_list_view без снимка: тип + государственные',
+             search_universities({'university_type': university_type, 'is_public': True})[:12]),
+            ('list_popular', 'university_list_view без снимка: по популярности',
+             search_universities({'sort': 'popular'})[:12]),
+            ('cities', 'university_list_view: список городов',
+             University.objects.values_list('city', flat=True).distinct().order_by('city')),
+            ('comparison', 'comparison_view без снимка: без фильтров',
+             comparison_universities({})[:24]),
+            ('comparison_region', 'comparison_view без снимка: регион',
+             comparison_universities({'region': region})[:24]),
+            ('comparison_public', 'comparison_view без снимка: государственные',
+             comparison_universities({'is_public': True})[:24]),
+            ('detail_ratings', 'university_detail_view: отзывы',
+             UniversityRating.objects.filter(university_id=university_id).order_by('-created_at')),
+            ('detail_news', 'university_detail_view: новости вуза',
+             News.objects.filter(university_id=university_id, is_published=True).order_by('-created_at')[:5]),
+            ('detail_faculties', 'university_detail_view: факультеты',
+             Faculty.objects.filter(university_id=university_id)),
+            ('detail_programs', 'university_detail_view: программы',
+             Program.objects.filter(faculty__university_id=university_id)),
+            ('detail_favorite', 'university_detail_view: вуз в избранном',
+             FavoriteUniversity.objects.filter(user_id=user_id, university_id=university_id)),
+            ('home_news', 'home_view: последние новости',
+             News.objects.filter(is_published=True).order_by('-created_at')[:5]),
+            ('news_list', 'news_list_view: страница новостей',
+             News.objects.filter(is_published=True).order_by('-created_at')[:10]),
+            ('leaderboard', 'rating_leaderboard_view',
+             leaderboard_universities()[:20]),
+            ('programs', 'program_search_view: по стоимости',
+             result_values(ProgramSearchResults(search_programs({})))[:20]),
+            ('programs_words', 'program_search_view: слова названия',
+             result_values(ProgramSearchResults(search_programs({'q': 'информатика'})))[:20]),
+            ('programs_rating_counts', 'program_search_view: по рейтингу вуза, программ по вузам',
+             programs.university_counts_query()),
+            ('programs_rating_order', 'program_search_view: по рейтингу вуза, порядок вузов',
+             programs.university_order_query()),
+            ('programs_rating_page', 'program_search_view: по рейтингу вуза, программы страницы',
+             result_values(programs).page_query(rating_page_ids)[:20]),
+            ('favorites', 'favorites_view',
+             FavoriteUniversity.objects.filter(user_id=user_id).select_related('university')),
+        ]
+
+    def handle(self, *args, **options):
+        selected = options['query']
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor == 'postgresql':
+                explain_options = {'analyze': True, 'buffers': True}
+            else:
+                self.stdout.write(self.style.WARNING('--analyze поддерживается только для PostgreSQL'))
+
+        self.stdout.write(f'База данных: {connection.vendor}')
+
+        for key, title, queryset in self.get_queries():
+            if selected and key not in selected:
+                continue
+
+            self.stdout.write('\n' + '=' * 70)
+            self.stdout.write(self.style.SUCCESS(f'[{key}] {title}'))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write('-' * 70)
+            self.stdout.write(queryset.explain(**explain_options))
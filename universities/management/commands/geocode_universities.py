@@ -0,0 +1,126 @@
+"""
+Команда для геокодирования адресов университетов (координаты для поиска ближайших вузов)
+"""
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from universities.catalog_cache import deferred_data_versions
+from universities.models import University
+from universities.utils import (
+    geocode_address, reset_api_stats, count_api_calls, parse_id_list,
+    BulkRatingWriter, COORDINATE_FIELDS,
+)
+import time
+
+
+class Command(BaseCommand):
+    help = 'Сохраняет координаты университетов по адресу (Geocoder API Яндекса или Google)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Обновить координаты всех университетов, а не только университетов без координат',
+        )
+        parser.add_argument(
+            '--university-ids',
+            type=parse_id_list,
+            default=None,
+            help='Геокодировать только перечисленные университеты (ID через запятую)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Ограничить количество геокодируемых университетов',
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=0.2,
+            help='Задержка между запросами в секундах (по умолчанию 0.2)',
+        )
+        parser.add_argument(
+            '--provider',
+            choices=['auto', 'yandex', 'google'],
+            default='auto',
+            help='Геокодер: yandex, google или auto (Яндекс, если задан YANDEX_MAPS_API_KEY)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Количество университетов, сохраняемых одним запросом bulk_update (по умолчанию 200)',
+        )
+    
+    @deferred_data_versions()
+    def handle(self, *args, **options):
+        provider = options['provider']
+        keys = {
+            'yandex': getattr(settings, 'YANDEX_MAPS_API_KEY', ''),
+            'google': getattr(settings, 'GOOGLE_PLACES_API_KEY', ''),
+        }
+        if provider == 'auto':
+            provider = 'yandex' if keys['yandex'] else 'google'
+        
+        if not keys[provider]:
+            self.stdout.write(
+                self.style.WARNING(
+                    'ВНИМАНИЕ: не задан ключ API геокодера.\n'
+                    'Добавьте YANDEX_MAPS_API_KEY или GOOGLE_PLACES_API_KEY в файл .env'
+                )
+            )
+            return
+        
+        universities = University.objects.order_by('id')
+        if options['university_ids']:
+            universities = universities.filter(id__in=options['university_ids'])
+        if not options['all']:
+            universities = universities.filter(latitude__isnull=True)
+        if options['limit']:
+            universities = universities[:options['limit']]
+        
+        universities = list(universities)
+        total = len(universities)
+        self.stdout.write(f'Найдено {total} университетов для геокодирования')
+        
+        updated = 0
+        failed = 0
+        
+        reset_api_stats()
+        started = time.monotonic()
+        
+        writer = BulkRatingWriter(COORDINATE_FIELDS, batch_size=options['batch_size'])
+        with writer:
+            for index, university in enumerate(universities, 1):
+                coordinates = geocode_address(university.address, university.city, provider=provider)
+                if coordinates is None and university.address:
+                    # Адрес не распознан - ищем по названию вуза в городе
+                    coordinates = geocode_address(university.name, university.city, provider=provider)
+                
+                if coordinates:
+                    university.latitude, university.longitude = coordinates
+                    writer.add(university)
+                    updated += 1
+                    self.stdout.write(f'[{index}/{total}] {university.name}: {coordinates[0]:.6f}, {coordinates[1]:.6f}')
+                else:
+                    failed += 1
+                    self.stdout.write(
+                        self.style.WARNING(f'[{index}/{total}] {university.name}: адрес не найден')
+                    )
+                
+                # Задержка между запросами, чтобы не превысить лимиты API
+                if index < total:
+                    time.sleep(options['delay'])
+        
+        self.stdout.write('\n' + '='*50)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nИтоги:\n'
+                f'  Геокодировано: {updated}\n'
+                f'  Не найдено: {failed}\n'
+                f'  Всего: {total}\n'
+                f'  Запросов к геокодеру: {count_api_calls(provider)}\n'
+                f'  Время выполнения: {time.monotonic() - started:.1f} с\n'
+                f'  Запросов сохранения в БД: {writer.flushes}'
+            )
+        )
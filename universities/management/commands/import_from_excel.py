@@ -1,10 +1,12 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.db.models import Max
+from universities.catalog_cache import deferred_data_versions
 from universities.models import (
     Region, UniversityType, University, Faculty, Program,
     UniversityRating, UniversityComparison, News
 )
+from universities.specialties import SpecialtyResolver
 from django.contrib.auth.models import User
 import os
 from pathlib import Path
@@ -26,6 +28,7 @@ class Command(BaseCommand):
             help='Путь к Excel файлу'
         )
 
+    @deferred_data_versions()
     def handle(self, *args, **options):
         file_path = options['file']
         
@@ -269,6 +272,9 @@ class Command(BaseCommand):
         
         self.stdout.write(f'В кеше {len(universities_cache)} записей университетов')
         
+        # Справочник специальностей: программа связывается по коду ФГОС или названию
+        specialties = SpecialtyResolver()
+        
         for index, row in df.iterrows():
             try:
                 # Извлекаем данные (используем реальные названия колонок)
@@ -371,7 +377,8 @@ class Command(BaseCommand):
                     degree_level=degree_level,
                     duration_years=duration,
                     description=description,
-                    tuition_fee=tuition_fee
+                    tuition_fee=tuition_fee,
+                    specialty=specialties.resolve(program_name, description)
                 )
                 
                 programs_created += 1
@@ -389,6 +396,10 @@ class Command(BaseCommand):
         
         self.stdout.write(f'Пропущено {skipped_no_university} специальностей (не найден вуз)')
         self.stdout.write(f'Пропущено {skipped_errors} специальностей (ошибки)')
+        self.stdout.write(
+            f'Справочник специальностей: {len(specialties.by_key)} записей '
+            f'(новых: {specialties.created}, с кодом ФГОС: {len(specialties.by_code)})'
+        )
         return programs_created
     
     def detect_column_mapping(self, columns, data_type):
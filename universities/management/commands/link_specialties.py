@@ -0,0 +1,100 @@
+"""
+Команда для связывания программ со справочником специальностей
+"""
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from universities.catalog_cache import bump_data_version, deferred_data_versions
+from universities.models import Program, Specialty
+from universities.specialties import SpecialtyResolver, clean_specialty_name, specialty_key
+
+
+class Command(BaseCommand):
+    help = (
+        'Связывает образовательные программы со специальностями по коду ФГОС или '
+        'нормализованному названию (для данных, импортированных до появления справочника)'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help=(
+                'Пересвязать все программы, а не только программы без специальности, и очистить '
+                'справочник от специальностей, название которых изменила нормализация'
+            )
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Максимальное количество программ в одном UPDATE'
+        )
+    
+    @deferred_data_versions()
+    def handle(self, *args, **options):
+        programs = Program.objects.only('id', 'name', 'description', 'specialty_id').order_by('id')
+        if not options['all']:
+            programs = programs.filter(specialty__isnull=True)
+        
+        resolver = SpecialtyResolver()
+        # id специальности -> id программ: один UPDATE на специальность
+        # (bulk_update в SQLite строит CASE на каждую строку и работает медленнее)
+        groups = defaultdict(list)
+        for program in programs.iterator(chunk_size=options['batch_size']):
+            specialty = resolver.resolve(program.name, program.description)
+            specialty_id = specialty.pk if specialty is not None else None
+            if specialty_id != program.specialty_id:
+                groups[specialty_id].append(program.pk)
+        
+        linked = 0
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            for specialty_id, program_ids in groups.items():
+                for start in range(0, len(program_ids), batch_size):
+                    linked += Program.objects.filter(pk__in=program_ids[start:start + batch_size]).update(
+                        specialty_id=specialty_id
+                    )
+        
+        # update() не вызывает сигналы
+        if linked:
+            bump_data_version('programs')
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Связано программ: {linked}. Специальностей в справочнике: {len(resolver.by_key)} '
+            f'(новых: {resolver.created}, с кодом ФГОС: {len(resolver.by_code)})'
+        ))
+        
+        if options['all']:
+            removed, renamed = self.clean_dictionary()
+            self.stdout.write(f'Справочник: удалено устаревших специальностей {removed}, переименовано {renamed}')
+    
+    def clean_dictionary(self):
+        """
+        Специальности, название которых изменила нормализация (например,
+        обрезанное в источнике уточнение «(по»): после пересвязывания всех
+        программ такие специальности без программ удаляются, остальные
+        (найденные по коду ФГОС) переименовываются
+        """
+        removed = renamed = 0
+        with transaction.atomic():
+            for specialty in Specialty.objects.annotate(programs_count=Count('programs')):
+                name = clean_specialty_name(specialty.name) or specialty.code
+                if name == specialty.name:
+                    continue
+                if not specialty.programs_count:
+                    specialty.delete()
+                    removed += 1
+                    continue
+                specialty.name = name
+                update_fields = ['name']
+                # Ключ без кода уникален - у специальности без кода он не меняется
+                if specialty.code:
+                    specialty.key = specialty_key(name) or specialty.code
+                    update_fields.append('key')
+                specialty.save(update_fields=update_fields)
+                renamed += 1
+        return removed, renamed
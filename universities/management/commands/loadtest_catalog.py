@@ -0,0 +1,107 @@
+"""
+Команда для нагрузочного тестирования страниц каталога
+"""
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from universities.loadtest import DEFAULT_PATHS, percentile, run_load
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест страниц каталога: несколько потоков запрашивают страницы '
+        'запущенного сервера (runserver/gunicorn) в течение заданного времени и выводят '
+        'RPS, перцентили времени ответа и ошибки. Используется для сравнения конфигураций '
+        '(SQLite и PostgreSQL, воркеры gunicorn)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            type=str,
+            default='http://127.0.0.1:8000',
+            help='Адрес сервера (по умолчанию http://127.0.0.1:8000)',
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            default=None,
+            help='Путь страницы (можно указать несколько раз). По умолчанию - главные страницы каталога',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Количество одновременных клиентов (по умолчанию 8)',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Длительность теста в секундах (по умолчанию 10)',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=1,
+            help='Количество прогревочных запросов к каждой странице (по умолчанию 1)',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Таймаут запроса в секундах (по умолчанию 30)',
+        )
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        paths = options['paths'] or DEFAULT_PATHS
+        concurrency = max(1, options['concurrency'])
+        duration = options['duration']
+        timeout = options['timeout']
+
+        try:
+            requests.get(base_url + paths[0], timeout=timeout)
+        except requests.RequestException as e:
+            raise CommandError(f'Сервер {base_url} недоступен: {e}')
+
+        for path in paths:
+            for _ in range(options['warmup']):
+                requests.get(base_url + path, timeout=timeout)
+
+        self.stdout.write(
+            f'Нагрузочный тест {base_url}: {concurrency} клиентов, {duration:.0f} с, страниц: {len(paths)}'
+        )
+        result = run_load(base_url, paths, concurrency, duration, timeout=timeout)
+        timings = result['timings']
+        errors = result['errors']
+        total = result['total']
+
+        self.stdout.write('\n' + '=' * 78)
+        self.stdout.write(f'{"Страница":<36} {"Запросов":>9} {"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9}')
+        self.stdout.write('-' * 78)
+        for path in paths:
+            values = sorted(timings[path])
+            self.stdout.write(
+                f'{path[:36]:<36} {len(values):>9} '
+                f'{percentile(values, 50) * 1000:>9.1f} '
+                f'{percentile(values, 95) * 1000:>9.1f} '
+                f'{percentile(values, 99) * 1000:>9.1f}'
+            )
+        self.stdout.write('-' * 78)
+
+        if not total:
+            raise CommandError('Ни один запрос не выполнен успешно')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Успешных запросов: {total} за {result["elapsed"]:.1f} с, RPS: {result["rps"]:.1f}'
+        ))
+        self.stdout.write(
+            f'Время ответа: среднее {result["mean"]:.1f} мс, p50 {result["p50"]:.1f} мс, '
+            f'p95 {result["p95"]:.1f} мс, p99 {result["p99"]:.1f} мс'
+        )
+        if errors:
+            self.stdout.write(self.style.WARNING(
+                'Ошибки: ' + ', '.join(f'{key}: {count}' for key, count in errors.most_common())
+            ))
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from universities.catalog_cache import deferred_data_versions
 from universities.models import Region, UniversityType, University
 import random
 
@@ -6,6 +7,7 @@ import random
 class Command(BaseCommand):
     help = 'Заполняет базу данных всеми российскими университетами'
 
+    @deferred_data_versions()
     def handle(self, *args, **options):
         self.stdout.write('Начинаем заполнение базы данных всеми вузами РФ...')
         
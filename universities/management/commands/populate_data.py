@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from universities.catalog_cache import deferred_data_versions
 from universities.models import Region, UniversityType, University, Faculty, Program, News
 from django.contrib.auth.models import User
 
@@ -6,6 +7,7 @@ from django.contrib.auth.models import User
 class Command(BaseCommand):
     help = 'Заполняет базу данных примерами российских университетов'
 
+    @deferred_data_versions()
     def handle(self, *args, **options):
         self.stdout.write('Начинаем заполнение базы данных...')
         
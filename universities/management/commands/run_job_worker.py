@@ -0,0 +1,47 @@
+"""
+Команда для запуска воркера очереди фоновых задач
+"""
+from django.core.management.base import BaseCommand
+from universities.jobs import work, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает воркер, выполняющий фоновые задачи из очереди BackgroundJob '
+        '(обновление рейтингов, импорт данных). Можно запускать несколько воркеров одновременно'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Пауза между проверками пустой очереди в секундах (по умолчанию 2.0)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить задачи, стоящие в очереди, и завершиться',
+        )
+        parser.add_argument(
+            '--requeue-stale',
+            type=int,
+            default=None,
+            help='Перед запуском вернуть в очередь задачи, выполняющиеся дольше N минут '
+                 '(после аварийного завершения воркера)',
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue_stale']:
+            requeued = requeue_stale_jobs(options['requeue_stale'])
+            self.stdout.write(f'Возвращено в очередь задач: {requeued}')
+        
+        self.stdout.write(self.style.SUCCESS('Воркер фоновых задач запущен'))
+        try:
+            work(
+                poll_interval=options['poll_interval'],
+                once=options['once'],
+                stdout=self.stdout
+            )
+        except KeyboardInterrupt:
+            self.stdout.write('\nВоркер остановлен')
@@ -0,0 +1,111 @@
+"""
+Команда для запуска локального mock-сервера Google Places, Яндекс Карт и tabiturient.ru
+"""
+from django.core.management.base import BaseCommand
+from universities.models import University
+from universities.mock_providers import MockProviderConfig, MockProviderServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает локальный mock-сервер внешних провайдеров рейтингов для '
+        'нагрузочного тестирования update_*_ratings без обращения к реальным API. '
+        'Используйте вместе с DJANGO_SETTINGS_MODULE=university_aggregator.settings_benchmark'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--host',
+            type=str,
+            default='127.0.0.1',
+            help='Адрес для прослушивания (по умолчанию 127.0.0.1)',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8765,
+            help='Порт (по умолчанию 8765)',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=50,
+            help='Задержка ответа в миллисекундах (по умолчанию 50)',
+        )
+        parser.add_argument(
+            '--jitter',
+            type=float,
+            default=0,
+            help='Случайная добавка к задержке в миллисекундах (по умолчанию 0)',
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0.0,
+            help='Доля ответов 500 Internal Server Error (0..1)',
+        )
+        parser.add_argument(
+            '--rate-limit-rate',
+            type=float,
+            default=0.0,
+            help='Доля ответов 429 Too Many Requests (0..1)',
+        )
+        parser.add_argument(
+            '--not-found-rate',
+            type=float,
+            default=0.0,
+            help='Доля запросов поиска, для которых место не найдено (0..1)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed генератора случайных чисел для воспроизводимых прогонов',
+        )
+        parser.add_argument(
+            '--no-db-names',
+            action='store_true',
+            help='Не брать названия вузов для страницы tabiturient.ru из базы данных',
+        )
+
+    def handle(self, *args, **options):
+        names = []
+        if not options['no_db_names']:
+            names = list(University.objects.values_list('name', flat=True))
+
+        config = MockProviderConfig(
+            latency=options['latency'] / 1000.0,
+            jitter=options['jitter'] / 1000.0,
+            error_rate=options['error_rate'],
+            rate_limit_rate=options['rate_limit_rate'],
+            not_found_rate=options['not_found_rate'],
+            seed=options['seed'],
+            university_names=names,
+        )
+
+        server = MockProviderServer((options['host'], options['port']), config)
+        base_url = f"http://{options['host']}:{options['port']}"
+
+        self.stdout.write(self.style.SUCCESS(f'Mock-сервер провайдеров запущен: {base_url}'))
+        self.stdout.write(
+            f'  Задержка: {options["latency"]:.0f} мс (+до {options["jitter"]:.0f} мс)\n'
+            f'  Ошибки 500: {config.error_rate:.0%}, ответы 429: {config.rate_limit_rate:.0%}, '
+            f'не найдено: {config.not_found_rate:.0%}\n'
+            f'  Вузов на странице tabiturient.ru: {len(names) or 300}\n'
+            f'  Статистика запросов: {base_url}/stats/\n'
+            f'\nЗапуск команд обновления против mock-сервера:\n'
+            f'  DJANGO_SETTINGS_MODULE=university_aggregator.settings_benchmark '
+            f'python manage.py update_google_ratings --delay 0\n'
+            f'\nДля остановки нажмите Ctrl+C'
+        )
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+        self.stdout.write('\nСтатистика запросов:')
+        for key, count in sorted(config.stats.items()):
+            self.stdout.write(f'  {key}: {count}')
@@ -0,0 +1,40 @@
+"""
+Команда для копирования основной SQLite базы в локальную реплику
+"""
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite базу в реплики из settings.DATABASE_REPLICAS '
+        '(локальная проверка маршрутизации чтения, см. settings_replica)'
+    )
+
+    def handle(self, *args, **options):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas:
+            raise CommandError('Реплики не настроены (DATABASE_REPLICAS). Используйте settings_replica')
+
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Команда работает только с SQLite. Для PostgreSQL используйте потоковую репликацию')
+
+        source = sqlite3.connect(str(primary['NAME']))
+        try:
+            for alias in replicas:
+                replica = settings.DATABASES[alias]
+                if replica['ENGINE'] != 'django.db.backends.sqlite3':
+                    self.stdout.write(self.style.WARNING(f'{alias}: не SQLite, пропущено'))
+                    continue
+                # Backup API копирует согласованный снимок, даже если основная БД используется
+                target = sqlite3.connect(str(replica['NAME']))
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(f'{alias}: скопировано в {replica["NAME"]}'))
+        finally:
+            source.close()
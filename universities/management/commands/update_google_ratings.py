@@ -3,8 +3,12 @@
 """
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from universities.catalog_cache import deferred_data_versions
 from universities.models import University
-from universities.utils import update_university_google_rating
+from universities.utils import (
+    update_university_google_rating, reset_api_stats, count_api_calls, parse_id_list,
+    BulkRatingWriter, GOOGLE_RATING_FIELDS, API_STATS, GOOGLE_DISCOVERY_MIN_CALLS,
+)
 import time
 
 
@@ -30,12 +34,31 @@ class Command(BaseCommand):
             default=None,
             help='Обновить рейтинг только для конкретного университета',
         )
+        parser.add_argument(
+            '--university-ids',
+            type=parse_id_list,
+            default=None,
+            help='Обновить рейтинги только для перечисленных университетов (ID через запятую)',
+        )
         parser.add_argument(
             '--verbose',
             action='store_true',
             help='Выводить подробную информацию о запросах к API',
         )
+        parser.add_argument(
+            '--fast-refresh',
+            action='store_true',
+            help='Обновить рейтинги и для уже найденных мест: при сохраненном google_place_id '
+                 'выполняется один запрос по ID, полный поиск - только если место не найдено',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Количество университетов, сохраняемых одним запросом bulk_update (по умолчанию 200)',
+        )
 
+    @deferred_data_versions()
     def handle(self, *args, **options):
         api_key = getattr(settings, 'GOOGLE_PLACES_API_KEY', '')
         
@@ -53,9 +76,13 @@ class Command(BaseCommand):
         delay = options['delay']
         limit = options.get('limit')
         university_id = options.get('university_id')
+        university_ids = options.get('university_ids')
+        fast_refresh = options.get('fast_refresh', False)
         
         if university_id:
             universities = University.objects.filter(id=university_id)
+        elif university_ids:
+            universities = University.objects.filter(id__in=university_ids)
         else:
             universities = University.objects.all()
         
@@ -69,45 +96,56 @@ class Command(BaseCommand):
         failed = 0
         skipped = 0
         
-        for index, university in enumerate(universities, 1):
-            self.stdout.write(
-                f'\n[{index}/{total}] Обработка: {university.name}'
-            )
-            
-            # Пропускаем, если уже есть рейтинг и place_id
-            if university.google_rating and university.google_place_id:
+        reset_api_stats()
+        started = time.monotonic()
+        
+        writer = BulkRatingWriter(GOOGLE_RATING_FIELDS, batch_size=options['batch_size'])
+        with writer:
+            for index, university in enumerate(universities, 1):
                 self.stdout.write(
-                    self.style.WARNING(f'  Пропущен (уже есть рейтинг: {university.google_rating})')
+                    f'\n[{index}/{total}] Обработка: {university.name}'
                 )
-                skipped += 1
-                continue
-            
-            try:
-                success = update_university_google_rating(university, verbose=options.get('verbose', False))
                 
-                if success:
+                # Пропускаем, если уже есть рейтинг и place_id
+                if not fast_refresh and university.google_rating and university.google_place_id:
                     self.stdout.write(
-                        self.style.SUCCESS(
-                            f'  [OK] Обновлен: рейтинг {university.google_rating}, '
-                            f'отзывов {university.google_reviews_count}'
-                        )
+                        self.style.WARNING(f'  Пропущен (уже есть рейтинг: {university.google_rating})')
                     )
-                    updated += 1
-                else:
+                    skipped += 1
+                    continue
+                
+                try:
+                    success = update_university_google_rating(
+                        university,
+                        verbose=options.get('verbose', False),
+                        fast=fast_refresh,
+                        commit=False
+                    )
+                    
+                    if success:
+                        writer.add(university)
+                        self.stdout.write(
+                            self.style.SUCCESS(
+                                f'  [OK] Обновлен: рейтинг {university.google_rating}, '
+                                f'отзывов {university.google_reviews_count}'
+                            )
+                        )
+                        updated += 1
+                    else:
+                        self.stdout.write(
+                            self.style.WARNING('  [FAIL] Рейтинг не найден в Google Places')
+                        )
+                        failed += 1
+                    
+                    # Задержка между запросами, чтобы не превысить лимиты API
+                    if index < total:
+                        time.sleep(delay)
+                        
+                except Exception as e:
                     self.stdout.write(
-                        self.style.WARNING('  [FAIL] Рейтинг не найден в Google Places')
+                        self.style.ERROR(f'  [ERROR] Ошибка: {str(e)}')
                     )
                     failed += 1
-                
-                # Задержка между запросами, чтобы не превысить лимиты API
-                if index < total:
-                    time.sleep(delay)
-                    
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'  [ERROR] Ошибка: {str(e)}')
-                )
-                failed += 1
         
         self.stdout.write('\n' + '='*50)
         self.stdout.write(
@@ -116,7 +154,22 @@ class Command(BaseCommand):
                 f'  Обновлено: {updated}\n'
                 f'  Не найдено: {failed}\n'
                 f'  Пропущено: {skipped}\n'
-                f'  Всего: {total}'
+                f'  Всего: {total}\n'
+                f'  Время выполнения: {time.monotonic() - started:.1f} с\n'
+                f'  Запросов сохранения в БД: {writer.flushes}'
             )
         )
+        
+        fast_path = API_STATS['google.fast_path']
+        fallbacks = API_STATS['google.fast_path_fallback']
+        # Каждое успешное обращение по ID заменяет полный поиск места,
+        # а при возврате к поиску запрос по ID оказывается лишним
+        saved = (fast_path - fallbacks) * (GOOGLE_DISCOVERY_MIN_CALLS - 1) - fallbacks
+        self.stdout.write(
+            f'\nЗапросы к API Google:\n'
+            f'  Выполнено запросов: {count_api_calls("google")}\n'
+            f'  Запросов по сохраненному ID без полного поиска: {fast_path - fallbacks}\n'
+            f'  Возвратов к полному поиску: {fallbacks}\n'
+            f'  Сэкономлено запросов (оценка): {max(saved, 0)}'
+        )
 
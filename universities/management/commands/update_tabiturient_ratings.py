@@ -2,8 +2,12 @@
 Команда для обновления рейтингов университетов с сайта tabiturient.ru
 """
 from django.core.management.base import BaseCommand
+from universities.catalog_cache import deferred_data_versions
 from universities.models import University
-from universities.utils import parse_tabiturient_ratings_page, update_university_tabiturient_rating
+from universities.utils import (
+    parse_tabiturient_ratings_page, update_university_tabiturient_rating, parse_id_list,
+    BulkRatingWriter, TABITURIENT_RATING_FIELDS,
+)
 import time
 from difflib import SequenceMatcher
 
@@ -35,6 +39,12 @@ class Command(BaseCommand):
             default=None,
             help='Обновить рейтинг только для конкретного университета',
         )
+        parser.add_argument(
+            '--university-ids',
+            type=parse_id_list,
+            default=None,
+            help='Обновить рейтинги только для перечисленных университетов (ID через запятую)',
+        )
         parser.add_argument(
             '--verbose',
             action='store_true',
@@ -45,13 +55,23 @@ class Command(BaseCommand):
             action='store_true',
             help='Использовать пакетный режим: загрузить все рейтинги сразу и сопоставить',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Количество университетов, сохраняемых одним запросом bulk_update (по умолчанию 200)',
+        )
 
+    @deferred_data_versions()
     def handle(self, *args, **options):
         delay = options['delay']
         limit = options.get('limit')
         university_id = options.get('university_id')
+        university_ids = options.get('university_ids')
         verbose = options.get('verbose', False)
         batch_mode = options.get('batch', False)
+        started = time.monotonic()
+        writer = BulkRatingWriter(TABITURIENT_RATING_FIELDS, batch_size=options['batch_size'])
         
         if batch_mode:
             # Пакетный режим: загружаем все рейтинги сразу
@@ -68,6 +88,8 @@ class Command(BaseCommand):
             
             if university_id:
                 universities = University.objects.filter(id=university_id)
+            elif university_ids:
+                universities = University.objects.filter(id__in=university_ids)
             else:
                 universities = University.objects.all()
             
@@ -78,36 +100,37 @@ class Command(BaseCommand):
             matched = 0
             not_found = 0
             
-            for university in universities:
-                # Ищем наиболее похожее название
-                best_match = None
-                best_similarity = 0.0
+            with writer:
+                for university in universities:
+                    # Ищем наиболее похожее название
+                    best_match = None
+                    best_similarity = 0.0
                 
-                for rating_item in ratings_list:
-                    sim = similarity(university.name, rating_item['name'])
-                    if sim > best_similarity and sim > 0.7:  # Минимальная схожесть 70%
-                        best_similarity = sim
-                        best_match = rating_item
+                    for rating_item in ratings_list:
+                        sim = similarity(university.name, rating_item['name'])
+                        if sim > best_similarity and sim > 0.7:  # Минимальная схожесть 70%
+                            best_similarity = sim
+                            best_match = rating_item
                 
-                if best_match:
-                    university.tabiturient_rating = best_match.get('rating')
-                    university.tabiturient_rank = best_match.get('rank')
-                    university.tabiturient_category = best_match.get('category', '')
-                    university.save(update_fields=['tabiturient_rating', 'tabiturient_rank', 'tabiturient_category'])
+                    if best_match:
+                        university.tabiturient_rating = best_match.get('rating')
+                        university.tabiturient_rank = best_match.get('rank')
+                        university.tabiturient_category = best_match.get('category') or ''
+                        writer.add(university)
                     
-                    if verbose:
-                        self.stdout.write(
-                            f'  [OK] {university.name} -> {best_match["name"]} '
-                            f'(схожесть: {best_similarity:.2f}, рейтинг: {best_match.get("rating")}, место: {best_match.get("rank")})'
-                        )
-                    updated += 1
-                    matched += 1
-                else:
-                    if verbose:
-                        self.stdout.write(
-                            self.style.WARNING(f'  [FAIL] Не найдено совпадение для: {university.name}')
-                        )
-                    not_found += 1
+                        if verbose:
+                            self.stdout.write(
+                                f'  [OK] {university.name} -> {best_match["name"]} '
+                                f'(схожесть: {best_similarity:.2f}, рейтинг: {best_match.get("rating")}, место: {best_match.get("rank")})'
+                            )
+                        updated += 1
+                        matched += 1
+                    else:
+                        if verbose:
+                            self.stdout.write(
+                                self.style.WARNING(f'  [FAIL] Не найдено совпадение для: {university.name}')
+                            )
+                        not_found += 1
             
             self.stdout.write('\n' + '='*50)
             self.stdout.write(
@@ -116,13 +139,17 @@ class Command(BaseCommand):
                     f'  Обновлено: {updated}\n'
                     f'  Найдено совпадений: {matched}\n'
                     f'  Не найдено: {not_found}\n'
-                    f'  Всего обработано: {universities.count()}'
+                    f'  Всего обработано: {universities.count()}\n'
+                    f'  Время выполнения: {time.monotonic() - started:.1f} с\n'
+                    f'  Запросов сохранения в БД: {writer.flushes}'
                 )
             )
         else:
             # Поштучный режим: запрашиваем рейтинг для каждого университета отдельно
             if university_id:
                 universities = University.objects.filter(id=university_id)
+            elif university_ids:
+                universities = University.objects.filter(id__in=university_ids)
             else:
                 universities = University.objects.all()
             
@@ -136,45 +163,47 @@ class Command(BaseCommand):
             failed = 0
             skipped = 0
             
-            for index, university in enumerate(universities, 1):
-                self.stdout.write(
-                    f'\n[{index}/{total}] Обработка: {university.name}'
-                )
-                
-                # Пропускаем, если уже есть рейтинг
-                if university.tabiturient_rating and university.tabiturient_rank:
+            with writer:
+                for index, university in enumerate(universities, 1):
                     self.stdout.write(
-                        self.style.WARNING(f'  Пропущен (уже есть рейтинг: {university.tabiturient_rating}, место: {university.tabiturient_rank})')
+                        f'\n[{index}/{total}] Обработка: {university.name}'
                     )
-                    skipped += 1
-                    continue
                 
-                try:
-                    success = update_university_tabiturient_rating(university, verbose=verbose)
-                    
-                    if success:
+                    # Пропускаем, если уже есть рейтинг
+                    if university.tabiturient_rating and university.tabiturient_rank:
                         self.stdout.write(
-                            self.style.SUCCESS(
-                                f'  [OK] Обновлен: рейтинг {university.tabiturient_rating}, '
-                                f'место {university.tabiturient_rank}, категория {university.tabiturient_category}'
-                            )
+                            self.style.WARNING(f'  Пропущен (уже есть рейтинг: {university.tabiturient_rating}, место: {university.tabiturient_rank})')
                         )
-                        updated += 1
-                    else:
+                        skipped += 1
+                        continue
+                
+                    try:
+                        success = update_university_tabiturient_rating(university, verbose=verbose, commit=False)
+                    
+                        if success:
+                            writer.add(university)
+                            self.stdout.write(
+                                self.style.SUCCESS(
+                                    f'  [OK] Обновлен: рейтинг {university.tabiturient_rating}, '
+                                    f'место {university.tabiturient_rank}, категория {university.tabiturient_category}'
+                                )
+                            )
+                            updated += 1
+                        else:
+                            self.stdout.write(
+                                self.style.WARNING('  [FAIL] Рейтинг не найден на tabiturient.ru')
+                            )
+                            failed += 1
+                    
+                        # Задержка между запросами
+                        if index < total:
+                            time.sleep(delay)
+                        
+                    except Exception as e:
                         self.stdout.write(
-                            self.style.WARNING('  [FAIL] Рейтинг не найден на tabiturient.ru')
+                            self.style.ERROR(f'  [ERROR] Ошибка: {str(e)}')
                         )
                         failed += 1
-                    
-                    # Задержка между запросами
-                    if index < total:
-                        time.sleep(delay)
-                        
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(f'  [ERROR] Ошибка: {str(e)}')
-                    )
-                    failed += 1
             
             self.stdout.write('\n' + '='*50)
             self.stdout.write(
@@ -183,7 +212,9 @@ class Command(BaseCommand):
                     f'  Обновлено: {updated}\n'
                     f'  Не найдено: {failed}\n'
                     f'  Пропущено: {skipped}\n'
-                    f'  Всего: {total}'
+                    f'  Всего: {total}\n'
+                    f'  Время выполнения: {time.monotonic() - started:.1f} с\n'
+                    f'  Запросов сохранения в БД: {writer.flushes}'
                 )
             )
 
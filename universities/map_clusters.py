@@ -0,0 +1,149 @@
+"""
+Кластеры вузов для карты
+
+Вместо всех вузов клиент карты получает маркеры видимой области для текущего
+масштаба: вузы, которые на экране оказались бы ближе CLUSTER_CELL_PX пикселей,
+объединяются в кластер с количеством вузов и центром.
+
+Кластеризация - по сетке в координатах Web Mercator: ячейка масштаба z
+содержит ровно четыре ячейки масштаба z + 1, поэтому уровни строятся снизу
+вверх объединением кластеров соседнего уровня (как в supercluster). Для
+кластера известен масштаб, на котором он распадается (expansion_zoom), - по
+нему клиент приближает карту при нажатии на кластер.
+
+Все уровни строятся одним запросом и перестраиваются, когда меняется версия
+данных вузов (DataVersion 'universities'). Запрос области - фильтр кластеров
+одного уровня по прямоугольнику, без обращения к БД.
+"""
+import math
+from typing import Dict, List
+
+from .catalog_cache import get_data_versions
+from .models import University
+
+
+# Размер ячейки кластеризации в пикселях экрана (тайлы 256 x 256)
+CLUSTER_CELL_PX = 64
+
+# Масштаб, начиная с которого кластеры не объединяются (вузы одного здания
+# остаются кластером и на большем масштабе)
+MAX_CLUSTER_ZOOM = 17
+
+MAX_ZOOM = 22
+
+# Широта, ограничивающая проекцию Web Mercator
+MAX_LATITUDE = 85.05112878
+
+# Текущие кластеры процесса: 'current' -> MapClusters
+_clusters = {}
+
+
+def mercator(lat, lon):
+    """Координаты точки в проекции Web Mercator, нормированные к [0, 1)"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    sin_lat = math.sin(math.radians(lat))
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return min(max(x, 0.0), 1.0 - 1e-12), min(max(y, 0.0), 1.0 - 1e-12)
+
+
+class MapClusters:
+    """
+    Кластеры всех уровней масштаба
+    
+    levels[z]: список (широта, долгота, количество, expansion_zoom, id, название),
+    id и название - только для одиночного вуза
+    """
+    
+    def __init__(self, version, points):
+        self.version = version
+        self.size = len(points)
+        
+        # Ячейка масштаба z: номер ячейки сетки 2 ** z * 256 / CLUSTER_CELL_PX
+        cells_per_world = 2 ** MAX_CLUSTER_ZOOM * 256 // CLUSTER_CELL_PX
+        # Кластер: [количество, сумма широт, сумма долгот, expansion_zoom, id, название]
+        level = {}
+        for university_id, name, lat, lon in points:
+            x, y = mercator(lat, lon)
+            cell = (int(x * cells_per_world), int(y * cells_per_world))
+            cluster = level.get(cell)
+            if cluster is None:
+                level[cell] = [1, lat, lon, None, university_id, name]
+            else:
+                cluster[0] += 1
+                cluster[1] += lat
+                cluster[2] += lon
+                cluster[4] = cluster[5] = None
+        
+        self.levels = [None] * (MAX_CLUSTER_ZOOM + 1)
+        self.levels[MAX_CLUSTER_ZOOM] = self._freeze(level)
+        for zoom in range(MAX_CLUSTER_ZOOM - 1, -1, -1):
+            parents = {}
+            for (cell_x, cell_y), cluster in level.items():
+                parent_cell = (cell_x >> 1, cell_y >> 1)
+                parent = parents.get(parent_cell)
+                if parent is None:
+                    parents[parent_cell] = list(cluster)
+                else:
+                    parent[0] += cluster[0]
+                    parent[1] += cluster[1]
+                    parent[2] += cluster[2]
+                    # Объединились несколько кластеров - они разделяются на следующем масштабе
+                    parent[3] = zoom + 1
+                    parent[4] = parent[5] = None
+            level = parents
+            self.levels[zoom] = self._freeze(level)
+    
+    @staticmethod
+    def _freeze(level):
+        return [
+            (lat_sum / count, lon_sum / count, count, expansion_zoom, university_id, name)
+            for count, lat_sum, lon_sum, expansion_zoom, university_id, name in level.values()
+        ]
+    
+    @classmethod
+    def build(cls, version):
+        """Кластеры по данным БД (1 запрос)"""
+        points = [
+            (university_id, short_name or name, lat, lon)
+            for university_id, name, short_name, lat, lon in University.objects.filter(
+                latitude__isnull=False, longitude__isnull=False
+            ).order_by('id').values_list('id', 'name', 'short_name', 'latitude', 'longitude')
+        ]
+        return cls(version, points)
+    
+    def query(self, zoom, west=-180.0, south=-90.0, east=180.0, north=90.0) -> List[Dict]:
+        """
+        Маркеры области для масштаба zoom: кластеры (lat, lng, count, expansion_zoom)
+        и одиночные вузы (id, name, lat, lng). west > east - область через 180-й меридиан
+        """
+        level = self.levels[min(max(zoom, 0), MAX_CLUSTER_ZOOM)]
+        across_antimeridian = west > east
+        markers = []
+        for lat, lon, count, expansion_zoom, university_id, name in level:
+            if not south <= lat <= north:
+                continue
+            if across_antimeridian:
+                if east < lon < west:
+                    continue
+            elif not west <= lon <= east:
+                continue
+            if university_id is not None:
+                markers.append({'id': university_id, 'name': name, 'lat': round(lat, 6), 'lng': round(lon, 6)})
+            else:
+                # expansion_zoom = None: вузы одной ячейки MAX_CLUSTER_ZOOM не разделяются
+                markers.append({
+                    'lat': round(lat, 5), 'lng': round(lon, 5), 'count': count,
+                    'expansion_zoom': expansion_zoom,
+                })
+        return markers
+
+
+def get_map_clusters() -> MapClusters:
+    """Актуальные кластеры карты (1 запрос версии, перестройка при изменении вузов)"""
+    version = get_data_versions('universities')['universities'][0]
+    clusters = _clusters.get('current')
+    if clusters is None or clusters.version != version:
+        clusters = MapClusters.build(version)
+        _clusters['current'] = clusters
+    return clusters
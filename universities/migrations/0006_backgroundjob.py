@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('universities', '0005_universityrepresentative'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('update_google_ratings', 'Обновление рейтингов Google'), ('update_yandex_ratings', 'Обновление рейтингов Яндекс Карт'), ('update_tabiturient_ratings', 'Обновление рейтингов Табитуриент.ру'), ('import_from_excel', 'Импорт вузов и специальностей из Excel'), ('populate_data', 'Заполнение примерами университетов'), ('populate_extended_data', 'Заполнение расширенными данными'), ('populate_all_russian_universities', 'Заполнение всеми университетами РФ')], max_length=50, verbose_name='Тип задачи')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Параметры команды')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершена'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('progress', models.PositiveIntegerField(default=0, verbose_name='Обработано')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Всего')),
+                ('output', models.TextField(blank=True, verbose_name='Вывод команды')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Воркер')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начало выполнения')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Окончание выполнения')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='job_status_created_idx')],
+            },
+        ),
+    ]
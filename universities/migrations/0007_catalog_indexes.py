@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('universities', '0006_backgroundjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['university', 'is_published', '-created_at'], name='news_univ_pub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-created_at'], name='news_published_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='program',
+            index=models.Index(fields=['faculty', 'tuition_fee'], name='program_faculty_fee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(fields=['region', 'name'], name='univ_region_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(fields=['university_type', 'name'], name='univ_type_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['name'], name='univ_public_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(fields=['city'], name='univ_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='universityrating',
+            index=models.Index(fields=['university', '-created_at'], name='rating_univ_created_idx'),
+        ),
+    ]
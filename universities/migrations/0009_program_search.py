@@ -0,0 +1,94 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:16
+
+from django.db import DatabaseError, migrations, models, transaction
+
+
+def fill_search_fields(apps, schema_editor):
+    Program = apps.get_model('universities', 'Program')
+    programs = []
+    for program in Program.objects.only('id', 'name').iterator(chunk_size=2000):
+        program.search_name = ' '.join(program.name.lower().replace('ё', 'е').split())
+        programs.append(program)
+        if len(programs) >= 2000:
+            Program.objects.bulk_update(programs, ['search_name'])
+            programs = []
+    if programs:
+        Program.objects.bulk_update(programs, ['search_name'])
+    
+    University = apps.get_model('universities', 'University')
+    UniversityRating = apps.get_model('universities', 'UniversityRating')
+    stats = UniversityRating.objects.values('university_id').annotate(
+        avg=models.Avg('rating'), count=models.Count('id')
+    )
+    for row in stats:
+        University.objects.filter(pk=row['university_id']).update(
+            users_rating=row['avg'], users_ratings_count=row['count']
+        )
+
+
+def create_trigram_index(apps, schema_editor):
+    # В PostgreSQL поиск по подстроке (LIKE '%...%') использует триграммный индекс.
+    # Для CREATE EXTENSION нужны права; без них поиск работает последовательным чтением
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            schema_editor.execute(
+                'CREATE INDEX IF NOT EXISTS program_search_name_trgm_idx '
+                'ON universities_program USING gin (search_name gin_trgm_ops)'
+            )
+    except DatabaseError:
+        pass
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS program_search_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('universities', '0008_data_version'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='program',
+            name='search_name',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='Название для поиска'),
+        ),
+        migrations.AddField(
+            model_name='university',
+            name='users_rating',
+            field=models.FloatField(default=0, editable=False, verbose_name='Средняя оценка пользователей'),
+        ),
+        migrations.AddField(
+            model_name='university',
+            name='users_ratings_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество оценок пользователей'),
+        ),
+        migrations.AddIndex(
+            model_name='faculty',
+            index=models.Index(fields=['name'], name='faculty_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='program',
+            index=models.Index(fields=['tuition_fee', 'id'], name='program_fee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='program',
+            index=models.Index(fields=['degree_level', 'tuition_fee'], name='program_level_fee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='program',
+            index=models.Index(fields=['search_name', 'id'], name='program_search_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(fields=['-users_rating', 'id'], name='univ_users_rating_idx'),
+        ),
+        migrations.RunPython(fill_search_fields, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
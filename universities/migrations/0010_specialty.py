@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('universities', '0009_program_search'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='Specialty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(blank=True, help_text='Например, 09.03.01', max_length=8, verbose_name='Код ФГОС')),
+                ('name', models.CharField(max_length=200, verbose_name='Название')),
+                ('key', models.CharField(db_index=True, max_length=200, verbose_name='Нормализованное название')),
+            ],
+            options={
+                'verbose_name': 'Специальность',
+                'verbose_name_plural': 'Специальности',
+                'ordering': ['code', 'name'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('code', ''), _negated=True), fields=('code',), name='specialty_code_unique'), models.UniqueConstraint(condition=models.Q(('code', '')), fields=('key',), name='specialty_key_unique')],
+            },
+        ),
+        migrations.AddField(
+            model_name='program',
+            name='specialty',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='programs', to='universities.specialty', verbose_name='Специальность'),
+        ),
+        migrations.AddIndex(
+            model_name='program',
+            index=models.Index(fields=['specialty', 'tuition_fee'], name='program_specialty_fee_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('universities', '0010_specialty'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='university',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Широта'),
+        ),
+        migrations.AddField(
+            model_name='university',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Долгота'),
+        ),
+    ]
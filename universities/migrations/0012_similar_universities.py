@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('universities', '0011_university_coordinates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('update_google_ratings', 'Обновление рейтингов Google'), ('update_yandex_ratings', 'Обновление рейтингов Яндекс Карт'), ('update_tabiturient_ratings', 'Обновление рейтингов Табитуриент.ру'), ('import_from_excel', 'Импорт вузов и специальностей из Excel'), ('build_similar_universities', 'Пересчет похожих университетов'), ('populate_data', 'Заполнение примерами университетов'), ('populate_extended_data', 'Заполнение расширенными данными'), ('populate_all_russian_universities', 'Заполнение всеми университетами РФ')], max_length=50, verbose_name='Тип задачи'),
+        ),
+        migrations.CreateModel(
+            name='SimilarUniversity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Место')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='universities.university', verbose_name='Похожий университет')),
+                ('university', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_links', to='universities.university', verbose_name='Университет')),
+            ],
+            options={
+                'verbose_name': 'Похожий университет',
+                'verbose_name_plural': 'Похожие университеты',
+                'ordering': ['university', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('university', 'rank'), name='similar_univ_rank_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('universities', '0013_preference_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='views_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Просмотры'),
+        ),
+        migrations.AddField(
+            model_name='university',
+            name='views_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Просмотры страницы'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(fields=['-views_count', 'name'], name='univ_views_count_idx'),
+        ),
+    ]
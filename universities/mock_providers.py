@@ -0,0 +1,294 @@
+"""
+Локальный mock-сервер внешних провайдеров рейтингов
+
+Имитирует форматы ответов, которые разбираются в universities/utils.py:
+Google Places (geocode, findplacefromtext, textsearch, details),
+Яндекс Geocoder / Search API и HTML-страницу рейтинга tabiturient.ru.
+Используется для воспроизводимого нагрузочного тестирования команд
+update_*_ratings без обращения к реальным API.
+
+Маршруты:
+    /google/geocode/json
+    /google/place/findplacefromtext/json
+    /google/place/textsearch/json
+    /google/place/details/json
+    /yandex/geocode/1.x/
+    /yandex/search/v1/
+    /tabiturient/globalrating/
+    /stats/
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+
+# Префикс ID мест, выдаваемых mock-сервером. Details по ID без этого
+# префикса возвращает NOT_FOUND, что позволяет проверить возврат к полному поиску.
+MOCK_PLACE_ID_PREFIX = 'mock-'
+
+CATEGORIES = ['A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C']
+
+
+def _stable_random(*parts) -> random.Random:
+    """Генератор случайных чисел, детерминированный для одного и того же запроса"""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def _place_id(name: str) -> str:
+    return MOCK_PLACE_ID_PREFIX + hashlib.md5(name.encode('utf-8')).hexdigest()[:16]
+
+
+class MockProviderConfig:
+    """Параметры поведения mock-сервера"""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, not_found_rate: float = 0.0,
+                 seed: int = 0, university_names: Optional[List[str]] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.not_found_rate = not_found_rate
+        self.seed = seed
+        self.university_names = university_names or []
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов к mock-провайдерам"""
+
+    server_version = 'MockProviders/1.0'
+
+    @property
+    def config(self) -> MockProviderConfig:
+        return self.server.config
+
+    def log_message(self, format, *args):
+        # Логирование каждого запроса искажает замеры пропускной способности
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        path = parsed.path.rstrip('/') + '/'
+
+        routes = {
+            '/google/geocode/json/': self.google_geocode,
+            '/google/place/findplacefromtext/json/': self.google_find_place,
+            '/google/place/textsearch/json/': self.google_text_search,
+            '/google/place/details/json/': self.google_details,
+            '/yandex/geocode/1.x/': self.yandex_geocode,
+            '/yandex/search/v1/': self.yandex_search,
+            '/tabiturient/globalrating/': self.tabiturient_page,
+        }
+
+        if path == '/stats/':
+            with self.config.lock:
+                return self.send_json(dict(self.config.stats))
+
+        handler = routes.get(path)
+        if handler is None:
+            return self.send_json({'error': 'not found'}, status=404)
+
+        with self.config.lock:
+            self.config.stats[path] += 1
+            roll = self.config.random.random()
+            delay = self.config.latency + self.config.random.uniform(0, self.config.jitter)
+
+        time.sleep(delay)
+
+        if roll < self.config.rate_limit_rate:
+            with self.config.lock:
+                self.config.stats['429'] += 1
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            with self.config.lock:
+                self.config.stats['500'] += 1
+            return self.send_json({'error': 'internal error'}, status=500)
+
+        handler(params)
+
+    def send_json(self, data: Dict, status: int = 200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_html(self, html: str):
+        body = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def is_not_found(self, query: str) -> bool:
+        """Детерминированно решает, что место по запросу не найдено"""
+        return _stable_random(self.config.seed, 'nf', query).random() < self.config.not_found_rate
+
+    def place(self, query: str) -> Dict:
+        """Данные места, стабильные для одного и того же запроса"""
+        rnd = _stable_random(self.config.seed, query)
+        return {
+            'place_id': _place_id(query),
+            'name': query,
+            'rating': round(rnd.uniform(3.0, 5.0), 1),
+            'user_ratings_total': rnd.randint(5, 3000),
+            'lat': round(rnd.uniform(43.0, 60.0), 6),
+            'lng': round(rnd.uniform(30.0, 90.0), 6),
+        }
+
+    # Google Places
+
+    def google_geocode(self, params):
+        query = params.get('address', '')
+        if self.is_not_found(query):
+            return self.send_json({'status': 'ZERO_RESULTS', 'results': []})
+        place = self.place(query)
+        self.send_json({
+            'status': 'OK',
+            'results': [{'geometry': {'location': {'lat': place['lat'], 'lng': place['lng']}}}],
+        })
+
+    def google_find_place(self, params):
+        query = params.get('input', '')
+        if self.is_not_found(query):
+            return self.send_json({'status': 'ZERO_RESULTS', 'candidates': []})
+        place = self.place(query)
+        self.send_json({
+            'status': 'OK',
+            'candidates': [{
+                'place_id': place['place_id'],
+                'name': place['name'],
+                'rating': place['rating'],
+                'user_ratings_total': place['user_ratings_total'],
+                'geometry': {'location': {'lat': place['lat'], 'lng': place['lng']}},
+            }],
+        })
+
+    def google_text_search(self, params):
+        query = params.get('query', '')
+        place = self.place(query)
+        self.send_json({
+            'status': 'OK',
+            'results': [{
+                'place_id': place['place_id'],
+                'name': place['name'],
+                'rating': place['rating'],
+                'user_ratings_total': place['user_ratings_total'],
+            }],
+        })
+
+    def google_details(self, params):
+        place_id = params.get('place_id', '')
+        if not place_id.startswith(MOCK_PLACE_ID_PREFIX):
+            return self.send_json({'status': 'NOT_FOUND'})
+        place = self.place(place_id)
+        self.send_json({
+            'status': 'OK',
+            'result': {
+                'place_id': place_id,
+                'rating': place['rating'],
+                'user_ratings_total': place['user_ratings_total'],
+            },
+        })
+
+    # Яндекс
+
+    def yandex_geocode(self, params):
+        query = params.get('geocode', '')
+        members = []
+        if not self.is_not_found(query):
+            place = self.place(query)
+            members.append({'GeoObject': {'Point': {'pos': f"{place['lng']} {place['lat']}"}}})
+        self.send_json({'response': {'GeoObjectCollection': {'featureMember': members}}})
+
+    def yandex_search(self, params):
+        uri = params.get('uri', '')
+        if uri:
+            place_id = uri.split('oid=')[-1]
+            if not place_id.startswith(MOCK_PLACE_ID_PREFIX):
+                return self.send_json({'type': 'FeatureCollection', 'features': []})
+            place = self.place(place_id)
+        else:
+            place = self.place(params.get('text', ''))
+            place_id = place['place_id']
+        self.send_json({
+            'type': 'FeatureCollection',
+            'features': [{
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [place['lng'], place['lat']]},
+                'properties': {
+                    'name': place['name'],
+                    'CompanyMetaData': {
+                        'id': place_id,
+                        'name': place['name'],
+                        'rating': place['rating'],
+                        'reviews': place['user_ratings_total'],
+                    },
+                },
+            }],
+        })
+
+    # tabiturient.ru
+
+    def tabiturient_page(self, params):
+        self.send_html(self.server.tabiturient_html)
+
+
+def build_tabiturient_html(names: List[str], seed: int = 0) -> str:
+    """Строит страницу рейтинга в разметке tabiturient.ru (таблицы listtop100)"""
+    rows = []
+    scored = []
+    for name in names:
+        rnd = _stable_random(seed, 'tabiturient', name)
+        scored.append((round(rnd.uniform(20, 200), 2), name))
+    scored.sort(reverse=True)
+
+    for rank, (rating, name) in enumerate(scored, 1):
+        category = CATEGORIES[min((rank - 1) * len(CATEGORIES) // max(len(scored), 1), len(CATEGORIES) - 1)]
+        rows.append(
+            '<table class="listtop100"><tr>'
+            f'<td class="tdtop100"><span class="font2"><b>#{rank}</b></span><span class="font3">+0</span></td>'
+            '<td class="tdtop100"><img src="/img/logo.png" alt=""></td>'
+            f'<td class="tdtop100"><span class="font2 mobile"><b>#{rank}</b></span>'
+            f'<span class="font2"><b>{name}</b></span><br><span class="font3">{name}</span></td>'
+            f'<td class="tdtop100"><span class="font2"><b>{rating}</b></span></td>'
+            f'<td class="tdtop100"><span class="font2"><b>{category}</b></span></td>'
+            '<td class="tdtop100"><span class="arrow"></span></td>'
+            '</tr></table>'
+        )
+
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Рейтинг вузов</title></head>'
+        '<body><div class="header"><table><tr><td>Меню</td></tr></table></div>'
+        '<div class="content">' + '\n'.join(rows) + '</div></body></html>'
+    )
+
+
+class MockProviderServer(ThreadingHTTPServer):
+    """Многопоточный HTTP сервер mock-провайдеров"""
+
+    daemon_threads = True
+
+    def __init__(self, address, config: MockProviderConfig):
+        super().__init__(address, MockProviderHandler)
+        self.config = config
+        names = config.university_names or [f'Университет {i}' for i in range(1, 301)]
+        self.tabiturient_html = build_tabiturient_html(names, seed=config.seed)
@@ -3,6 +3,20 @@ from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
+# Поля, которые меняются только запросами UPDATE (University.update_users_rating,
+# пакетное сохранение просмотров в view_counters.py): полное сохранение
+# загруженного объекта записало бы в них значения на момент загрузки
+COUNTER_FIELDS = ('users_rating', 'users_ratings_count', 'views_count')
+
+
+def save_without_counters(instance):
+    """Сохраняет измененный объект без полей COUNTER_FIELDS (update_fields)"""
+    instance.save(update_fields=[
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in COUNTER_FIELDS
+    ])
+
+
 class Region(models.Model):
     """Регион РФ"""
     name = models.CharField(max_length=100, verbose_name="Название региона")
@@ -38,6 +52,9 @@ class University(models.Model):
     region = models.ForeignKey(Region, on_delete=models.CASCADE, verbose_name="Регион")
     city = models.CharField(max_length=100, verbose_name="Город")
     address = models.TextField(verbose_name="Адрес")
+    # Координаты сохраняются при обновлении рейтингов Яндекс/Google и командой geocode_universities
+    latitude = models.FloatField(blank=True, null=True, verbose_name="Широта")
+    longitude = models.FloatField(blank=True, null=True, verbose_name="Долгота")
     website = models.URLField(blank=True, verbose_name="Официальный сайт")
     email = models.EmailField(blank=True, verbose_name="Email")
     phone = models.CharField(max_length=20, blank=True, verbose_name="Телефон")
@@ -55,6 +72,13 @@ class University(models.Model):
     tabiturient_rating = models.FloatField(blank=True, null=True, verbose_name="Рейтинг Табитуриент.ру")
     tabiturient_rank = models.IntegerField(blank=True, null=True, verbose_name="Место в рейтинге Табитуриент.ру")
     tabiturient_category = models.CharField(max_length=10, blank=True, verbose_name="Категория рейтинга (A+, A, B, etc.)")
+    # Средняя оценка пользователей (UniversityRating), пересчитывается сигналами;
+    # используется для сортировки без агрегации отзывов в запросе
+    users_rating = models.FloatField(default=0, editable=False, verbose_name="Средняя оценка пользователей")
+    users_ratings_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Количество оценок пользователей")
+    # Просмотры страницы вуза: накапливаются в памяти процесса и сохраняются
+    # пакетно (universities/view_counters.py); сортировка «Сначала популярные»
+    views_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Просмотры страницы")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -62,10 +86,29 @@ class University(models.Model):
         verbose_name = "Университет"
         verbose_name_plural = "Университеты"
         ordering = ['name']
+        # Индексы под фильтры каталога (university_list_view, comparison_view)
+        indexes = [
+            models.Index(fields=['region', 'name'], name='univ_region_name_idx'),
+            models.Index(fields=['university_type', 'name'], name='univ_type_name_idx'),
+            models.Index(fields=['name'], condition=models.Q(is_public=True), name='univ_public_name_idx'),
+            models.Index(fields=['city'], name='univ_city_idx'),
+            models.Index(fields=['-users_rating', 'id'], name='univ_users_rating_idx'),
+            models.Index(fields=['-views_count', 'name'], name='univ_views_count_idx'),
+        ]
     
     def __str__(self):
         return self.name
     
+    def update_users_rating(self):
+        """Пересчитывает среднюю оценку пользователей (без изменения updated_at)"""
+        stats = self.ratings.aggregate(avg=models.Avg('rating'), count=models.Count('id'))
+        self.users_rating = stats['avg'] or 0
+        self.users_ratings_count = stats['count']
+        University.objects.filter(pk=self.pk).update(
+            users_rating=self.users_rating,
+            users_ratings_count=self.users_ratings_count,
+        )
+    
     @property
     def average_rating(self):
         """Средний рейтинг университета"""
@@ -86,11 +129,40 @@ class Faculty(models.Model):
         verbose_name = "Факультет"
         verbose_name_plural = "Факультеты"
         ordering = ['name']
+        # Фильтр поиска программ по форме обучения (название факультета при импорте из Excel)
+        indexes = [
+            models.Index(fields=['name'], name='faculty_name_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.university.short_name})"
 
 
+class Specialty(models.Model):
+    """
+    Специальность (направление подготовки) - общий справочник для программ
+    разных вузов. Программы связываются со специальностью при импорте
+    (universities/specialties.py) по коду ФГОС или нормализованному названию
+    """
+    code = models.CharField(max_length=8, blank=True, verbose_name="Код ФГОС", help_text="Например, 09.03.01")
+    name = models.CharField(max_length=200, verbose_name="Название")
+    # Ключ сопоставления названий программ (specialties.specialty_key); одно название
+    # может иметь несколько кодов (бакалавриат и магистратура)
+    key = models.CharField(max_length=200, db_index=True, verbose_name="Нормализованное название")
+    
+    class Meta:
+        verbose_name = "Специальность"
+        verbose_name_plural = "Специальности"
+        ordering = ['code', 'name']
+        constraints = [
+            models.UniqueConstraint(fields=['code'], condition=~models.Q(code=''), name='specialty_code_unique'),
+            models.UniqueConstraint(fields=['key'], condition=models.Q(code=''), name='specialty_key_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.code} {self.name}" if self.code else self.name
+
+
 class Program(models.Model):
     """Образовательная программа"""
     name = models.CharField(max_length=200, verbose_name="Название программы")
@@ -99,14 +171,35 @@ class Program(models.Model):
     duration_years = models.PositiveIntegerField(verbose_name="Срок обучения (лет)")
     description = models.TextField(blank=True, verbose_name="Описание")
     tuition_fee = models.PositiveIntegerField(blank=True, null=True, verbose_name="Стоимость обучения (руб/год)")
+    specialty = models.ForeignKey(Specialty, on_delete=models.SET_NULL, blank=True, null=True, related_name='programs', verbose_name="Специальность")
+    # Название в нижнем регистре для поиска: LIKE в SQLite не учитывает регистр только для латиницы
+    search_name = models.CharField(max_length=200, blank=True, editable=False, verbose_name="Название для поиска")
     
     class Meta:
         verbose_name = "Образовательная программа"
         verbose_name_plural = "Образовательные программы"
         ordering = ['name']
+        # Минимальная стоимость по факультету читается из индекса;
+        # поиск программ (program_search.py) - сортировка по стоимости и фильтр по уровню
+        indexes = [
+            models.Index(fields=['faculty', 'tuition_fee'], name='program_faculty_fee_idx'),
+            models.Index(fields=['tuition_fee', 'id'], name='program_fee_idx'),
+            models.Index(fields=['degree_level', 'tuition_fee'], name='program_level_fee_idx'),
+            models.Index(fields=['search_name', 'id'], name='program_search_name_idx'),
+            # Вузы со специальностью и стоимостью не выше заданной - диапазон по индексу
+            models.Index(fields=['specialty', 'tuition_fee'], name='program_specialty_fee_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.faculty.university.short_name})"
+    
+    @staticmethod
+    def normalize_search_name(name):
+        return ' '.join(name.lower().replace('ё', 'е').split())
+    
+    def save(self, *args, **kwargs):
+        self.search_name = self.normalize_search_name(self.name)
+        super().save(*args, **kwargs)
 
 
 class UniversityRating(models.Model):
@@ -125,6 +218,9 @@ class UniversityRating(models.Model):
         verbose_name = "Рейтинг университета"
         verbose_name_plural = "Рейтинги университетов"
         unique_together = ['university', 'user']
+        indexes = [
+            models.Index(fields=['university', '-created_at'], name='rating_univ_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.university.name} - {self.rating}/5"
@@ -144,6 +240,71 @@ class UniversityComparison(models.Model):
         return f"Сравнение {self.universities.count()} университетов"
 
 
+class SimilarUniversity(models.Model):
+    """
+    Похожий университет. Таблица пересчитывается целиком командой
+    build_similar_universities (universities/similarity.py)
+    """
+    university = models.ForeignKey(University, on_delete=models.CASCADE, related_name='similar_links', verbose_name="Университет")
+    similar = models.ForeignKey(University, on_delete=models.CASCADE, related_name='+', verbose_name="Похожий университет")
+    rank = models.PositiveSmallIntegerField(verbose_name="Место")
+    score = models.FloatField(verbose_name="Сходство")
+    
+    class Meta:
+        verbose_name = "Похожий университет"
+        verbose_name_plural = "Похожие университеты"
+        ordering = ['university', 'rank']
+        # Блок похожих вузов на странице вуза - один запрос по этому индексу
+        constraints = [
+            models.UniqueConstraint(fields=['university', 'rank'], name='similar_univ_rank_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.university_id} -> {self.similar_id} ({self.score:.3f})"
+
+
+class CoLikedUniversity(models.Model):
+    """
+    Вуз, который понравился пользователям, отметившим данный вуз
+    (избранное и высокие оценки). Рассчитывается командой build_recommendations
+    (universities/recommendations.py)
+    """
+    university = models.ForeignKey(University, on_delete=models.CASCADE, related_name='coliked_links', verbose_name="Университет")
+    similar = models.ForeignKey(University, on_delete=models.CASCADE, related_name='+', verbose_name="Также нравится")
+    rank = models.PositiveSmallIntegerField(verbose_name="Место")
+    score = models.FloatField(verbose_name="Сходство")
+    
+    class Meta:
+        verbose_name = "Рекомендация по предпочтениям"
+        verbose_name_plural = "Рекомендации по предпочтениям"
+        ordering = ['university', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['university', 'rank'], name='coliked_univ_rank_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.university_id} -> {self.similar_id} ({self.score:.3f})"
+
+
+class PreferenceChange(models.Model):
+    """
+    Изменение предпочтений пользователя (избранное, оценка) с последнего
+    расчета рекомендаций. Записывается сигналами; build_recommendations
+    пересчитывает только затронутые вузы и удаляет обработанные записи.
+    Без внешних ключей: запись создается и при каскадном удалении вуза или пользователя
+    """
+    user_id = models.IntegerField(verbose_name="ID пользователя")
+    university_id = models.IntegerField(verbose_name="ID университета")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Изменение предпочтений"
+        verbose_name_plural = "Изменения предпочтений"
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.university_id}"
+
+
 class News(models.Model):
     """Новости университетов"""
     title = models.CharField(max_length=200, verbose_name="Заголовок")
@@ -154,11 +315,17 @@ class News(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_published = models.BooleanField(default=True, verbose_name="Опубликовано")
+    # Просмотры новости (universities/view_counters.py)
+    views_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Просмотры")
     
     class Meta:
         verbose_name = "Новость"
         verbose_name_plural = "Новости"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['university', 'is_published', '-created_at'], name='news_univ_pub_created_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_published=True), name='news_published_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -183,3 +350,79 @@ class UniversityRepresentative(models.Model):
     def __str__(self):
         status = "одобрен" if self.is_approved else "ожидает одобрения"
         return f"{self.user.get_full_name() or self.user.username} - {self.university.name} ({status})"
+
+
+class BackgroundJob(models.Model):
+    """Фоновая задача (обновление рейтингов, импорт данных), выполняемая воркером"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Завершена'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+    
+    # Тип задачи совпадает с именем management команды
+    KIND_CHOICES = [
+        ('update_google_ratings', 'Обновление рейтингов Google'),
+        ('update_yandex_ratings', 'Обновление рейтингов Яндекс Карт'),
+        ('update_tabiturient_ratings', 'Обновление рейтингов Табитуриент.ру'),
+        ('import_from_excel', 'Импорт вузов и специальностей из Excel'),
+        ('build_similar_universities', 'Пересчет похожих университетов'),
+        ('build_recommendations', 'Пересчет рекомендаций по предпочтениям пользователей'),
+        ('populate_data', 'Заполнение примерами университетов'),
+        ('populate_extended_data', 'Заполнение расширенными данными'),
+        ('populate_all_russian_universities', 'Заполнение всеми университетами РФ'),
+    ]
+    
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES, verbose_name="Тип задачи")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Параметры команды")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Статус")
+    progress = models.PositiveIntegerField(default=0, verbose_name="Обработано")
+    total = models.PositiveIntegerField(default=0, verbose_name="Всего")
+    output = models.TextField(blank=True, verbose_name="Вывод команды")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    worker = models.CharField(max_length=100, blank=True, verbose_name="Воркер")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, verbose_name="Автор")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name="Начало выполнения")
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name="Окончание выполнения")
+    
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} ({self.get_status_display()})"
+    
+    @property
+    def progress_percent(self):
+        """Процент выполнения задачи"""
+        if not self.total:
+            return 100 if self.status == self.STATUS_DONE else 0
+        return min(100, round(self.progress * 100 / self.total))
+
+
+class DataVersion(models.Model):
+    """
+    Версия набора данных каталога (вузы, программы, отзывы, новости, похожие вузы,
+    рекомендации).
+    Увеличивается сигналами при каждом изменении данных; используется для ETag API
+    """
+    name = models.CharField(max_length=50, primary_key=True, verbose_name="Набор данных")
+    version = models.PositiveBigIntegerField(default=0, verbose_name="Версия")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+    
+    class Meta:
+        verbose_name = "Версия данных"
+        verbose_name_plural = "Версии данных"
+    
+    def __str__(self):
+        return f"{self.name}: {self.version}"
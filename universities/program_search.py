@@ -0,0 +1,187 @@
+"""
+Поиск образовательных программ по всем вузам
+
+Фильтры: слова названия (по Program.search_name) или код ФГОС (09.03.01 -
+специальность из справочника Specialty), максимальная стоимость,
+уровень образования, форма обучения (название факультета, которое
+import_from_excel берет из education_form), город и регион вуза. Сортировка по
+стоимости (индекс program_fee_idx / program_level_fee_idx), по названию или
+по рейтингу вуза (University.users_rating, индекс univ_users_rating_idx).
+
+Страница результатов выбирается ProgramSearchResults: количество считается
+без соединений, нужных только для полей результата, а сортировка по рейтингу
+вуза не сортирует все найденные программы - вузы перебираются по индексу
+рейтинга, и сортируются только программы вузов, попавших на страницу.
+
+Используется страницей program_search_view и JSON API (/api/v1/programs/search/).
+"""
+from django.db.models import Count, F
+
+from .models import Program, University
+from .specialties import FGOS_CODE_RE, extract_fgos_code
+
+
+SORT_CHOICES = [
+    ('fee', 'Сначала дешевле'),
+    ('-fee', 'Сначала дороже'),
+    ('rating', 'По рейтингу вуза'),
+    ('name', 'По названию'),
+]
+
+# Поля результата: имя -> путь для values()
+RESULT_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'degree_level': 'degree_level',
+    'duration_years': 'duration_years',
+    'tuition_fee': 'tuition_fee',
+    'education_form': 'faculty__name',
+    'university_id': 'faculty__university_id',
+    'university': 'faculty__university__name',
+    'university_short_name': 'faculty__university__short_name',
+    'city': 'faculty__university__city',
+    'region': 'faculty__university__region__name',
+    'specialty_id': 'specialty_id',
+    'specialty_code': 'specialty__code',
+    'university_rating': 'university_rating',
+}
+
+
+def result_values(programs):
+    """Строки результата (словари с полями RESULT_FIELDS) без создания объектов Program"""
+    return programs.values(
+        *(name for name, path in RESULT_FIELDS.items() if name == path),
+        **{name: F(path) for name, path in RESULT_FIELDS.items() if name != path}
+    )
+
+
+def search_programs(cleaned_data):
+    """
+    Программы, удовлетворяющие фильтрам формы ProgramSearchForm, в порядке
+    выбранной сортировки, с аннотацией university_rating
+    """
+    programs = Program.objects.all()
+    query = cleaned_data.get('q') or ''
+    
+    # Код ФГОС в запросе - поиск по справочнику специальностей (индекс program_specialty_fee_idx)
+    code = extract_fgos_code(query)
+    if code:
+        programs = programs.filter(specialty__code=code)
+        query = FGOS_CODE_RE.sub(' ', query)
+    if cleaned_data.get('specialty'):
+        programs = programs.filter(specialty_id=cleaned_data['specialty'])
+    
+    for word in Program.normalize_search_name(query).split():
+        programs = programs.filter(search_name__contains=word)
+    
+    if cleaned_data.get('degree_level'):
+        programs = programs.filter(degree_level=cleaned_data['degree_level'])
+    if cleaned_data.get('education_form'):
+        programs = programs.filter(faculty__name=cleaned_data['education_form'])
+    if cleaned_data.get('city'):
+        programs = programs.filter(faculty__university__city=cleaned_data['city'].strip())
+    if cleaned_data.get('region'):
+        programs = programs.filter(faculty__university__region=cleaned_data['region'])
+    if cleaned_data.get('max_tuition'):
+        programs = programs.filter(tuition_fee__lte=cleaned_data['max_tuition'])
+    
+    # Средняя оценка хранится в вузе (University.update_users_rating), а не
+    # вычисляется подзапросом для каждой программы
+    programs = programs.annotate(university_rating=F('faculty__university__users_rating'))
+    
+    sort = cleaned_data.get('sort') or 'fee'
+    if sort == '-fee':
+        return programs.order_by(F('tuition_fee').desc(nulls_last=True), '-id')
+    if sort == 'rating':
+        return programs.order_by(
+            '-faculty__university__users_rating', 'faculty__university_id',
+            F('tuition_fee').asc(nulls_last=True), 'id'
+        )
+    if sort == 'name':
+        return programs.order_by('search_name', 'id')
+    return programs.order_by(F('tuition_fee').asc(nulls_last=True), 'id')
+
+
+class ProgramSearchResults:
+    """
+    Результаты search_programs для Paginator и API: count() и срезы страниц
+    
+    Поля результата задаются как у QuerySet - values() / values_list(). Для
+    сортировки по рейтингу вуза срез [start:stop] выбирается в два шага:
+    количество найденных программ каждого вуза (один запрос с GROUP BY) и id
+    вузов в порядке рейтинга (индекс univ_users_rating_idx) определяют вузы,
+    программы которых попадают на страницу, и запрос страницы сортирует только
+    их программы, а не все найденные (SCAN и TEMP B-TREE по 50 тыс. строк).
+    """
+    
+    def __init__(self, programs, sort=None, projection=None):
+        self.programs = programs
+        self.sort = sort or 'fee'
+        self.projection = projection
+        self._counts = None
+    
+    def _clone(self, projection):
+        clone = ProgramSearchResults(self.programs, self.sort, projection)
+        clone._counts = self._counts
+        return clone
+    
+    def values(self, *fields, **expressions):
+        return self._clone(lambda programs: programs.values(*fields, **expressions))
+    
+    def values_list(self, *fields):
+        return self._clone(lambda programs: programs.values_list(*fields))
+    
+    def _project(self, programs):
+        return self.projection(programs) if self.projection else programs
+    
+    def university_counts_query(self):
+        """Запрос количества найденных программ по вузам: (id вуза, количество)"""
+        return self.programs.order_by().values_list('faculty__university_id').annotate(count=Count('id'))
+    
+    @staticmethod
+    def university_order_query():
+        """Запрос id вузов в порядке сортировки по рейтингу (индекс univ_users_rating_idx)"""
+        return University.objects.order_by('-users_rating', 'id').values_list('id', flat=True)
+    
+    def page_query(self, university_ids):
+        """Запрос программ вузов страницы в порядке сортировки по рейтингу (с полями результата)"""
+        return self._project(self.programs.filter(faculty__university_id__in=university_ids))
+    
+    def _university_counts(self):
+        """Количество найденных программ по вузам: id вуза -> количество"""
+        if self._counts is None:
+            self._counts = dict(self.university_counts_query())
+        return self._counts
+    
+    def count(self) -> int:
+        if self.sort == 'rating':
+            return sum(self._university_counts().values())
+        return self.programs.count()
+    
+    def __len__(self):
+        return self.count()
+    
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        if self.sort != 'rating' or item.start is None or item.stop is None:
+            return self._project(self.programs)[item]
+        return self._rating_page(item.start, item.stop)
+    
+    def _rating_page(self, start, stop):
+        counts = self._university_counts()
+        chosen, skipped, position = [], 0, 0
+        for university_id in self.university_order_query():
+            count = counts.get(university_id)
+            if not count:
+                continue
+            if position >= stop:
+                break
+            if position + count <= start:
+                skipped = position + count
+            else:
+                chosen.append(university_id)
+            position += count
+        if not chosen:
+            return []
+        return list(self.page_query(chosen)[start - skipped:stop - skipped])
@@ -0,0 +1,259 @@
+"""
+Рекомендации по предпочтениям пользователей (item-item collaborative filtering)
+
+Предпочтения - матрица пользователи x вузы: избранное (FavoriteUniversity) -
+неявный сигнал с весом FAVORITE_WEIGHT, оценки 4 и 5 (UniversityRating) -
+явный сигнал с весом RATING_WEIGHTS. Сходство вузов i и j - косинус столбцов
+матрицы: сумма произведений весов пользователей, отметивших оба вуза,
+деленная на нормы столбцов.
+
+Матрица хранится разреженно (массивы ненулевых элементов по пользователям),
+произведения столбцов считаются пакетами пользователей по плотным блокам
+NumPy. Для каждого вуза сохраняются DEFAULT_TOP_K ближайших вузов
+(CoLikedUniversity):
+
+- блок «Пользователи, отметившие этот вуз, также выбирают» на странице вуза -
+  один запрос по индексу (university, rank);
+- персональные рекомендации на странице избранного - сумма сходства с вузами
+  пользователя по тем же строкам таблицы (один запрос по индексу).
+
+Пересчет инкрементальный: сигналы записывают изменения предпочтений
+(PreferenceChange), build_recommendations пересчитывает строки только тех
+вузов, сходство которых могло измениться, - вузов из журнала изменений,
+вузов изменивших предпочтения пользователей и вузов, отмеченных вместе с
+вузами из журнала (у последних изменилась норма столбца).
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from django.db import transaction
+from django.db.models import Max
+
+from .catalog_cache import attach_reference_objects, bump_data_version, get_data_versions
+from .models import University, UniversityRating, CoLikedUniversity, PreferenceChange
+from .similarity import select_top_k
+from accounts.models import FavoriteUniversity
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+FAVORITE_WEIGHT = 1.0
+
+# Вес оценки как сигнала предпочтения (оценки ниже 4 не учитываются)
+RATING_WEIGHTS = {5: 1.0, 4: 0.6}
+
+DEFAULT_TOP_K = 10
+
+USER_RECOMMENDATIONS = 6
+
+
+def load_preferences(user=None) -> Dict[tuple, float]:
+    """Веса предпочтений (id пользователя, id вуза) -> вес (2 запроса)"""
+    favorites = FavoriteUniversity.objects.all()
+    ratings = UniversityRating.objects.filter(rating__in=list(RATING_WEIGHTS))
+    if user is not None:
+        favorites = favorites.filter(user=user)
+        ratings = ratings.filter(user=user)
+    
+    preferences = {}
+    for key in favorites.values_list('user_id', 'university_id'):
+        preferences[key] = FAVORITE_WEIGHT
+    for user_id, university_id, rating in ratings.values_list('user_id', 'university_id', 'rating'):
+        key = (user_id, university_id)
+        preferences[key] = max(preferences.get(key, 0), RATING_WEIGHTS[rating])
+    return preferences
+
+
+class PreferenceMatrix:
+    """
+    Разреженная матрица предпочтений в виде массивов ненулевых элементов
+    (пользователь, столбец вуза, вес), упорядоченных по пользователю
+    """
+    
+    def __init__(self, preferences, university_ids):
+        self.university_ids = np.array(sorted(university_ids), dtype=np.int64)
+        self.column = {university_id: column for column, university_id in enumerate(self.university_ids.tolist())}
+        
+        entries = [
+            (user_id, self.column[university_id], weight)
+            for (user_id, university_id), weight in preferences.items() if university_id in self.column
+        ]
+        entries.sort()
+        self.entry_users = np.array([entry[0] for entry in entries], dtype=np.int64)
+        self.entry_columns = np.array([entry[1] for entry in entries], dtype=np.int64)
+        self.entry_weights = np.array([entry[2] for entry in entries], dtype=np.float32)
+        self.users = np.unique(self.entry_users)
+        
+        self.norms = np.sqrt(np.bincount(
+            self.entry_columns, weights=self.entry_weights.astype(np.float64) ** 2, minlength=len(self.university_ids)
+        )).astype(np.float32)
+    
+    def users_of(self, columns) -> 'np.ndarray':
+        """Пользователи, отметившие хотя бы один вуз из columns"""
+        return np.unique(self.entry_users[np.isin(self.entry_columns, list(columns))])
+    
+    def columns_of(self, user_ids) -> Set[int]:
+        """Вузы (номера столбцов), отмеченные пользователями"""
+        return set(self.entry_columns[np.isin(self.entry_users, list(user_ids))].tolist())
+    
+    def cooccurrence(self, rows, batch_size=1000):
+        """
+        Строки rows матрицы произведений столбцов (вузы x вузы)
+        
+        Для каждого пользователя учитываются пары (вуз из rows, любой его вуз) с
+        произведением весов - число пар равно сумме квадратов числа отмеченных
+        вузов, а не пользователи x вузы, как при умножении плотных блоков.
+        Пользователи обрабатываются пакетами по batch_size.
+        """
+        count = len(self.university_ids)
+        positions = np.full(count, -1, dtype=np.int64)
+        positions[rows] = np.arange(len(rows))
+        result = np.zeros(len(rows) * count, dtype=np.float64)
+        
+        # Границы элементов каждого пользователя (элементы упорядочены по пользователю)
+        bounds = np.flatnonzero(np.diff(self.entry_users)) + 1
+        starts = np.concatenate(([0], bounds))
+        lengths = np.diff(np.concatenate((starts, [len(self.entry_users)])))
+        for batch in range(0, len(starts), batch_size):
+            user_starts = starts[batch:batch + batch_size]
+            user_lengths = lengths[batch:batch + batch_size]
+            # Для каждого элемента пакета - начало и длина элементов его пользователя
+            left = np.arange(user_starts[0], user_starts[-1] + user_lengths[-1])
+            entry_starts = np.repeat(user_starts, user_lengths)
+            entry_lengths = np.repeat(user_lengths, user_lengths)
+            # Левый элемент пары - только вузы из rows
+            selected = positions[self.entry_columns[left]] >= 0
+            left, entry_starts, entry_lengths = left[selected], entry_starts[selected], entry_lengths[selected]
+            
+            pair_left = np.repeat(left, entry_lengths)
+            offsets = np.arange(len(pair_left)) - np.repeat(np.cumsum(entry_lengths) - entry_lengths, entry_lengths)
+            pair_right = np.repeat(entry_starts, entry_lengths) + offsets
+            result += np.bincount(
+                positions[self.entry_columns[pair_left]] * count + self.entry_columns[pair_right],
+                weights=self.entry_weights[pair_left].astype(np.float64) * self.entry_weights[pair_right],
+                minlength=len(rows) * count,
+            )
+        return result.reshape(len(rows), count).astype(np.float32)
+    
+    def similar(self, rows, k=DEFAULT_TOP_K, batch_size=1000):
+        """
+        k ближайших по косинусу вузов для вузов rows
+        
+        Returns:
+            id вуза -> [(id похожего вуза, сходство)] по убыванию сходства
+        """
+        rows = np.array(sorted(rows), dtype=np.int64)
+        k = min(k, len(self.university_ids) - 1)
+        if not len(rows) or k <= 0:
+            return {}
+        scores = self.cooccurrence(rows, batch_size)
+        denominator = np.outer(self.norms[rows], self.norms)
+        scores = np.divide(scores, denominator, out=np.zeros_like(scores), where=denominator > 0)
+        scores[np.arange(len(rows)), rows] = -np.inf
+        neighbours, neighbour_scores = select_top_k(scores, k)
+        
+        result = {}
+        for row, row_neighbours, row_scores in zip(rows.tolist(), neighbours.tolist(), neighbour_scores.tolist()):
+            result[int(self.university_ids[row])] = [
+                (int(self.university_ids[neighbour]), score)
+                for neighbour, score in zip(row_neighbours, row_scores) if score > 0
+            ]
+        return result
+
+
+def rebuild_recommendations(full=False, k=DEFAULT_TOP_K, batch_size=1000) -> Optional[Dict[str, int]]:
+    """
+    Пересчитывает таблицу CoLikedUniversity: полностью (full=True или первый
+    расчет) или для вузов, затронутых изменениями из PreferenceChange
+    
+    Returns:
+        Статистика пересчета или None, если изменений нет
+    """
+    last_change = PreferenceChange.objects.aggregate(last=Max('id'))['last'] or 0
+    if not get_data_versions('recommendations')['recommendations'][0]:
+        full = True
+    if not full and not last_change:
+        return None
+    
+    university_ids = list(University.objects.values_list('id', flat=True))
+    matrix = PreferenceMatrix(load_preferences(), university_ids)
+    
+    if full:
+        rows = set(range(len(university_ids)))
+    else:
+        changes = list(PreferenceChange.objects.filter(id__lte=last_change).values_list('user_id', 'university_id'))
+        changed = {matrix.column[university_id] for _, university_id in changes if university_id in matrix.column}
+        rows = changed | matrix.columns_of({user_id for user_id, _ in changes})
+        # Изменилась норма столбцов changed - меняется сходство с ними у всех вузов, отмеченных вместе с ними
+        rows |= matrix.columns_of(matrix.users_of(changed).tolist())
+    
+    similar = matrix.similar(rows, k, batch_size)
+    links = [
+        CoLikedUniversity(university_id=university_id, similar_id=similar_id, rank=rank, score=score)
+        for university_id, neighbours in similar.items()
+        for rank, (similar_id, score) in enumerate(neighbours, 1)
+    ]
+    recomputed = [int(matrix.university_ids[row]) for row in rows]
+    with transaction.atomic():
+        if full:
+            CoLikedUniversity.objects.all().delete()
+        else:
+            for start in range(0, len(recomputed), 500):
+                CoLikedUniversity.objects.filter(university_id__in=recomputed[start:start + 500]).delete()
+        CoLikedUniversity.objects.bulk_create(links, batch_size=1000)
+        processed, _ = PreferenceChange.objects.filter(id__lte=last_change).delete()
+    # bulk_create не вызывает сигналы - страницы вузов (ETag) зависят от версии 'recommendations'
+    bump_data_version('recommendations')
+    return {
+        'full': full,
+        'universities': len(recomputed),
+        'links': len(links),
+        'users': len(matrix.users),
+        'changes': processed,
+    }
+
+
+def _hydrate(scored):
+    """Вузы по списку (id, сходство) в том же порядке с атрибутом similarity (1 запрос)"""
+    universities = University.objects.in_bulk([university_id for university_id, _ in scored])
+    result = []
+    for university_id, score in scored:
+        university = universities.get(university_id)
+        if university is not None:
+            university.similarity = score
+            result.append(university)
+    return attach_reference_objects(result)
+
+
+def get_coliked_universities(university_id, limit=USER_RECOMMENDATIONS) -> List[University]:
+    """Вузы, которые также отмечают пользователи, отметившие данный вуз (1 запрос)"""
+    links = CoLikedUniversity.objects.filter(university_id=university_id).select_related('similar').order_by('rank')
+    result = []
+    for link in links[:limit]:
+        link.similar.similarity = link.score
+        result.append(link.similar)
+    return attach_reference_objects(result)
+
+
+def recommend_for_user(user, limit=USER_RECOMMENDATIONS) -> List[University]:
+    """
+    Персональные рекомендации: вузы, похожие по предпочтениям на отмеченные
+    пользователем, по сумме сходства с весом предпочтения (4 запроса)
+    """
+    preferences = {university_id: weight for (_, university_id), weight in load_preferences(user).items()}
+    if not preferences:
+        return []
+    # Вузы, которые пользователь уже оценил (в том числе низко), не рекомендуются
+    seen = set(preferences) | set(UniversityRating.objects.filter(user=user).values_list('university_id', flat=True))
+    
+    scores = defaultdict(float)
+    for university_id, similar_id, score in CoLikedUniversity.objects.filter(
+        university_id__in=list(preferences)
+    ).values_list('university_id', 'similar_id', 'score'):
+        if similar_id not in seen:
+            scores[similar_id] += preferences[university_id] * score
+    top = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return _hydrate(top)
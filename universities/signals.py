@@ -0,0 +1,60 @@
+"""
+Сигналы приложения universities
+
+Массовые команды выполняются внутри catalog_cache.deferred_data_versions():
+сбросы кэша и версии данных из сигналов применяются один раз в конце команды
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .catalog_cache import invalidate_catalog_cache, bump_data_version
+from .models import (
+    Region, UniversityType, University, UniversityRating, Faculty, Program, Specialty, News, PreferenceChange,
+)
+from accounts.models import FavoriteUniversity
+
+
+@receiver([post_save, post_delete], sender=Region)
+def region_changed(sender, **kwargs):
+    invalidate_catalog_cache('regions', 'top_universities:6', 'stats')
+    bump_data_version('universities')
+
+
+@receiver([post_save, post_delete], sender=UniversityType)
+def university_type_changed(sender, **kwargs):
+    invalidate_catalog_cache('university_types', 'top_universities:6')
+    bump_data_version('universities')
+
+
+@receiver([post_save, post_delete], sender=University)
+def university_changed(sender, **kwargs):
+    invalidate_catalog_cache('universities', 'cities', 'top_universities:6', 'stats')
+    bump_data_version('universities')
+
+
+@receiver([post_save, post_delete], sender=UniversityRating)
+def university_rating_changed(sender, instance, **kwargs):
+    # Вуз может удаляться каскадно вместе с отзывом - пересчет по id без загрузки вуза
+    University(pk=instance.university_id).update_users_rating()
+    invalidate_catalog_cache('top_universities:6', 'stats')
+    bump_data_version('ratings')
+    PreferenceChange.objects.create(user_id=instance.user_id, university_id=instance.university_id)
+
+
+@receiver([post_save, post_delete], sender=FavoriteUniversity)
+def favorite_changed(sender, instance, **kwargs):
+    # Рекомендации пересчитываются для затронутых вузов (build_recommendations)
+    PreferenceChange.objects.create(user_id=instance.user_id, university_id=instance.university_id)
+
+
+@receiver([post_save, post_delete], sender=Faculty)
+@receiver([post_save, post_delete], sender=Program)
+@receiver([post_save, post_delete], sender=Specialty)
+def program_changed(sender, **kwargs):
+    invalidate_catalog_cache('degree_levels', 'education_forms:50')
+    bump_data_version('programs')
+
+
+@receiver([post_save, post_delete], sender=News)
+def news_changed(sender, **kwargs):
+    bump_data_version('news')
@@ -0,0 +1,201 @@
+"""
+Похожие университеты
+
+Для каждого вуза строится вектор признаков из блоков:
+
+- регион, тип вуза, статус (государственный/негосударственный) - one-hot;
+- специальности программ (Program.specialty) - TF-IDF: log(1 + число программ)
+  с весом редкости специальности, чтобы общие для всех вузов специальности
+  меньше влияли на сходство;
+- профиль стоимости - доли программ в диапазонах стоимости (пороги фильтра
+  каталога, facets.TUITION_THRESHOLDS);
+- профиль рейтинга - диапазон средней оценки (пользователи, Яндекс, Google)
+  и категория рейтинга Табитуриент.ру.
+
+Каждый блок нормируется и умножается на вес FEATURE_WEIGHTS, строки матрицы
+нормируются, поэтому косинусное сходство - скалярное произведение. Ближайшие
+соседи всех вузов считаются одним проходом блоками строк (матрица сходства
+целиком в памяти не хранится) и сохраняются в таблицу SimilarUniversity
+командой build_similar_universities. Страница вуза читает соседей одним
+запросом по индексу (university, rank).
+
+Справочник специальностей - сотни столбцов, каталог - тысячи вузов, поэтому
+матрица признаков плотная (NumPy); SciPy не требуется.
+"""
+from typing import List, Tuple
+
+from django.db import transaction
+
+from .catalog_cache import attach_reference_objects, bump_data_version
+from .facets import TUITION_THRESHOLDS
+from .models import University, Program, SimilarUniversity
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+DEFAULT_TOP_K = 6
+
+# Вес блока признаков в косинусном сходстве
+FEATURE_WEIGHTS = {
+    'region': 1.0,
+    'university_type': 0.7,
+    'is_public': 0.5,
+    'specialties': 1.5,
+    'fees': 1.0,
+    'rating': 0.7,
+}
+
+# Границы диапазонов средней оценки (по пятибалльной шкале)
+RATING_BINS = [3.0, 3.5, 4.0, 4.5]
+
+TABITURIENT_CATEGORIES = ['A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C']
+
+
+def _normalize_rows(block):
+    """Нормирует строки блока (нулевые строки остаются нулевыми)"""
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    return np.divide(block, norms, out=np.zeros_like(block), where=norms > 0)
+
+
+def _one_hot(values):
+    """Матрица one-hot по значениям (столбцы - различные значения)"""
+    columns = {value: column for column, value in enumerate(sorted(set(values), key=str))}
+    block = np.zeros((len(values), len(columns)), dtype=np.float32)
+    block[np.arange(len(values)), [columns[value] for value in values]] = 1
+    return block
+
+
+def build_feature_matrix() -> Tuple['np.ndarray', 'np.ndarray']:
+    """
+    Матрица признаков вузов (2 запроса)
+    
+    Returns:
+        (id вузов, матрица с нормированными строками), строка i - вуз ids[i]
+    """
+    rows = list(University.objects.order_by('id').values_list(
+        'id', 'region_id', 'university_type_id', 'is_public',
+        'users_rating', 'users_ratings_count', 'yandex_rating', 'google_rating', 'tabiturient_category',
+    ))
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    position = {university_id: index for index, university_id in enumerate(ids.tolist())}
+    count = len(rows)
+    
+    # Специальности и стоимость программ: строка вуза, специальность (0 - нет), стоимость (0 - нет)
+    programs = np.array(
+        [
+            (position[university_id], specialty_id or 0, tuition_fee or 0)
+            for university_id, specialty_id, tuition_fee in Program.objects.order_by().values_list(
+                'faculty__university_id', 'specialty_id', 'tuition_fee'
+            ).iterator(chunk_size=5000)
+        ],
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    
+    with_fee = programs[programs[:, 2] > 0]
+    fees = np.zeros((count, len(TUITION_THRESHOLDS) + 1), dtype=np.float32)
+    np.add.at(fees, (with_fee[:, 0], np.searchsorted(TUITION_THRESHOLDS, with_fee[:, 2])), 1)
+    
+    with_specialty = programs[programs[:, 1] > 0]
+    _, columns = np.unique(with_specialty[:, 1], return_inverse=True)
+    specialties = np.zeros((count, columns.max() + 1 if len(columns) else 0), dtype=np.float32)
+    np.add.at(specialties, (with_specialty[:, 0], columns), 1)
+    document_frequency = np.count_nonzero(specialties, axis=0)
+    idf = np.log((1 + count) / (1 + document_frequency)) + 1
+    specialties = np.log1p(specialties) * idf.astype(np.float32)
+    
+    # Профиль рейтинга: диапазон средней оценки по доступным источникам и категория Табитуриента
+    rating = np.zeros((count, len(RATING_BINS) + 1 + len(TABITURIENT_CATEGORIES)), dtype=np.float32)
+    for row, (_, _, _, _, users_rating, users_count, yandex, google, category) in enumerate(rows):
+        values = [value for value in (users_rating if users_count else None, yandex, google) if value]
+        if values:
+            rating[row, np.searchsorted(RATING_BINS, sum(values) / len(values), side='right')] = 1
+        if category in TABITURIENT_CATEGORIES:
+            rating[row, len(RATING_BINS) + 1 + TABITURIENT_CATEGORIES.index(category)] = 1
+    
+    blocks = {
+        'region': _one_hot([row[1] for row in rows]),
+        'university_type': _one_hot([row[2] for row in rows]),
+        'is_public': _one_hot([row[3] for row in rows]),
+        'specialties': specialties,
+        'fees': fees,
+        'rating': rating,
+    }
+    matrix = np.hstack([_normalize_rows(block) * FEATURE_WEIGHTS[name] for name, block in blocks.items()])
+    return ids, _normalize_rows(matrix)
+
+
+def select_top_k(scores, k):
+    """
+    k наибольших значений в каждой строке блока без полной сортировки строк
+    (при равных значениях - меньший номер столбца)
+    
+    Returns:
+        (номера столбцов, значения) - массивы строк блока x k, по убыванию
+    """
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.lexsort((candidates, -candidate_scores), axis=1)
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+def top_k_similar(matrix, k=DEFAULT_TOP_K, batch_size=512):
+    """
+    k ближайших по косинусу строк для каждой строки матрицы (без самой строки)
+    
+    Сходство считается блоками по batch_size строк: в памяти одновременно
+    находится матрица batch_size x число строк.
+    
+    Returns:
+        (номера соседних строк, сходство) - массивы count x k, по убыванию сходства
+    """
+    count = matrix.shape[0]
+    k = min(k, count - 1)
+    neighbours = np.zeros((count, k), dtype=np.int64)
+    scores = np.zeros((count, k), dtype=np.float32)
+    if k <= 0:
+        return neighbours, scores
+    
+    for start in range(0, count, batch_size):
+        stop = min(start + batch_size, count)
+        similarity = matrix[start:stop] @ matrix.T
+        rows = np.arange(stop - start)
+        similarity[rows, rows + start] = -np.inf
+        neighbours[start:stop], scores[start:stop] = select_top_k(similarity, k)
+    return neighbours, scores
+
+
+def rebuild_similar_universities(k=DEFAULT_TOP_K, batch_size=512) -> int:
+    """Пересчитывает таблицу SimilarUniversity; возвращает количество сохраненных пар"""
+    ids, matrix = build_feature_matrix()
+    neighbours, scores = top_k_similar(matrix, k, batch_size)
+    
+    links = [
+        SimilarUniversity(university_id=university_id, similar_id=similar_id, rank=rank, score=score)
+        for university_id, row_neighbours, row_scores in zip(ids.tolist(), neighbours.tolist(), scores.tolist())
+        for rank, (similar_id, score) in enumerate(
+            ((int(ids[neighbour]), score) for neighbour, score in zip(row_neighbours, row_scores) if score > 0),
+            1
+        )
+    ]
+    with transaction.atomic():
+        SimilarUniversity.objects.all().delete()
+        SimilarUniversity.objects.bulk_create(links, batch_size=1000)
+    # bulk_create не вызывает сигналы - страницы вузов (ETag) зависят от версии 'similar'
+    bump_data_version('similar')
+    return len(links)
+
+
+def get_similar_universities(university_id) -> List[University]:
+    """
+    Похожие вузы по убыванию сходства (1 запрос) с атрибутом similarity
+    и регионом/типом из кэша справочников
+    """
+    links = SimilarUniversity.objects.filter(university_id=university_id).select_related('similar').order_by('rank')
+    result = []
+    for link in links:
+        link.similar.similarity = link.score
+        result.append(link.similar)
+    return attach_reference_objects(result)
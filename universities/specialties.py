@@ -0,0 +1,134 @@
+"""
+Справочник специальностей и нормализация названий программ
+
+Названия программ из Excel (import_from_excel) - свободный текст: одна и та
+же специальность в разных вузах записана с кодом ФГОС или без него, в разном
+регистре, с кавычками и уточнениями в скобках. SpecialtyResolver сопоставляет
+программу специальности:
+
+1. по коду ФГОС (09.03.01) из названия или описания программы;
+2. по нормализованному названию (specialty_key) без кода и уточнений в скобках.
+
+Ненайденная специальность создается. Связь Program.specialty и индекс
+program_specialty_fee_idx позволяют одним запросом по индексу найти вузы,
+где есть специальность со стоимостью обучения не выше заданной
+(universities_with_specialty).
+"""
+import re
+from typing import Optional
+
+from django.db.models import F, Min
+
+from .comparison import normalize_program_name
+from .models import Specialty, University
+
+
+# Код направления подготовки: УГСН.уровень.направление (09.03.01)
+FGOS_CODE_RE = re.compile(r'(?<![\d.])(\d{2})\.(\d{2})\.(\d{2})(?![\d.])')
+
+# Уточнения в скобках: профиль, форма обучения, язык
+BRACKETS_RE = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+
+# Обрезанное в источнике название: незакрытая скобка до конца строки
+# ("... производств (по") и многоточие в конце
+TRUNCATED_BRACKET_RE = re.compile(r'[\(\[][^\)\]]*$')
+ELLIPSIS_RE = re.compile(r'(?:\.{2,}|…)\s*$')
+
+
+def extract_fgos_code(*texts) -> str:
+    """Первый код ФГОС в текстах ('' если нет)"""
+    for text in texts:
+        if text:
+            match = FGOS_CODE_RE.search(text)
+            if match:
+                return '.'.join(match.groups())
+    return ''
+
+
+def strip_truncation(name: str) -> str:
+    """Название без обрезанного хвоста: многоточия и незакрытой скобки в конце"""
+    name = ELLIPSIS_RE.sub('', name.rstrip())
+    name = TRUNCATED_BRACKET_RE.sub('', name).rstrip()
+    return ELLIPSIS_RE.sub('', name)
+
+
+def clean_specialty_name(name: str) -> str:
+    """Название специальности без кода ФГОС, обрезанного хвоста и лишних пробелов и знаков по краям"""
+    name = strip_truncation(FGOS_CODE_RE.sub(' ', name))
+    return ' '.join(name.split()).strip(' -–—.,;:')
+
+
+def specialty_key(name: str) -> str:
+    """
+    Ключ сопоставления: название без кода, уточнений в скобках (в том числе
+    обрезанных), многоточия, регистра и пунктуации
+    """
+    return normalize_program_name(strip_truncation(BRACKETS_RE.sub(' ', FGOS_CODE_RE.sub(' ', name))))
+
+
+class SpecialtyResolver:
+    """
+    Сопоставление программ специальностям с кэшем справочника в памяти
+    (один запрос на загрузку справочника, запрос только при создании
+    или дополнении специальности)
+    """
+    
+    def __init__(self):
+        self.by_code = {}
+        self.by_key = {}
+        self.created = 0
+        for specialty in Specialty.objects.all():
+            self._remember(specialty)
+    
+    def _remember(self, specialty):
+        if specialty.code:
+            self.by_code[specialty.code] = specialty
+        # По названию без кода находится специальность без кода, если она есть
+        if specialty.key not in self.by_key or not specialty.code:
+            self.by_key[specialty.key] = specialty
+    
+    def resolve(self, name: str, description: str = '') -> Optional[Specialty]:
+        """Специальность программы (None, если название пустое после нормализации)"""
+        key = specialty_key(name)
+        code = extract_fgos_code(name, description)
+        if not key and not code:
+            return None
+        
+        if code:
+            specialty = self.by_code.get(code)
+            if specialty is None and key:
+                specialty = self.by_key.get(key)
+                if specialty is not None and specialty.code:
+                    # То же название с другим кодом (например, магистратура)
+                    specialty = None
+                elif specialty is not None:
+                    # Специальность встречалась без кода - дополняем справочник
+                    specialty.code = code
+                    specialty.save(update_fields=['code'])
+                    self._remember(specialty)
+        else:
+            specialty = self.by_key.get(key)
+        if specialty is None:
+            specialty = Specialty.objects.create(
+                code=code,
+                name=clean_specialty_name(name)[:200] or code,
+                key=key or code,
+            )
+            self.created += 1
+            self._remember(specialty)
+        return specialty
+
+
+def universities_with_specialty(specialty, max_fee=None):
+    """
+    Вузы, где есть программы специальности (со стоимостью не выше max_fee),
+    с минимальной стоимостью min_fee, от дешевых к дорогим (без стоимости -
+    в конце). Один запрос (API /api/v1/universities/by-specialty/):
+    программы выбираются по индексу program_specialty_fee_idx
+    """
+    programs = {'faculties__programs__specialty': specialty}
+    if max_fee is not None:
+        programs['faculties__programs__tuition_fee__lte'] = max_fee
+    return University.objects.filter(**programs).annotate(
+        min_fee=Min('faculties__programs__tuition_fee')
+    ).order_by(F('min_fee').asc(nulls_last=True), 'name', 'id')
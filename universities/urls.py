@@ -1,20 +1,41 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views, api
 
 app_name = 'universities'
 
+# Представления каталога только для чтения: асинхронные версии (ASGI/uvicorn) или синхронные
+catalog_views = async_views if settings.ASYNC_CATALOG_VIEWS else views
+
 urlpatterns = [
     path('', views.home_view, name='home'),
-    path('universities/', views.university_list_view, name='university_list'),
-    path('university/<int:university_id>/', views.university_detail_view, name='university_detail'),
+    path('universities/', catalog_views.university_list_view, name='university_list'),
+    path('universities/autocomplete/', async_views.university_autocomplete_view, name='university_autocomplete'),
+    path('university/<int:university_id>/', catalog_views.university_detail_view, name='university_detail'),
     path('university/<int:university_id>/rate/', views.rate_university_view, name='rate_university'),
     path('university/<int:university_id>/edit/', views.edit_university_view, name='edit_university'),
     path('comparison/', views.comparison_view, name='comparison'),
     path('compare/<str:university_ids>/', views.compare_universities_view, name='compare_universities'),
-    path('rating/', views.rating_leaderboard_view, name='rating_leaderboard'),
+    path('programs/', views.program_search_view, name='program_search'),
+    path('nearby/', views.nearby_view, name='nearby'),
+    path('rating/', catalog_views.rating_leaderboard_view, name='rating_leaderboard'),
     path('university/<int:university_id>/news/create/', views.create_news_view, name='create_news'),
-    path('news/', views.news_list_view, name='news_list'),
-    path('news/<int:news_id>/', views.news_detail_view, name='news_detail'),
+    path('news/', catalog_views.news_list_view, name='news_list'),
+    path('news/<int:news_id>/', catalog_views.news_detail_view, name='news_detail'),
     path('become-representative/', views.become_representative_view, name='become_representative'),
     path('my-representatives/', views.my_representatives_view, name='my_representatives'),
+    
+    # JSON API только для чтения (universities/api.py)
+    path('api/v1/universities/', api.api_list_view, {'resource': 'universities'}, name='api_university_list'),
+    path('api/v1/universities/nearby/', api.api_nearby_view, {'resource': 'nearby'}, name='api_university_nearby'),
+    path('api/v1/universities/by-specialty/', api.api_list_view, {'resource': 'specialty_universities'}, name='api_university_by_specialty'),
+    path('api/v1/universities/map/', api.api_map_view, {'resource': 'map'}, name='api_university_map'),
+    path('api/v1/universities/<int:pk>/', api.api_detail_view, {'resource': 'universities'}, name='api_university_detail'),
+    path('api/v1/programs/', api.api_list_view, {'resource': 'programs'}, name='api_program_list'),
+    path('api/v1/programs/search/', api.api_list_view, {'resource': 'program_search'}, name='api_program_search'),
+    path('api/v1/programs/<int:pk>/', api.api_detail_view, {'resource': 'programs'}, name='api_program_detail'),
+    path('api/v1/ratings/', api.api_list_view, {'resource': 'ratings'}, name='api_rating_list'),
+    path('api/v1/ratings/<int:pk>/', api.api_detail_view, {'resource': 'ratings'}, name='api_rating_detail'),
+    path('api/v1/news/', api.api_list_view, {'resource': 'news'}, name='api_news_list'),
+    path('api/v1/news/<int:pk>/', api.api_detail_view, {'resource': 'news'}, name='api_news_detail'),
 ]
@@ -4,9 +4,116 @@
 import requests
 import time
 import re
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from django.conf import settings
-from typing import Optional, Dict, List
+from django.db import transaction
+from collections import Counter
+from typing import Optional, Dict, List, Tuple
+
+from .catalog_cache import bump_data_version
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+
+# Счетчики обращений к внешним API за текущий запуск команды.
+# Ключи вида 'google.details', 'yandex.search', а также 'google.fast_path' /
+# 'google.fast_path_fallback' для учета быстрого обновления по сохраненному ID.
+API_STATS = Counter()
+
+# Минимальное число запросов полного поиска места (геокодирование + поиск),
+# которое заменяет один запрос по сохраненному ID
+GOOGLE_DISCOVERY_MIN_CALLS = 2
+YANDEX_DISCOVERY_MIN_CALLS = 2
+
+
+def api_get(key: str, url: str, **kwargs) -> requests.Response:
+    """
+    Выполняет GET запрос к внешнему API и учитывает его в API_STATS
+    
+    Args:
+        key: Ключ счетчика (например, 'google.details')
+        url: URL запроса
+        **kwargs: Параметры, передаваемые в requests.get
+    """
+    API_STATS[key] += 1
+    return requests.get(url, **kwargs)
+
+
+def reset_api_stats():
+    """Сбрасывает счетчики обращений к внешним API"""
+    API_STATS.clear()
+
+
+def count_api_calls(provider: str) -> int:
+    """Возвращает количество выполненных запросов к API провайдера ('google', 'yandex')"""
+    prefix = f'{provider}.'
+    return sum(
+        count for key, count in API_STATS.items()
+        if key.startswith(prefix) and not key.startswith(f'{provider}.fast_path')
+    )
+
+
+def parse_id_list(value) -> List[int]:
+    """Разбирает список ID вида '1,2,3' (для аргументов команд)"""
+    if isinstance(value, (list, tuple)):
+        return [int(item) for item in value]
+    return [int(item) for item in str(value).split(',') if item.strip()]
+
+
+def geocode_address(address: str, city: str = None, provider: str = 'auto') -> Optional[Tuple[float, float]]:
+    """
+    Координаты адреса через Geocoder API Яндекса или Google
+    
+    Args:
+        address: Адрес (или название места)
+        city: Город (добавляется в начало запроса)
+        provider: 'yandex', 'google' или 'auto' (Яндекс, если задан ключ, иначе Google)
+    
+    Returns:
+        (широта, долгота) или None, если адрес не найден или ключ API не задан
+    """
+    query = f"{city}, {address}" if city and address and city != address else (address or city)
+    if not query:
+        return None
+    yandex_key = getattr(settings, 'YANDEX_MAPS_API_KEY', '')
+    google_key = getattr(settings, 'GOOGLE_PLACES_API_KEY', '')
+    if provider == 'auto':
+        provider = 'yandex' if yandex_key else 'google'
+    
+    try:
+        if provider == 'yandex' and yandex_key:
+            response = api_get('yandex.geocode', settings.YANDEX_GEOCODER_URL, params={
+                'apikey': yandex_key,
+                'geocode': query,
+                'format': 'json',
+                'results': 1
+            }, timeout=10)
+            response.raise_for_status()
+            features = response.json().get('response', {}).get('GeoObjectCollection', {}).get('featureMember', [])
+            if features:
+                lon, lat = features[0]['GeoObject']['Point']['pos'].split()  # "lon lat"
+                return float(lat), float(lon)
+        elif provider == 'google' and google_key:
+            response = api_get('google.geocode', f"{settings.GOOGLE_MAPS_API_URL}/geocode/json", params={
+                'address': query,
+                'key': google_key,
+                'language': 'ru'
+            }, timeout=10)
+            response.raise_for_status()
+            data = response.json()
+            if data.get('status') == 'OK' and data.get('results'):
+                location = data['results'][0]['geometry']['location']
+                return float(location['lat']), float(location['lng'])
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"Ошибка при геокодировании ({provider}): {e}")
+        return None
+    except (KeyError, ValueError, IndexError) as e:
+        print(f"Ошибка при обработке ответа геокодера ({provider}): {e}")
+        return None
 
 
 def get_yandex_place_rating(place_name: str, address: str, city: str = None) -> Optional[Dict]:
@@ -22,7 +129,7 @@ def get_yandex_place_rating(place_name: str, address: str, city: str = None) ->
         city: Город (опционально)
     
     Returns:
-        Dict с ключами: rating, reviews_count, place_id или None при ошибке
+        Dict с ключами: rating, reviews_count, place_id, latitude, longitude или None при ошибке
     """
     api_key = getattr(settings, 'YANDEX_MAPS_API_KEY', '')
     
@@ -31,7 +138,7 @@ def get_yandex_place_rating(place_name: str, address: str, city: str = None) ->
     
     try:
         # Используем Geocoder API для получения координат адреса
-        geocoder_url = "https://geocode-maps.yandex.ru/1.x/"
+        geocoder_url = settings.YANDEX_GEOCODER_URL
         
         # Формируем запрос для поиска адреса
         query = address
@@ -45,7 +152,7 @@ def get_yandex_place_rating(place_name: str, address: str, city: str = None) ->
             'results': 1
         }
         
-        geocoder_response = requests.get(geocoder_url, params=geocoder_params, timeout=10)
+        geocoder_response = api_get('yandex.geocode', geocoder_url, params=geocoder_params, timeout=10)
         geocoder_response.raise_for_status()
         
         geocoder_data = geocoder_response.json()
@@ -66,7 +173,7 @@ def get_yandex_place_rating(place_name: str, address: str, city: str = None) ->
                 query = f"{place_name}, {city}"
             
             geocoder_params['geocode'] = query
-            geocoder_response = requests.get(geocoder_url, params=geocoder_params, timeout=10)
+            geocoder_response = api_get('yandex.geocode', geocoder_url, params=geocoder_params, timeout=10)
             if geocoder_response.status_code == 200:
                 geocoder_data = geocoder_response.json()
                 if 'response' in geocoder_data and 'GeoObjectCollection' in geocoder_data['response']:
@@ -80,7 +187,7 @@ def get_yandex_place_rating(place_name: str, address: str, city: str = None) ->
             return None
         
         # Используем Search API для поиска организации
-        search_url = "https://search-maps.yandex.ru/v1/"
+        search_url = settings.YANDEX_SEARCH_URL
         
         search_params = {
             'apikey': api_key,
@@ -92,7 +199,7 @@ def get_yandex_place_rating(place_name: str, address: str, city: str = None) ->
             'spn': '0.1,0.1'  # Радиус поиска
         }
         
-        search_response = requests.get(search_url, params=search_params, timeout=10)
+        search_response = api_get('yandex.search', search_url, params=search_params, timeout=10)
         
         if search_response.status_code == 200:
             search_data = search_response.json()
@@ -105,13 +212,20 @@ def get_yandex_place_rating(place_name: str, address: str, city: str = None) ->
                 # Получаем рейтинг и количество отзывов
                 rating = company_meta.get('rating', None)
                 reviews = company_meta.get('reviews', 0)
-                place_id = feature.get('id', '')
+                place_id = company_meta.get('id') or feature.get('id', '')
+                
+                # Координаты организации точнее координат адреса
+                coordinates = feature.get('geometry', {}).get('coordinates')
+                if coordinates:
+                    lon, lat = coordinates[:2]
                 
                 if rating is not None:
                     return {
                         'rating': float(rating),
                         'reviews_count': int(reviews) if reviews else 0,
-                        'place_id': place_id
+                        'place_id': place_id,
+                        'latitude': float(lat),
+                        'longitude': float(lon),
                     }
         
         return None
@@ -155,7 +269,7 @@ def get_google_place_rating(place_name: str, address: str, city: str = None, ver
         lat, lng = None, None
         
         # Пробуем использовать Find Place API (более точный поиск)
-        find_place_url = "https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
+        find_place_url = f"{settings.GOOGLE_MAPS_API_URL}/place/findplacefromtext/json"
         
         # Формируем запрос для поиска
         input_query = place_name
@@ -175,7 +289,7 @@ def get_google_place_rating(place_name: str, address: str, city: str = None, ver
         # Если есть адрес, пробуем получить координаты для locationbias
         if address or city:
             try:
-                geocoder_url = "https://maps.googleapis.com/maps/api/geocode/json"
+                geocoder_url = f"{settings.GOOGLE_MAPS_API_URL}/geocode/json"
                 geocode_query = address if address else city
                 if city and address:
                     geocode_query = f"{city}, {address}"
@@ -189,7 +303,7 @@ def get_google_place_rating(place_name: str, address: str, city: str = None, ver
                     'language': 'ru'
                 }
                 
-                geocode_response = requests.get(geocoder_url, params=geocode_params, timeout=10)
+                geocode_response = api_get('google.geocode', geocoder_url, params=geocode_params, timeout=10)
                 if geocode_response.status_code == 200:
                     geocode_data = geocode_response.json()
                     if geocode_data.get('status') == 'OK' and geocode_data.get('results'):
@@ -209,7 +323,7 @@ def get_google_place_rating(place_name: str, address: str, city: str = None, ver
         if verbose:
             print(f"  [Поиск] Find Place API: {input_query}")
         
-        find_response = requests.get(find_place_url, params=find_params, timeout=10)
+        find_response = api_get('google.findplace', find_place_url, params=find_params, timeout=10)
         find_response.raise_for_status()
         
         find_data = find_response.json()
@@ -224,6 +338,9 @@ def get_google_place_rating(place_name: str, address: str, city: str = None, ver
             place_id = candidate.get('place_id')
             rating = candidate.get('rating')
             reviews_count = candidate.get('user_ratings_total', 0)
+            location = candidate.get('geometry', {}).get('location')
+            if location:
+                lat, lng = location['lat'], location['lng']
             if verbose:
                 print(f"  [OK] Найдено через Find Place API: рейтинг {rating}, отзывов {reviews_count}")
         elif verbose:
@@ -245,7 +362,7 @@ def get_google_place_rating(place_name: str, address: str, city: str = None, ver
             if verbose:
                 print(f"  [Поиск] Резервный поиск через Text Search API: {input_query}")
             
-            search_url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+            search_url = f"{settings.GOOGLE_MAPS_API_URL}/place/textsearch/json"
             
             query = input_query
             search_params = {
@@ -258,7 +375,7 @@ def get_google_place_rating(place_name: str, address: str, city: str = None, ver
                 search_params['location'] = f"{lat},{lng}"
                 search_params['radius'] = 5000
             
-            search_response = requests.get(search_url, params=search_params, timeout=10)
+            search_response = api_get('google.textsearch', search_url, params=search_params, timeout=10)
             search_response.raise_for_status()
             
             search_data = search_response.json()
@@ -268,6 +385,9 @@ def get_google_place_rating(place_name: str, address: str, city: str = None, ver
                 place_id = place.get('place_id')
                 rating = place.get('rating')
                 reviews_count = place.get('user_ratings_total', 0)
+                location = place.get('geometry', {}).get('location')
+                if location:
+                    lat, lng = location['lat'], location['lng']
                 if verbose:
                     print(f"  [OK] Найдено через Text Search API: рейтинг {rating}, отзывов {reviews_count}")
             elif verbose:
@@ -289,7 +409,7 @@ def get_google_place_rating(place_name: str, address: str, city: str = None, ver
             if verbose:
                 print(f"  [Детали] Получение деталей места (place_id: {place_id})")
             
-            details_url = "https://maps.googleapis.com/maps/api/place/details/json"
+            details_url = f"{settings.GOOGLE_MAPS_API_URL}/place/details/json"
             details_params = {
                 'place_id': place_id,
                 'key': api_key,
@@ -297,7 +417,7 @@ def get_google_place_rating(place_name: str, address: str, city: str = None, ver
                 'fields': 'rating,user_ratings_total,place_id,name'
             }
             
-            details_response = requests.get(details_url, params=details_params, timeout=10)
+            details_response = api_get('google.details', details_url, params=details_params, timeout=10)
             details_response.raise_for_status()
             
             details_data = details_response.json()
@@ -312,11 +432,16 @@ def get_google_place_rating(place_name: str, address: str, city: str = None, ver
                 print(f"  [WARN] Place Details API: {details_data.get('status', 'UNKNOWN')}")
         
         if place_id and rating is not None:
-            return {
+            result = {
                 'rating': float(rating),
                 'reviews_count': int(reviews_count) if reviews_count else 0,
                 'place_id': place_id
             }
+            # Координаты места (или адреса, если место найдено без geometry)
+            if lat is not None and lng is not None:
+                result['latitude'] = float(lat)
+                result['longitude'] = float(lng)
+            return result
         
         return None
         
@@ -334,322 +459,717 @@ def get_google_place_rating(place_name: str, address: str, city: str = None, ver
         return None
 
 
-def update_university_yandex_rating(university) -> bool:
+def get_google_place_details(place_id: str, verbose: bool = False) -> Tuple[str, Optional[Dict]]:
+    """
+    Получает рейтинг места из Google Places по сохраненному place_id
+    
+    Выполняет один запрос Place Details с полями, ограниченными рейтингом
+    и количеством отзывов (без геокодирования и поиска)
+    
+    Args:
+        place_id: ID места в Google
+        verbose: Выводить подробную информацию в консоль
+    
+    Returns:
+        Кортеж (status, data): status - 'OK', 'NOT_FOUND' или 'ERROR',
+        data - Dict с ключами rating, reviews_count, place_id (только для 'OK')
+    """
+    api_key = getattr(settings, 'GOOGLE_PLACES_API_KEY', '')
+    
+    if not api_key or not place_id:
+        return 'ERROR', None
+    
+    try:
+        if verbose:
+            print(f"  [Детали] Быстрое обновление по place_id: {place_id}")
+        
+        details_url = f"{settings.GOOGLE_MAPS_API_URL}/place/details/json"
+        details_params = {
+            'place_id': place_id,
+            'key': api_key,
+            'fields': 'rating,user_ratings_total',
+        }
+        
+        details_response = api_get('google.details', details_url, params=details_params, timeout=10)
+        details_response.raise_for_status()
+        
+        details_data = details_response.json()
+        status = details_data.get('status', 'UNKNOWN')
+        
+        # NOT_FOUND - место удалено или ID устарел, INVALID_REQUEST - ID некорректен
+        if status in ('NOT_FOUND', 'INVALID_REQUEST'):
+            if verbose:
+                print(f"  [WARN] Place Details API: {status}, требуется повторный поиск")
+            return 'NOT_FOUND', None
+        
+        if status != 'OK':
+            if verbose:
+                print(f"  [WARN] Place Details API: {status}")
+            return 'ERROR', None
+        
+        result = details_data.get('result', {})
+        rating = result.get('rating')
+        reviews_count = result.get('user_ratings_total', 0)
+        
+        if verbose:
+            print(f"  [OK] Детали получены: рейтинг {rating}, отзывов {reviews_count}")
+        
+        return 'OK', {
+            'rating': float(rating) if rating is not None else None,
+            'reviews_count': int(reviews_count) if reviews_count else 0,
+            'place_id': place_id
+        }
+        
+    except requests.exceptions.RequestException as e:
+        if verbose:
+            print(f"  [ERROR] Ошибка при запросе к Google Places API: {e}")
+        return 'ERROR', None
+    except (KeyError, ValueError, TypeError) as e:
+        if verbose:
+            print(f"  [ERROR] Ошибка при обработке ответа Google Places API: {e}")
+        return 'ERROR', None
+
+
+def get_yandex_place_details(place_id: str, place_name: str = '') -> Tuple[str, Optional[Dict]]:
+    """
+    Получает рейтинг организации из Яндекс Карт по сохраненному ID
+    
+    Выполняет один запрос к Search API по URI организации
+    (без геокодирования адреса)
+    
+    Args:
+        place_id: ID организации в Яндекс Картах
+        place_name: Название места (передается как текст запроса)
+    
+    Returns:
+        Кортеж (status, data): status - 'OK', 'NOT_FOUND' или 'ERROR',
+        data - Dict с ключами rating, reviews_count, place_id и координатами
+        latitude, longitude, если они есть в ответе (только для 'OK')
+    """
+    api_key = getattr(settings, 'YANDEX_MAPS_API_KEY', '')
+    
+    if not api_key or not place_id:
+        return 'ERROR', None
+    
+    try:
+        search_url = settings.YANDEX_SEARCH_URL
+        
+        search_params = {
+            'apikey': api_key,
+            'text': place_name or place_id,
+            'uri': f"ymapsbm1://org?oid={place_id}",
+            'type': 'biz',
+            'lang': 'ru_RU',
+            'results': 1,
+        }
+        
+        search_response = api_get('yandex.search', search_url, params=search_params, timeout=10)
+        
+        if search_response.status_code == 404:
+            return 'NOT_FOUND', None
+        search_response.raise_for_status()
+        
+        search_data = search_response.json()
+        features = search_data.get('features', [])
+        if not features:
+            return 'NOT_FOUND', None
+        
+        company_meta = features[0].get('properties', {}).get('CompanyMetaData', {})
+        rating = company_meta.get('rating', None)
+        reviews = company_meta.get('reviews', 0)
+        
+        result = {
+            'rating': float(rating) if rating is not None else None,
+            'reviews_count': int(reviews) if reviews else 0,
+            'place_id': company_meta.get('id') or place_id
+        }
+        coordinates = features[0].get('geometry', {}).get('coordinates')
+        if coordinates:
+            result['longitude'], result['latitude'] = float(coordinates[0]), float(coordinates[1])
+        return 'OK', result
+        
+    except requests.exceptions.RequestException as e:
+        print(f"Ошибка при запросе к Яндекс API: {e}")
+        return 'ERROR', None
+    except (KeyError, ValueError, TypeError, IndexError) as e:
+        print(f"Ошибка при обработке ответа Яндекс API: {e}")
+        return 'ERROR', None
+
+
+# Поля, изменяемые при обновлении рейтинга из каждого источника
+# (полный поиск места в Яндекс Картах и Google возвращает и координаты)
+COORDINATE_FIELDS = ['latitude', 'longitude']
+YANDEX_RATING_FIELDS = ['yandex_rating', 'yandex_reviews_count', 'yandex_place_id', *COORDINATE_FIELDS]
+GOOGLE_RATING_FIELDS = ['google_rating', 'google_reviews_count', 'google_place_id', *COORDINATE_FIELDS]
+TABITURIENT_RATING_FIELDS = ['tabiturient_rating', 'tabiturient_rank', 'tabiturient_category']
+
+
+def set_coordinates(university, data: Dict) -> bool:
+    """Сохраняет в объекте координаты из ответа провайдера (если они есть)"""
+    if data.get('latitude') is None or data.get('longitude') is None:
+        return False
+    university.latitude = data['latitude']
+    university.longitude = data['longitude']
+    return True
+
+
+class BulkRatingWriter:
+    """
+    Накапливает университеты с обновленными рейтингами и сохраняет их пакетами
+    
+    Каждый пакет записывается одним bulk_update внутри транзакции, вместо
+    отдельного UPDATE (и транзакции) на каждый университет. bulk_update не
+    вызывает сигналы, поэтому версия данных вузов обновляется явно.
+    
+    Args:
+        fields: Сохраняемые поля (например, GOOGLE_RATING_FIELDS)
+        batch_size: Количество университетов в одном пакете
+    """
+    
+    def __init__(self, fields: List[str], batch_size: int = 200):
+        self.fields = fields
+        self.batch_size = max(1, batch_size)
+        self.pending = []
+        self.saved = 0
+        self.flushes = 0
+    
+    def add(self, university):
+        """Добавляет университет в пакет, при заполнении пакета сохраняет его"""
+        self.pending.append(university)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """Сохраняет накопленные изменения"""
+        if not self.pending:
+            return
+        model = type(self.pending[0])
+        with transaction.atomic():
+            model.objects.bulk_update(self.pending, self.fields, batch_size=self.batch_size)
+        bump_data_version('universities')
+        self.saved += len(self.pending)
+        self.flushes += 1
+        self.pending = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        # Уже полученные рейтинги сохраняются и при прерывании команды
+        self.flush()
+        return False
+
+
+def update_university_yandex_rating(university, fast: bool = False, commit: bool = True) -> bool:
     """
     Обновляет рейтинг университета из Яндекс Карт
     
     Args:
         university: Объект University
+        fast: Быстрое обновление - если yandex_place_id уже сохранен, выполняется
+              один запрос по ID; полный поиск только если организация не найдена
+        commit: Сохранить изменения в БД (False - только изменить объект,
+                например для пакетного сохранения через BulkRatingWriter)
     
     Returns:
         True если рейтинг успешно обновлен, False в противном случае
     """
-    rating_data = get_yandex_place_rating(
-        place_name=university.name,
-        address=university.address,
-        city=university.city
-    )
+    rating_data = None
+    
+    if fast and university.yandex_place_id:
+        API_STATS['yandex.fast_path'] += 1
+        status, rating_data = get_yandex_place_details(
+            place_id=university.yandex_place_id,
+            place_name=university.name
+        )
+        if status == 'NOT_FOUND':
+            API_STATS['yandex.fast_path_fallback'] += 1
+        elif status != 'OK' or rating_data.get('rating') is None:
+            return False
+    
+    if rating_data is None:
+        rating_data = get_yandex_place_rating(
+            place_name=university.name,
+            address=university.address,
+            city=university.city
+        )
     
     if rating_data:
         university.yandex_rating = rating_data.get('rating')
         university.yandex_reviews_count = rating_data.get('reviews_count', 0)
         university.yandex_place_id = rating_data.get('place_id', '')
-        university.save(update_fields=['yandex_rating', 'yandex_reviews_count', 'yandex_place_id'])
+        set_coordinates(university, rating_data)
+        if commit:
+            university.save(update_fields=YANDEX_RATING_FIELDS)
         return True
     
     return False
 
 
-def update_university_google_rating(university, verbose: bool = False) -> bool:
+def update_university_google_rating(university, verbose: bool = False, fast: bool = False, commit: bool = True) -> bool:
     """
     Обновляет рейтинг университета из Google Places
     
     Args:
         university: Объект University
         verbose: Выводить подробную информацию в консоль
+        fast: Быстрое обновление - если google_place_id уже сохранен, выполняется
+              один запрос Place Details; полный поиск только при NOT_FOUND
+        commit: Сохранить изменения в БД (False - только изменить объект,
+                например для пакетного сохранения через BulkRatingWriter)
     
     Returns:
         True если рейтинг успешно обновлен, False в противном случае
     """
-    rating_data = get_google_place_rating(
-        place_name=university.name,
-        address=university.address,
-        city=university.city,
-        verbose=verbose
-    )
+    rating_data = None
+    
+    if fast and university.google_place_id:
+        API_STATS['google.fast_path'] += 1
+        status, rating_data = get_google_place_details(
+            place_id=university.google_place_id,
+            verbose=verbose
+        )
+        if status == 'NOT_FOUND':
+            API_STATS['google.fast_path_fallback'] += 1
+        elif status != 'OK' or rating_data.get('rating') is None:
+            return False
+    
+    if rating_data is None:
+        rating_data = get_google_place_rating(
+            place_name=university.name,
+            address=university.address,
+            city=university.city,
+            verbose=verbose
+        )
     
     if rating_data:
         university.google_rating = rating_data.get('rating')
         university.google_reviews_count = rating_data.get('reviews_count', 0)
         university.google_place_id = rating_data.get('place_id', '')
-        university.save(update_fields=['google_rating', 'google_reviews_count', 'google_place_id'])
+        set_coordinates(university, rating_data)
+        if commit:
+            university.save(update_fields=GOOGLE_RATING_FIELDS)
         return True
     
     return False
 
 
-def get_tabiturient_rating(university_name: str, verbose: bool = False) -> Optional[Dict]:
+TABITURIENT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Условие XPath "элемент имеет CSS класс" (аналог class_='...' в BeautifulSoup)
+_HAS_CLASS = 'contains(concat(" ", normalize-space(@class), " "), " {} ")'
+
+# XPath выражения компилируются один раз при импорте модуля
+if lxml_etree is not None:
+    TABITURIENT_TABLES_XPATH = lxml_etree.XPath(f'//table[{_HAS_CLASS.format("listtop100")}]')
+    TABITURIENT_CELLS_XPATH = lxml_etree.XPath(f'./td[{_HAS_CLASS.format("tdtop100")}]')
+    TABITURIENT_FONT2_XPATH = lxml_etree.XPath(f'.//span[{_HAS_CLASS.format("font2")}]')
+    TABITURIENT_NAMES_XPATH = lxml_etree.XPath(f'.//span[{_HAS_CLASS.format("font2")}]//b[1]')
+    ROW_CELLS_XPATH = lxml_etree.XPath('.//td | .//th')
+
+RANK_RE = re.compile(r'#(\d+)')
+MOBILE_RANK_RE = re.compile(r'^#\d+$')
+SIGNED_NUMBER_RE = re.compile(r'^[#\+\-]\d+$')
+NUMBER_RE = re.compile(r'^\d+\.?\d*$')
+CATEGORY_RE = re.compile(r'^[A-Z][\+\-]?$')
+
+
+def fetch_tabiturient_page(verbose: bool = False) -> Optional[bytes]:
     """
-    Получает рейтинг университета с сайта tabiturient.ru/globalrating/
-    
-    Args:
-        university_name: Название университета
-        verbose: Выводить подробную информацию в консоль
+    Загружает HTML страницы рейтинга tabiturient.ru
     
     Returns:
-        Dict с ключами: rating, rank, category или None при ошибке
+        Содержимое страницы или None при ошибке запроса
     """
     try:
-        url = "https://tabiturient.ru/globalrating/"
-        
-        if verbose:
-            print(f"  [Запрос] Получение рейтинга с tabiturient.ru")
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=30)
+        response = api_get('tabiturient.page', settings.TABITURIENT_RATING_URL, headers=TABITURIENT_HEADERS, timeout=30)
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Ищем таблицу с рейтингом
-        rating_data = None
-        
-        # Пробуем найти данные в таблице
-        tables = soup.find_all('table')
-        for table in tables:
-            rows = table.find_all('tr')
-            for row in rows:
-                cells = row.find_all(['td', 'th'])
-                if len(cells) >= 3:
-                    # Ищем название университета в ячейках
-                    for i, cell in enumerate(cells):
-                        cell_text = cell.get_text(strip=True)
-                        # Проверяем, содержит ли ячейка название университета
-                        if university_name.lower() in cell_text.lower() or cell_text.lower() in university_name.lower():
-                            # Пытаемся извлечь рейтинг из соседних ячеек
-                            try:
-                                rating_match = None
-                                rank_match = None
-                                category_match = None
-                                
-                                # Ищем в текущей строке
-                                for cell in cells:
-                                    cell_text = cell.get_text(strip=True)
-                                    # Рейтинг обычно число типа 158.75
-                                    if re.match(r'^\d+\.?\d*$', cell_text):
-                                        if rating_match is None:
-                                            rating_match = float(cell_text)
-                                    # Категория типа A+, A, B
-                                    elif re.match(r'^[A-Z][\+\-]?$', cell_text):
-                                        category_match = cell_text
-                                    # Место в рейтинге (просто число)
-                                    elif cell_text.isdigit() and int(cell_text) < 1000:
-                                        rank_match = int(cell_text)
-                                
-                                if rating_match or rank_match:
-                                    rating_data = {
-                                        'rating': rating_match,
-                                        'rank': rank_match,
-                                        'category': category_match
-                                    }
-                                    if verbose:
-                                        print(f"  [OK] Найден рейтинг: {rating_data}")
-                                    break
-                            except (ValueError, AttributeError) as e:
-                                if verbose:
-                                    print(f"  [WARN] Ошибка при парсинге строки: {e}")
-                                continue
-                    
-                    if rating_data:
-                        break
-            
-            if rating_data:
-                break
-        
-        return rating_data
-        
+        return response.content
     except requests.exceptions.RequestException as e:
         if verbose:
             print(f"  [ERROR] Ошибка при запросе к tabiturient.ru: {e}")
         return None
-    except Exception as e:
-        if verbose:
-            print(f"  [ERROR] Неожиданная ошибка при парсинге: {e}")
+
+
+def _lxml_text(element) -> str:
+    """Текст элемента без пробельных краев фрагментов (как get_text(strip=True) в BeautifulSoup)"""
+    return ''.join(part.strip() for part in element.itertext())
+
+
+def _lxml_font2_text(cell) -> Optional[str]:
+    """Текст первого <span class="font2"> ячейки (из вложенного <b>, если он есть)"""
+    spans = TABITURIENT_FONT2_XPATH(cell)
+    if not spans:
         return None
+    bold = spans[0].find('.//b')
+    return _lxml_text(bold if bold is not None else spans[0])
 
 
-def parse_tabiturient_ratings_page(verbose: bool = False) -> List[Dict]:
+def _extract_row_rating(cell_texts: List[str]) -> Optional[Dict]:
+    """Извлекает рейтинг, место и категорию из текстов ячеек строки таблицы"""
+    rating = None
+    rank = None
+    category = None
+    
+    for cell_text in cell_texts:
+        # Рейтинг обычно число типа 158.75
+        if NUMBER_RE.match(cell_text):
+            if rating is None:
+                rating = float(cell_text)
+        # Категория типа A+, A, B
+        elif CATEGORY_RE.match(cell_text):
+            category = cell_text
+    
+    # Место в рейтинге - #N в первой ячейке
+    if cell_texts:
+        rank_match = RANK_RE.search(cell_texts[0])
+        if rank_match:
+            rank = int(rank_match.group(1))
+    
+    if rating or rank:
+        return {
+            'rating': rating,
+            'rank': rank,
+            'category': category
+        }
+    return None
+
+
+def _is_name_match(university_name: str, cell_text: str) -> bool:
+    """Проверяет, что текст ячейки и название университета содержатся друг в друге"""
+    cell_text = cell_text.lower()
+    return bool(cell_text) and (university_name in cell_text or cell_text in university_name)
+
+
+def find_tabiturient_rating(content, university_name: str) -> Optional[Dict]:
     """
-    Парсит всю страницу рейтинга tabiturient.ru и возвращает список всех рейтингов
+    Ищет рейтинг университета в HTML страницы tabiturient.ru
+    
+    Разбирает страницу через lxml (XPath); без lxml - через BeautifulSoup.
+    Тексты ячеек строки вычисляются один раз.
+    
+    Args:
+        content: HTML страницы (bytes или str)
+        university_name: Название университета
+    
+    Returns:
+        Dict с ключами: rating, rank, category или None, если не найден
+    """
+    name = university_name.lower()
+    
+    if lxml_etree is not None:
+        tree = lxml_etree.HTML(content)
+        rows = (
+            [_lxml_text(cell) for cell in ROW_CELLS_XPATH(row)]
+            for row in tree.iter('tr')
+        )
+    else:
+        soup = BeautifulSoup(content, 'html.parser', parse_only=SoupStrainer('table'))
+        rows = (
+            [cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])]
+            for row in soup.find_all('tr')
+        )
+    
+    for cell_texts in rows:
+        if len(cell_texts) < 3:
+            continue
+        if any(_is_name_match(name, cell_text) for cell_text in cell_texts):
+            rating_data = _extract_row_rating(cell_texts)
+            if rating_data:
+                return rating_data
+    
+    return None
+
+
+def get_tabiturient_rating(university_name: str, verbose: bool = False) -> Optional[Dict]:
+    """
+    Получает рейтинг университета с сайта tabiturient.ru/globalrating/
     
     Args:
+        university_name: Название университета
         verbose: Выводить подробную информацию в консоль
     
     Returns:
-        List[Dict] со списком всех рейтингов: [{'name': str, 'rating': float, 'rank': int, 'category': str}, ...]
+        Dict с ключами: rating, rank, category или None при ошибке
     """
+    if verbose:
+        print(f"  [Запрос] Получение рейтинга с tabiturient.ru")
+    
+    content = fetch_tabiturient_page(verbose=verbose)
+    if content is None:
+        return None
+    
     try:
-        url = "https://tabiturient.ru/globalrating/"
-        
+        rating_data = find_tabiturient_rating(content, university_name)
+        if rating_data and verbose:
+            print(f"  [OK] Найден рейтинг: {rating_data}")
+        return rating_data
+    except Exception as e:
         if verbose:
-            print(f"  [Запрос] Парсинг всей страницы рейтинга tabiturient.ru")
+            print(f"  [ERROR] Неожиданная ошибка при парсинге: {e}")
+        return None
+
+
+def _parse_tabiturient_ratings_lxml(content) -> List[Dict]:
+    """Разбор страницы рейтинга через lxml: XPath выбирает только таблицы listtop100"""
+    tree = lxml_etree.HTML(content)
+    ratings_list = []
+    
+    for table in TABITURIENT_TABLES_XPATH(tree):
+        # Каждая таблица содержит одну строку с данными университета
+        row = table.find('.//tr')
+        if row is None:
+            continue
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        # Структура: [rank+change, logo, name, rating, category, arrow]
+        cells = TABITURIENT_CELLS_XPATH(row)
+        if len(cells) < 3:
+            continue
         
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
+        name = None
+        rating = None
+        rank = None
+        category = None
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        # Ранг: <span class="font2"><b>#N</b></span> в первой ячейке,
+        # иначе #N в тексте ячейки
+        rank_text = _lxml_font2_text(cells[0])
+        rank_match = RANK_RE.search(rank_text or '') or RANK_RE.search(_lxml_text(cells[0]))
+        if rank_match:
+            rank = int(rank_match.group(1))
         
-        ratings_list = []
+        # Название: первый <span class="font2"><b>...</b></span> третьей ячейки,
+        # не являющийся мобильным #N
+        for name_text in TABITURIENT_NAMES_XPATH(cells[2]):
+            name_text = _lxml_text(name_text)
+            if not MOBILE_RANK_RE.match(name_text) and len(name_text) > 1:
+                name = name_text
+                break
+        if not name:
+            line = _lxml_text(cells[2])
+            if len(line) > 2 and not SIGNED_NUMBER_RE.match(line) and not NUMBER_RE.match(line) and not line.startswith('#'):
+                name = line
         
-        # Ищем таблицы с классом listtop100 (структура: <table class="listtop100">)
-        rating_tables = soup.find_all('table', class_='listtop100')
+        # Рейтинг - четвертая ячейка
+        if len(cells) > 3:
+            rating_text = _lxml_font2_text(cells[3])
+            if rating_text:
+                try:
+                    rating_val = float(rating_text)
+                    if 10 <= rating_val <= 200:  # Разумный диапазон для рейтинга
+                        rating = rating_val
+                except ValueError:
+                    pass
         
-        if verbose:
-            print(f"  [INFO] Найдено таблиц с классом listtop100: {len(rating_tables)}")
+        # Категория (A+, A, B, etc.) - пятая ячейка
+        if len(cells) > 4:
+            category_text = _lxml_font2_text(cells[4])
+            if category_text and CATEGORY_RE.match(category_text):
+                category = category_text
         
-        for table in rating_tables:
-            # Каждая таблица содержит одну строку с данными университета
-            rows = table.find_all('tr')
-            if not rows:
-                continue
-            
-            row = rows[0]  # Первая (и обычно единственная) строка
-            # Ищем только прямые дочерние td с классом tdtop100 (без вложенных)
-            cells = [td for td in row.find_all('td', class_='tdtop100', recursive=False)]
-            
-            if len(cells) < 3:
-                continue
+        # Если нашли хотя бы название и рейтинг или ранг, добавляем в список
+        if name and (rating or rank):
+            ratings_list.append({
+                'name': name,
+                'rating': rating,
+                'rank': rank,
+                'category': category
+            })
+    
+    return ratings_list
+
+
+def _parse_tabiturient_ratings_bs4(content, parse_only: bool = True) -> List[Dict]:
+    """
+    Разбор страницы рейтинга через BeautifulSoup (html.parser)
+    
+    Используется, если lxml не установлен. При parse_only=True строится
+    дерево только для таблиц listtop100 (SoupStrainer).
+    """
+    strainer = SoupStrainer('table', class_='listtop100') if parse_only else None
+    soup = BeautifulSoup(content, 'html.parser', parse_only=strainer)
+    
+    ratings_list = []
+    
+    # Ищем таблицы с классом listtop100 (структура: <table class="listtop100">)
+    rating_tables = soup.find_all('table', class_='listtop100')
+    
+    for table in rating_tables:
+        # Каждая таблица содержит одну строку с данными университета
+        rows = table.find_all('tr')
+        if not rows:
+            continue
+        
+        row = rows[0]  # Первая (и обычно единственная) строка
+        # Ищем только прямые дочерние td с классом tdtop100 (без вложенных)
+        cells = [td for td in row.find_all('td', class_='tdtop100', recursive=False)]
+        
+        if len(cells) < 3:
+            continue
+        
+        name = None
+        rating = None
+        rank = None
+        category = None
+        
+        # Извлекаем данные из ячеек
+        # Структура: [rank+change, logo, name, rating, category, arrow]
+        for i, cell in enumerate(cells):
+            cell_text = cell.get_text(strip=True)
             
-            name = None
-            rating = None
-            rank = None
-            category = None
+            # Ищем ранг (#1, #2, etc.) - обычно в первой ячейке
+            if i == 0:
+                # Ищем #N в <span class="font2"><b>#N</b></span>
+                rank_elem = cell.find('span', class_='font2')
+                if rank_elem:
+                    rank_bold = rank_elem.find('b')
+                    if rank_bold:
+                        rank_text = rank_bold.get_text(strip=True)
+                        rank_match = re.search(r'#(\d+)', rank_text)
+                        if rank_match:
+                            try:
+                                rank = int(rank_match.group(1))
+                            except ValueError:
+                                pass
             
-            # Извлекаем данные из ячеек
-            # Структура: [rank+change, logo, name, rating, category, arrow]
-            for i, cell in enumerate(cells):
-                cell_text = cell.get_text(strip=True)
-                
-                # Ищем ранг (#1, #2, etc.) - обычно в первой ячейке
-                if i == 0:
-                    # Ищем #N в <span class="font2"><b>#N</b></span>
-                    rank_elem = cell.find('span', class_='font2')
-                    if rank_elem:
-                        rank_bold = rank_elem.find('b')
-                        if rank_bold:
-                            rank_text = rank_bold.get_text(strip=True)
-                            rank_match = re.search(r'#(\d+)', rank_text)
-                            if rank_match:
-                                try:
-                                    rank = int(rank_match.group(1))
-                                except ValueError:
-                                    pass
-                
-                # Ищем название университета - обычно в третьей ячейке (индекс 2)
-                # Название находится в <span class="font2"><b>...</b></span>
-                # В ячейке может быть несколько span с font2 (первый для mobile с #N, второй с названием)
-                if i == 2:
-                    # Ищем все span с классом font2
-                    name_spans = cell.find_all('span', class_='font2')
-                    for name_span in name_spans:
-                        name_bold = name_span.find('b')
-                        if name_bold:
-                            name_text = name_bold.get_text(strip=True)
-                            # Пропускаем span с #N (ранг для mobile)
-                            if not re.match(r'^#\d+$', name_text) and len(name_text) > 1:
-                                name = name_text
+            # Ищем название университета - обычно в третьей ячейке (индекс 2)
+            # Название находится в <span class="font2"><b>...</b></span>
+            # В ячейке может быть несколько span с font2 (первый для mobile с #N, второй с названием)
+            if i == 2:
+                # Ищем все span с классом font2
+                name_spans = cell.find_all('span', class_='font2')
+                for name_span in name_spans:
+                    name_bold = name_span.find('b')
+                    if name_bold:
+                        name_text = name_bold.get_text(strip=True)
+                        # Пропускаем span с #N (ранг для mobile)
+                        if not re.match(r'^#\d+$', name_text) and len(name_text) > 1:
+                            name = name_text
+                            break
+                # Если не нашли в font2, пробуем весь текст ячейки
+                if not name:
+                    # Берем первую строку текста (короткое название)
+                    lines = [line.strip() for line in cell_text.split('\n') if line.strip() and not line.strip().startswith('#')]
+                    if lines:
+                        # Пропускаем строки с числами или символами
+                        for line in lines:
+                            if len(line) > 2 and not re.match(r'^[#\+\-]\d+$', line) and not re.match(r'^\d+\.?\d*$', line):
+                                name = line
                                 break
-                    # Если не нашли в font2, пробуем весь текст ячейки
-                    if not name:
-                        # Берем первую строку текста (короткое название)
-                        lines = [line.strip() for line in cell_text.split('\n') if line.strip() and not line.strip().startswith('#')]
-                        if lines:
-                            # Пропускаем строки с числами или символами
-                            for line in lines:
-                                if len(line) > 2 and not re.match(r'^[#\+\-]\d+$', line) and not re.match(r'^\d+\.?\d*$', line):
-                                    name = line
-                                    break
-                
-                # Ищем рейтинг - обычно в четвертой ячейке (индекс 3)
-                if i == 3:
-                    rating_elem = cell.find('span', class_='font2')
-                    if rating_elem:
-                        rating_bold = rating_elem.find('b')
-                        if rating_bold:
-                            rating_text = rating_bold.get_text(strip=True)
-                        else:
-                            rating_text = rating_elem.get_text(strip=True)
-                        
-                        try:
-                            rating_val = float(rating_text)
-                            if 10 <= rating_val <= 200:  # Разумный диапазон для рейтинга
-                                rating = rating_val
-                        except ValueError:
-                            pass
-                
-                # Ищем категорию (A+, A, B, etc.) - обычно в пятой ячейке (индекс 4)
-                if i == 4:
-                    category_elem = cell.find('span', class_='font2')
-                    if category_elem:
-                        category_bold = category_elem.find('b')
-                        if category_bold:
-                            category_text = category_bold.get_text(strip=True)
-                            # Проверяем, что это категория (A+, A, B, etc.), а не рейтинг
-                            if re.match(r'^[A-Z][\+\-]?$', category_text):
-                                category = category_text
-                        else:
-                            category_text = category_elem.get_text(strip=True)
-                            if re.match(r'^[A-Z][\+\-]?$', category_text):
-                                category = category_text
             
-            # Если не нашли ранг из #N, пробуем найти в тексте первой ячейки
-            if not rank and cells:
-                first_cell = cells[0].get_text(strip=True)
-                rank_match = re.search(r'#(\d+)', first_cell)
-                if rank_match:
+            # Ищем рейтинг - обычно в четвертой ячейке (индекс 3)
+            if i == 3:
+                rating_elem = cell.find('span', class_='font2')
+                if rating_elem:
+                    rating_bold = rating_elem.find('b')
+                    if rating_bold:
+                        rating_text = rating_bold.get_text(strip=True)
+                    else:
+                        rating_text = rating_elem.get_text(strip=True)
+                    
                     try:
-                        rank = int(rank_match.group(1))
+                        rating_val = float(rating_text)
+                        if 10 <= rating_val <= 200:  # Разумный диапазон для рейтинга
+                            rating = rating_val
                     except ValueError:
                         pass
             
-            # Если нашли хотя бы название и рейтинг или ранг, добавляем в список
-            if name and (rating or rank):
-                ratings_list.append({
-                    'name': name,
-                    'rating': rating,
-                    'rank': rank,
-                    'category': category
-                })
-        
-        if verbose:
-            print(f"  [OK] Найдено {len(ratings_list)} рейтингов")
+            # Ищем категорию (A+, A, B, etc.) - обычно в пятой ячейке (индекс 4)
+            if i == 4:
+                category_elem = cell.find('span', class_='font2')
+                if category_elem:
+                    category_bold = category_elem.find('b')
+                    if category_bold:
+                        category_text = category_bold.get_text(strip=True)
+                        # Проверяем, что это категория (A+, A, B, etc.), а не рейтинг
+                        if re.match(r'^[A-Z][\+\-]?$', category_text):
+                            category = category_text
+                    else:
+                        category_text = category_elem.get_text(strip=True)
+                        if re.match(r'^[A-Z][\+\-]?$', category_text):
+                            category = category_text
         
-        return ratings_list
+        # Если не нашли ранг из #N, пробуем найти в тексте первой ячейки
+        if not rank and cells:
+            first_cell = cells[0].get_text(strip=True)
+            rank_match = re.search(r'#(\d+)', first_cell)
+            if rank_match:
+                try:
+                    rank = int(rank_match.group(1))
+                except ValueError:
+                    pass
         
-    except requests.exceptions.RequestException as e:
-        if verbose:
-            print(f"  [ERROR] Ошибка при запросе к tabiturient.ru: {e}")
+        # Если нашли хотя бы название и рейтинг или ранг, добавляем в список
+        if name and (rating or rank):
+            ratings_list.append({
+                'name': name,
+                'rating': rating,
+                'rank': rank,
+                'category': category
+            })
+    
+    return ratings_list
+
+
+def parse_tabiturient_ratings_html(content, verbose: bool = False) -> List[Dict]:
+    """
+    Разбирает HTML страницы рейтинга tabiturient.ru
+    
+    Args:
+        content: HTML страницы (bytes или str)
+        verbose: Выводить подробную информацию в консоль
+    
+    Returns:
+        List[Dict] со списком всех рейтингов: [{'name': str, 'rating': float, 'rank': int, 'category': str}, ...]
+    """
+    if lxml_etree is not None:
+        return _parse_tabiturient_ratings_lxml(content)
+    
+    if verbose:
+        print("  [WARN] lxml не установлен, используется html.parser")
+    return _parse_tabiturient_ratings_bs4(content)
+
+
+def parse_tabiturient_ratings_page(verbose: bool = False) -> List[Dict]:
+    """
+    Парсит всю страницу рейтинга tabiturient.ru и возвращает список всех рейтингов
+    
+    Args:
+        verbose: Выводить подробную информацию в консоль
+    
+    Returns:
+        List[Dict] со списком всех рейтингов: [{'name': str, 'rating': float, 'rank': int, 'category': str}, ...]
+    """
+    if verbose:
+        print(f"  [Запрос] Парсинг всей страницы рейтинга tabiturient.ru")
+    
+    content = fetch_tabiturient_page(verbose=verbose)
+    if content is None:
         return []
+    
+    try:
+        ratings_list = parse_tabiturient_ratings_html(content, verbose=verbose)
     except Exception as e:
         if verbose:
             print(f"  [ERROR] Неожиданная ошибка при парсинге: {e}")
         return []
+    
+    if verbose:
+        print(f"  [OK] Найдено {len(ratings_list)} рейтингов")
+    
+    return ratings_list
 
 
-def update_university_tabiturient_rating(university, verbose: bool = False) -> bool:
+def update_university_tabiturient_rating(university, verbose: bool = False, commit: bool = True) -> bool:
     """
     Обновляет рейтинг университета из tabiturient.ru
     
     Args:
         university: Объект University
         verbose: Выводить подробную информацию в консоль
+        commit: Сохранить изменения в БД (False - для пакетного сохранения через BulkRatingWriter)
     
     Returns:
         True если рейтинг успешно обновлен, False в противном случае
@@ -662,8 +1182,9 @@ def update_university_tabiturient_rating(university, verbose: bool = False) -> b
     if rating_data:
         university.tabiturient_rating = rating_data.get('rating')
         university.tabiturient_rank = rating_data.get('rank')
-        university.tabiturient_category = rating_data.get('category', '')
-        university.save(update_fields=['tabiturient_rating', 'tabiturient_rank', 'tabiturient_category'])
+        university.tabiturient_category = rating_data.get('category') or ''
+        if commit:
+            university.save(update_fields=TABITURIENT_RATING_FIELDS)
         return True
     
     return False
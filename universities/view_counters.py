@@ -0,0 +1,112 @@
+"""
+Счетчики просмотров страниц вузов и новостей
+
+UPDATE на каждый просмотр - запись в БД на каждое чтение страницы (в SQLite
+запись еще и блокирует базу), поэтому просмотры копятся в памяти процесса
+(словарь под блокировкой, общий для потоков воркера) и сохраняются пакетно:
+первый просмотр после VIEW_COUNTERS_FLUSH_INTERVAL секунд сохраняет буфер
+одним запросом UPDATE на таблицу -
+views_count = views_count + CASE WHEN id IN (...) THEN n ... END.
+Ветви CASE группируются по количеству просмотров, поэтому их немного и при
+тысячах страниц в буфере.
+
+Каждый воркер сохраняет только свои приращения (F-выражение), поэтому
+просмотры не теряются и не удваиваются при нескольких воркерах. Буфер
+сохраняется и при остановке воркера (worker_exit в gunicorn_config.py).
+Ответы 304 Not Modified и ответы CDN не считаются: представление не выполняется.
+
+QuerySet.update() не вызывает сигналы и не меняет updated_at, поэтому
+просмотры не сбрасывают кэш каталога и ETag страниц. Запись выполняется в
+основную БД явно (using), без обращения к роутеру баз данных: служебная
+запись не считается записью запроса (db_routers.py) - чтения страницы
+остаются на реплике, и ответ не получает cookie закрепления за основной БД.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from .models import University, News
+
+
+# Модели со счетчиком views_count
+MODELS = {
+    'university': University,
+    'news': News,
+}
+
+# Наибольшее количество id в одном UPDATE (лимит параметров запроса SQLite)
+FLUSH_BATCH_SIZE = 500
+
+# Просмотры с последнего сохранения: (модель, id) -> количество
+_buffer = Counter()
+_lock = threading.Lock()
+_state = {'flushed_at': time.monotonic()}
+
+
+def _interval() -> int:
+    return getattr(settings, 'VIEW_COUNTERS_FLUSH_INTERVAL', 30)
+
+
+def _add(kind, object_id) -> bool:
+    """Добавляет просмотр в буфер; True, если пора сохранить буфер"""
+    with _lock:
+        _buffer[(kind, object_id)] += 1
+        return time.monotonic() - _state['flushed_at'] >= _interval()
+
+
+def record_view(kind, object_id):
+    """Учитывает просмотр страницы (kind - ключ MODELS)"""
+    if _add(kind, object_id):
+        flush_view_counters()
+
+
+async def arecord_view(kind, object_id):
+    """Асинхронный вариант record_view: к БД - только при сохранении буфера"""
+    if _add(kind, object_id):
+        await sync_to_async(flush_view_counters)()
+
+
+def _update(model, counts):
+    """Прибавляет просмотры counts (id -> количество) одним запросом UPDATE"""
+    by_count = defaultdict(list)
+    for object_id, count in counts.items():
+        by_count[count].append(object_id)
+    increment = Case(
+        *[When(pk__in=ids, then=Value(count)) for count, ids in sorted(by_count.items())],
+        default=Value(0),
+        output_field=PositiveIntegerField(),
+    )
+    queryset = model.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=list(counts))
+    return queryset.update(views_count=F('views_count') + increment)
+
+
+def flush_view_counters() -> int:
+    """
+    Сохраняет буфер просмотров в БД (по одному UPDATE на модель и каждые
+    FLUSH_BATCH_SIZE объектов). Возвращает количество сохраненных просмотров
+    """
+    with _lock:
+        pending = dict(_buffer)
+        _buffer.clear()
+        _state['flushed_at'] = time.monotonic()
+    if not pending:
+        return 0
+    
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            for kind, model in MODELS.items():
+                counts = [(object_id, count) for (name, object_id), count in pending.items() if name == kind]
+                for start in range(0, len(counts), FLUSH_BATCH_SIZE):
+                    _update(model, dict(counts[start:start + FLUSH_BATCH_SIZE]))
+    except DatabaseError:
+        # БД занята (например, блокировка SQLite) - просмотры вернутся в буфер
+        # и сохранятся при следующем сбросе, страница отдается без ошибки
+        with _lock:
+            _buffer.update(pending)
+        return 0
+    return sum(pending.values())
@@ -4,62 +4,77 @@ from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Q, Avg, Count, Min
 from django.http import JsonResponse
-from .models import University, UniversityRating, UniversityComparison, Region, UniversityType, News, Faculty, Program, UniversityRepresentative
-from .forms import UniversitySearchForm, UniversityRatingForm, UniversityComparisonForm, NewsForm, UniversityEditForm, BecomeRepresentativeForm
+from .models import University, UniversityRating, UniversityComparison, UniversityType, News, Faculty, Program, UniversityRepresentative, save_without_counters
+from .forms import NearbySearchForm, ProgramSearchForm, UniversitySearchForm, UniversityRatingForm, UniversityComparisonForm, NewsForm, UniversityEditForm, BecomeRepresentativeForm
+from .catalog_cache import get_cities, get_top_universities, get_catalog_stats, attach_reference_objects
+from .program_search import ProgramSearchResults, search_programs, result_values
+from .facets import get_facet_counts
+from .catalog_snapshot import get_snapshot, paginate_universities
+from .comparison import build_comparison, parse_university_ids
+from .geo import DEFAULT_NEAREST_COUNT, nearest_universities
+from .similarity import get_similar_universities
+from .recommendations import get_coliked_universities
+from .view_counters import record_view
+from .http_cache import conditional_page, university_page_validators, news_page_validators
 from accounts.models import FavoriteUniversity
 
 
 def home_view(request):
     """Главная страница"""
-    # Топ университетов по рейтингу
-    top_universities = University.objects.annotate(
-        avg_rating=Avg('ratings__rating'),
-        ratings_count=Count('ratings')
-    ).filter(ratings_count__gte=1).order_by('-avg_rating')[:6]
-    
-    # Последние новости
+    # Топ университетов по рейтингу, последние новости и статистика
+    # (справочные данные берутся из кэша, см. catalog_cache.py)
+    top_universities = get_top_universities()
     latest_news = News.objects.filter(is_published=True).order_by('-created_at')[:5]
-    
-    # Статистика
-    total_universities = University.objects.count()
-    total_regions = Region.objects.count()
-    total_ratings = UniversityRating.objects.count()
+    stats = get_catalog_stats()
     
     context = {
         'top_universities': top_universities,
         'latest_news': latest_news,
-        'total_universities': total_universities,
-        'total_regions': total_regions,
-        'total_ratings': total_ratings,
+        'total_universities': stats['total_universities'],
+        'total_regions': stats['total_regions'],
+        'total_ratings': stats['total_ratings'],
     }
     return render(request, 'universities/home.html', context)
 
 
-def university_list_view(request):
-    """Список университетов с поиском и фильтрацией"""
-    form = UniversitySearchForm(request.GET)
-    universities = University.objects.all()
-    
-    if form.is_valid():
-        name = form.cleaned_data.get('name')
-        region = form.cleaned_data.get('region')
-        city = form.cleaned_data.get('city')
-        university_type = form.cleaned_data.get('university_type')
-        is_public = form.cleaned_data.get('is_public')
-        min_programs = form.cleaned_data.get('min_programs')
-        max_tuition = form.cleaned_data.get('max_tuition')
-        
-        # Базовые фильтры
-        if name:
-            universities = universities.filter(name__icontains=name)
-        if region:
-            universities = universities.filter(region=region)
-        if city:
-            universities = universities.filter(city__icontains=city)
-        if university_type:
-            universities = universities.filter(university_type=university_type)
-        if is_public is not None and is_public:
-            universities = universities.filter(is_public=True)
+def apply_university_filters(universities, cleaned_data):
+    """Применяет базовые фильтры формы поиска (название, регион, город, тип, статус)"""
+    name = cleaned_data.get('name')
+    region = cleaned_data.get('region')
+    city = cleaned_data.get('city')
+    university_type = cleaned_data.get('university_type')
+    is_public = cleaned_data.get('is_public')
+    
+    if name:
+        universities = universities.filter(name__icontains=name)
+    if region:
+        universities = universities.filter(region=region)
+    if city:
+        universities = universities.filter(city__icontains=city)
+    if university_type:
+        universities = universities.filter(university_type=university_type)
+    if is_public is not None and is_public:
+        universities = universities.filter(is_public=True)
+    return universities
+
+
+def university_list_ordering(cleaned_data):
+    """
+    Порядок списка вузов в запросе ORM: по популярности (индекс
+    univ_views_count_idx) или по рейтингу, числу программ и названию
+    """
+    if cleaned_data.get('sort') == 'popular':
+        return ['-views_count', 'name', 'id']
+    return ['-avg_rating', '-programs_count', 'name']
+
+
+def search_universities(cleaned_data):
+    """
+    Вузы по фильтрам формы поиска (запрос ORM) с аннотациями списка
+    avg_rating, ratings_count, programs_count, min_tuition_fee
+    в порядке university_list_ordering
+    """
+    universities = apply_university_filters(University.objects.all(), cleaned_data)
     
     # Добавляем аннотации для всех нужных полей
     universities = universities.annotate(
@@ -70,44 +85,92 @@ def university_list_view(request):
     )
     
     # Фильтрация по аннотированным полям
-    if form.is_valid():
-        min_rating = form.cleaned_data.get('min_rating')
-        min_programs = form.cleaned_data.get('min_programs')
-        max_tuition = form.cleaned_data.get('max_tuition')
-        
-        if min_rating:
-            universities = universities.filter(avg_rating__gte=min_rating)
-        if min_programs:
-            universities = universities.filter(programs_count__gte=min_programs)
-        if max_tuition:
-            # Фильтруем по минимальной стоимости обучения среди программ
-            universities = universities.filter(
-                Q(min_tuition_fee__lte=max_tuition) | Q(min_tuition_fee__isnull=True)
-            )
+    min_rating = cleaned_data.get('min_rating')
+    min_programs = cleaned_data.get('min_programs')
+    max_tuition = cleaned_data.get('max_tuition')
+    
+    if min_rating:
+        universities = universities.filter(avg_rating__gte=min_rating)
+    if min_programs:
+        universities = universities.filter(programs_count__gte=min_programs)
+    if max_tuition:
+        # Фильтруем по минимальной стоимости обучения среди программ
+        universities = universities.filter(
+            Q(min_tuition_fee__lte=max_tuition) | Q(min_tuition_fee__isnull=True)
+        )
     
-    # Сортировка: сначала по рейтингу, потом по количеству программ, затем по названию
-    universities = universities.order_by('-avg_rating', '-programs_count', 'name')
+    return universities.order_by(*university_list_ordering(cleaned_data))
+
+
+def comparison_universities(cleaned_data):
+    """
+    Вузы страницы сравнения запросом ORM: базовые фильтры формы поиска,
+    аннотации avg_rating, ratings_count, programs_count, по названию
+    """
+    universities = apply_university_filters(University.objects.all(), cleaned_data)
+    return universities.annotate(
+        avg_rating=Avg('ratings__rating'),
+        ratings_count=Count('ratings'),
+        programs_count=Count('faculties__programs', distinct=True)
+    ).order_by('name')
+
+
+def leaderboard_universities():
+    """Вузы с оценками пользователей по убыванию средней оценки (рейтинг университетов)"""
+    return University.objects.annotate(
+        avg_rating=Avg('ratings__rating'),
+        ratings_count=Count('ratings')
+    ).filter(ratings_count__gte=1).order_by('-avg_rating', '-ratings_count')
+
+
+def _university_list_page(form, page_number):
+    """Страница списка вузов запросом ORM (без NumPy или при CATALOG_SNAPSHOT=False)"""
+    universities = search_universities(form.cleaned_data if form.is_valid() else {})
     
     # Пагинация
     paginator = Paginator(universities, 12)
-    page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    # Регион и тип вуза - из справочных таблиц в памяти, без запроса на каждый вуз
+    attach_reference_objects(page_obj.object_list)
+    return page_obj
+
+
+def university_list_view(request):
+    """Список университетов с поиском и фильтрацией"""
+    form = UniversitySearchForm(request.GET)
+    
+    # Фильтрация и сортировка по снимку каталога в памяти, из БД - только вузы страницы
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        cleaned_data = form.cleaned_data if form.is_valid() else {}
+        page_obj = paginate_universities(
+            snapshot, cleaned_data, 12, request.GET.get('page'), order=cleaned_data.get('sort') or 'rating'
+        )
+    else:
+        page_obj = _university_list_page(form, request.GET.get('page'))
+    
+    # Уникальные города для автодополнения (из кэша)
+    cities = get_cities()
     
-    # Получаем уникальные города для автодополнения
-    cities = University.objects.values_list('city', flat=True).distinct().order_by('city')
+    # Количество вузов для вариантов фильтров (один сгруппированный запрос, кэшируется)
+    facets = get_facet_counts(form.cleaned_data if form.is_valid() else {})
     
     context = {
         'form': form,
         'page_obj': page_obj,
         'universities': page_obj,
         'cities': cities,
+        'facets': facets,
     }
     return render(request, 'universities/university_list.html', context)
 
 
+@conditional_page(university_page_validators)
 def university_detail_view(request, university_id):
     """Детальная страница университета"""
     university = get_object_or_404(University, id=university_id)
+    # Просмотр учитывается в буфере, в БД сохраняется пакетно
+    record_view('university', university.pk)
     
     # Проверяем, есть ли университет в избранном у пользователя
     is_favorite = False
@@ -145,6 +208,10 @@ def university_detail_view(request, university_id):
         'programs': programs,
         'news': news,
         'is_representative': is_representative,
+        # Предрассчитанные похожие вузы (команда build_similar_universities)
+        'similar_universities': get_similar_universities(university.pk),
+        # Предрассчитанные рекомендации по предпочтениям пользователей (команда build_recommendations)
+        'coliked_universities': get_coliked_universities(university.pk),
     }
     return render(request, 'universities/university_detail.html', context)
 
@@ -184,38 +251,23 @@ def comparison_view(request):
     """Сравнение университетов"""
     # Получаем фильтры из GET запроса
     search_form = UniversitySearchForm(request.GET)
-    universities = University.objects.all()
-    
-    # Применяем фильтры
-    if search_form.is_valid():
-        name = search_form.cleaned_data.get('name')
-        region = search_form.cleaned_data.get('region')
-        city = search_form.cleaned_data.get('city')
-        university_type = search_form.cleaned_data.get('university_type')
-        is_public = search_form.cleaned_data.get('is_public')
-        
-        if name:
-            universities = universities.filter(name__icontains=name)
-        if region:
-            universities = universities.filter(region=region)
-        if city:
-            universities = universities.filter(city__icontains=city)
-        if university_type:
-            universities = universities.filter(university_type=university_type)
-        if is_public is not None and is_public:
-            universities = universities.filter(is_public=True)
-    
-    # Добавляем аннотации
-    universities = universities.annotate(
-        avg_rating=Avg('ratings__rating'),
-        ratings_count=Count('ratings'),
-        programs_count=Count('faculties__programs', distinct=True)
-    ).order_by('name')
-    
-    # Пагинация
-    paginator = Paginator(universities, 24)  # 24 университета на странице
+    cleaned_data = search_form.cleaned_data if search_form.is_valid() else {}
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        # 24 университета на странице, базовые фильтры, по названию
+        page_obj = paginate_universities(
+            snapshot, cleaned_data, 24, page_number, order='name', annotated_filters=False
+        )
+    else:
+        universities = comparison_universities(cleaned_data)
+        
+        # Пагинация
+        paginator = Paginator(universities, 24)  # 24 университета на странице
+        page_obj = paginator.get_page(page_number)
+        # Регион и тип вуза - из справочных таблиц в памяти, без запроса на каждый вуз
+        attach_reference_objects(page_obj.object_list)
     
     # Обработка POST запроса для сравнения
     selected_ids = []
@@ -234,8 +286,8 @@ def comparison_view(request):
             except ValueError:
                 messages.error(request, 'Ошибка в выбранных университетах.')
     
-    # Получаем уникальные города для автодополнения
-    cities = University.objects.values_list('city', flat=True).distinct().order_by('city')
+    # Уникальные города для автодополнения (из кэша)
+    cities = get_cities()
     
     # Преобразуем selected_ids в set для быстрой проверки
     selected_ids_set = set(selected_ids)
@@ -254,38 +306,68 @@ def comparison_view(request):
 def compare_universities_view(request, university_ids):
     """Страница сравнения университетов"""
     try:
-        ids = [int(id) for id in university_ids.split(',')]
-        universities = University.objects.filter(id__in=ids).annotate(
-            avg_rating=Avg('ratings__rating'),
-            ratings_count=Count('ratings')
-        )
-        
-        if len(universities) < 2:
-            messages.error(request, 'Недостаточно университетов для сравнения.')
-            return redirect('universities:comparison')
-        
-        # Получаем факультеты для каждого университета
-        faculties_data = {}
-        for university in universities:
-            faculties_data[university.id] = Faculty.objects.filter(university=university)
-        
-        context = {
-            'universities': universities,
-            'faculties_data': faculties_data,
-        }
-        return render(request, 'universities/compare_universities.html', context)
-    
-    except (ValueError, University.DoesNotExist):
+        ids = parse_university_ids(university_ids)
+    except ValueError:
         messages.error(request, 'Ошибка в параметрах сравнения.')
         return redirect('universities:comparison')
+    
+    # Вузы, программы и рейтинги - фиксированным числом запросов, с кэшем
+    comparison = build_comparison(ids)
+    if comparison is None:
+        messages.error(request, 'Недостаточно университетов для сравнения.')
+        return redirect('universities:comparison')
+    
+    return render(request, 'universities/compare_universities.html', comparison)
+
+
+def program_search_view(request):
+    """Поиск образовательных программ по всем вузам"""
+    form = ProgramSearchForm(request.GET)
+    if form.is_valid():
+        programs = ProgramSearchResults(search_programs(form.cleaned_data), form.cleaned_data.get('sort'))
+    else:
+        programs = ProgramSearchResults(search_programs({}).none())
+    
+    # Пагинация по строкам values() - без создания объектов моделей
+    paginator = Paginator(result_values(programs), 20)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    # Номера страниц рядом с текущей: перебор всего page_range в шаблоне
+    # (тысячи страниц без фильтров) дороже самой выборки
+    page_range = range(max(page_obj.number - 2, 1), min(page_obj.number + 2, paginator.num_pages) + 1)
+    
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'page_range': page_range,
+        'programs': page_obj,
+        'cities': get_cities(),
+    }
+    return render(request, 'universities/program_search.html', context)
+
+
+def nearby_view(request):
+    """Ближайшие к точке вузы (координаты вводятся или определяются браузером)"""
+    form = NearbySearchForm(request.GET or None)
+    universities = []
+    if form.is_valid():
+        universities = nearest_universities(
+            form.cleaned_data['lat'],
+            form.cleaned_data['lng'],
+            form.cleaned_data['k'] or DEFAULT_NEAREST_COUNT,
+            form.cleaned_data['max_distance'],
+        )
+    
+    context = {
+        'form': form,
+        'universities': universities,
+    }
+    return render(request, 'universities/nearby.html', context)
 
 
 def rating_leaderboard_view(request):
     """Рейтинг университетов"""
-    universities = University.objects.annotate(
-        avg_rating=Avg('ratings__rating'),
-        ratings_count=Count('ratings')
-    ).filter(ratings_count__gte=1).order_by('-avg_rating', '-ratings_count')
+    universities = leaderboard_universities()
     
     # Пагинация
     paginator = Paginator(universities, 20)
@@ -343,9 +425,11 @@ def news_list_view(request):
     return render(request, 'universities/news_list.html', context)
 
 
+@conditional_page(news_page_validators)
 def news_detail_view(request, news_id):
     """Детальная страница новости"""
     news = get_object_or_404(News, id=news_id, is_published=True)
+    record_view('news', news.pk)
     
     context = {
         'news': news,
@@ -435,7 +519,9 @@ def edit_university_view(request, university_id):
     if request.method == 'POST':
         form = UniversityEditForm(request.POST, request.FILES, instance=university)
         if form.is_valid():
-            form.save()
+            # Средняя оценка и просмотры обновляются запросами UPDATE - не
+            # перезаписываем их значениями на момент загрузки страницы
+            save_without_counters(form.save(commit=False))
             messages.success(request, 'Информация о вузе успешно обновлена!')
             return redirect('universities:university_detail', university_id=university_id)
     else:
@@ -0,0 +1,108 @@
+"""
+Роутеры баз данных для university_aggregator project.
+
+Чтение с реплик включается только на время GET/HEAD запросов к представлениям
+приложений из settings.DATABASE_REPLICA_APPS (ReplicaRoutingMiddleware).
+Management команды, воркеры очереди и запросы, изменяющие данные, работают
+только с основной БД ('default').
+
+Чтение после записи: после первой записи в запросе все последующие чтения
+этого запроса идут в основную БД, а клиенту ставится cookie, которое на
+DATABASE_REPLICA_STICKY_SECONDS секунд направляет его запросы в основную БД,
+пока реплики не догонят изменения (отзыв, избранное, новость и т.д.).
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+
+
+# Состояние текущего запроса: None вне запроса (только основная БД), иначе словарь
+# {'use_replica': чтение с реплик разрешено, 'wrote': в запросе была запись}
+_request_state = contextvars.ContextVar('db_request_state', default=None)
+
+PRIMARY_COOKIE_NAME = 'db_primary'
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_to_primary():
+    """Направляет оставшиеся чтения текущего запроса в основную БД"""
+    state = _request_state.get()
+    if state is not None:
+        state['use_replica'] = False
+
+
+class PrimaryReplicaRouter:
+    """
+    Разделение чтения и записи: запись и миграции - в основную БД ('default'),
+    чтение в рамках разрешенных запросов - со случайной реплики из settings.DATABASE_REPLICAS
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        replicas = get_replicas()
+        if replicas and state is not None and state['use_replica'] and not state['wrote']:
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            # После записи запрос читает только из основной БД
+            state['wrote'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Разрешает чтение с реплик для GET/HEAD запросов к каталогу и
+    обеспечивает чтение после записи для клиента
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {'use_replica': False, 'wrote': False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        if state['wrote']:
+            # Cookie касается только этого клиента: ответ, разрешенный для общего
+            # кэша (public, s-maxage), становится private, иначе CDN отдаст cookie всем
+            patch_cache_control(response, private=True)
+            response.set_cookie(
+                PRIMARY_COOKIE_NAME,
+                '1',
+                max_age=getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 10),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not get_replicas() or request.method not in ('GET', 'HEAD'):
+            return None
+        if request.COOKIES.get(PRIMARY_COOKIE_NAME):
+            # Клиент недавно записывал данные - читаем из основной БД
+            return None
+
+        apps = getattr(settings, 'DATABASE_REPLICA_APPS', ['universities'])
+        module = getattr(view_func, '__module__', '') or ''
+        if module.split('.')[0] in apps:
+            _request_state.get()['use_replica'] = True
+        return None
@@ -0,0 +1,21 @@
+"""
+Настройка соединений с базой данных для university_aggregator project.
+"""
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Обработчик сигнала connection_created: выполняет settings.SQLITE_PRAGMAS
+    для каждого нового соединения с SQLite
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
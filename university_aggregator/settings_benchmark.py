@@ -0,0 +1,25 @@
+"""
+Benchmark settings for university_aggregator project.
+Направляет запросы к внешним API на локальный mock-сервер
+(python manage.py run_mock_providers) для воспроизводимых замеров
+пропускной способности команд update_*_ratings.
+Работает с отдельной копией базы (benchmark.sqlite3), чтобы рейтинги и
+place_id из mock-сервера не попали в рабочую базу.
+"""
+from .settings import *
+from decouple import config
+
+# Копия базы для замеров (см. README: «Нагрузочное тестирование без обращения к
+# реальным API»); отдельная переменная, а не SQLITE_PATH из .env рабочей базы
+DATABASES['default']['NAME'] = config('BENCHMARK_SQLITE_PATH', default=str(BASE_DIR / 'benchmark.sqlite3'))
+
+MOCK_PROVIDERS_URL = config('MOCK_PROVIDERS_URL', default='http://127.0.0.1:8765')
+
+# Ключи не проверяются mock-сервером, но без них команды не выполняют запросы
+GOOGLE_PLACES_API_KEY = 'mock-google-key'
+YANDEX_MAPS_API_KEY = 'mock-yandex-key'
+
+GOOGLE_MAPS_API_URL = f'{MOCK_PROVIDERS_URL}/google'
+YANDEX_GEOCODER_URL = f'{MOCK_PROVIDERS_URL}/yandex/geocode/1.x/'
+YANDEX_SEARCH_URL = f'{MOCK_PROVIDERS_URL}/yandex/search/v1/'
+TABITURIENT_RATING_URL = f'{MOCK_PROVIDERS_URL}/tabiturient/globalrating/'
@@ -23,20 +23,58 @@ SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
-# Database - для production используйте PostgreSQL
-# Раскомментируйте и настройте для PostgreSQL:
-"""
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': config('DB_NAME'),
-        'USER': config('DB_USER'),
-        'PASSWORD': config('DB_PASSWORD'),
-        'HOST': config('DB_HOST', default='localhost'),
-        'PORT': config('DB_PORT', default='5432'),
+# Database - PostgreSQL, если задан DB_NAME (или DB_ENGINE=postgresql),
+# иначе остается SQLite из базовых настроек
+DB_ENGINE = config('DB_ENGINE', default='postgresql' if config('DB_NAME', default='') else 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME'),
+            'USER': config('DB_USER'),
+            'PASSWORD': config('DB_PASSWORD'),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # Постоянные соединения: воркер gunicorn не открывает соединение на каждый запрос
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=600, cast=int),
+            # Перед повторным использованием соединение проверяется (после рестарта БД и т.п.)
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+                'application_name': 'uniguide',
+            },
+        }
     }
-}
-"""
+    
+    # Пулер соединений на стороне сервера (PgBouncer в режиме transaction, см. deploy/pgbouncer.ini):
+    # HOST/PORT указывают на PgBouncer, серверные курсоры несовместимы с transaction pooling
+    DB_POOLER = config('DB_POOLER', default='')
+    if DB_POOLER == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    
+    # Реплики только для чтения: DB_REPLICA_HOSTS=replica1:5432,replica2:5432
+    DATABASE_REPLICAS = []
+    for index, replica in enumerate(config('DB_REPLICA_HOSTS', default='').split(','), 1):
+        if not replica.strip():
+            continue
+        host, _, port = replica.strip().partition(':')
+        alias = f'replica_{index}'
+        DATABASES[alias] = {
+            **DATABASES['default'],
+            'HOST': host,
+            'PORT': port or DATABASES['default']['PORT'],
+            'TEST': {'MIRROR': 'default'},
+        }
+        DATABASE_REPLICAS.append(alias)
+    
+    if DATABASE_REPLICAS:
+        DATABASE_ROUTERS = ['university_aggregator.db_routers.PrimaryReplicaRouter']
+        MIDDLEWARE.append('university_aggregator.db_routers.ReplicaRoutingMiddleware')
+        # Чтение с реплик - только для GET/HEAD представлений этих приложений
+        DATABASE_REPLICA_APPS = ['universities']
+        # Сколько секунд после записи запросы клиента читают из основной БД
+        DATABASE_REPLICA_STICKY_SECONDS = config('DB_REPLICA_STICKY_SECONDS', default=10, cast=int)
 
 # Static files - для production используйте WhiteNoise или CDN
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
@@ -0,0 +1,20 @@
+"""
+Replica settings for university_aggregator project.
+Локальная проверка маршрутизации чтения на реплику: основная БД - db.sqlite3,
+реплика - db_replica.sqlite3. Реплика обновляется вручную командой
+python manage.py sync_sqlite_replica, что позволяет воспроизвести отставание реплики.
+"""
+from .settings import *
+from decouple import config
+
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': config('REPLICA_DB_PATH', default=str(BASE_DIR / 'db_replica.sqlite3')),
+    'TEST': {'MIRROR': 'default'},
+}
+
+DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['university_aggregator.db_routers.PrimaryReplicaRouter']
+MIDDLEWARE = MIDDLEWARE + ['university_aggregator.db_routers.ReplicaRoutingMiddleware']
+DATABASE_REPLICA_APPS = ['universities']
+DATABASE_REPLICA_STICKY_SECONDS = 10